@@ -1,12 +1,14 @@
 
 import sys
 import os
+import json
 from sqlalchemy import create_engine, text
 
 # Add server directory to path
 sys.path.append(os.path.join(os.getcwd(), 'server'))
 
-from server.core.database import SQLALCHEMY_DATABASE_URL
+from server.core.database import SQLALCHEMY_DATABASE_URL, Base, ensure_indexes, rebuild_with_autoincrement
+from server.core.serialization import pack
 
 def migrate():
     engine = create_engine(SQLALCHEMY_DATABASE_URL)
@@ -28,8 +30,57 @@ def migrate():
                 conn.execute(text("ALTER TABLE backtest_records ADD COLUMN detail_data JSON"))
             except Exception as e:
                 print(f"Error adding detail_data: {e}")
-                
+
+        if 'has_detail' not in columns:
+            print("Adding has_detail column...")
+            try:
+                conn.execute(text("ALTER TABLE backtest_records ADD COLUMN has_detail INTEGER DEFAULT 0"))
+            except Exception as e:
+                print(f"Error adding has_detail: {e}")
+        conn.commit()
+
+    # 创建 backtest_details 等新表，并为旧表补建索引
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
+
+    # 旧表没有 AUTOINCREMENT，删除记录后 id 会被复用
+    if rebuild_with_autoincrement(engine):
+        print("Rebuilt backtest_records with AUTOINCREMENT")
+
+    migrate_detail_blobs(engine)
     print("Migration completed.")
 
+def migrate_detail_blobs(engine, batch_size=50):
+    """
+    将旧版 detail_data (未压缩 JSON 列) 逐批转存到 backtest_details 压缩表
+    """
+    moved = 0
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(text(
+                "SELECT id, detail_data FROM backtest_records WHERE detail_data IS NOT NULL LIMIT :limit"
+            ), {"limit": batch_size}).fetchall()
+            if not rows:
+                break
+
+            for record_id, detail_data in rows:
+                data = json.loads(detail_data) if isinstance(detail_data, (str, bytes)) else detail_data
+                codec, payload = pack(data)
+                conn.execute(text(
+                    "INSERT OR REPLACE INTO backtest_details (record_id, codec, payload) VALUES (:id, :codec, :payload)"
+                ), {"id": record_id, "codec": codec, "payload": payload})
+                conn.execute(text(
+                    "UPDATE backtest_records SET detail_data = NULL, has_detail = 1 WHERE id = :id"
+                ), {"id": record_id})
+            conn.commit()
+            moved += len(rows)
+            print(f"Compressed detail_data for {moved} records...")
+
+    if moved:
+        # 回收旧 JSON 列释放的空间
+        print("Reclaiming disk space (VACUUM)...")
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+
 if __name__ == "__main__":
     migrate()
@@ -0,0 +1,52 @@
+import sys
+import subprocess
+
+# 在独立子进程中运行，分别测量 PandasData 与 NumpyData 的回测耗时和进程峰值内存
+CODE = """
+import time, resource, warnings
+import numpy as np, pandas as pd, backtrader as bt
+from core.feeds import NumpyData
+warnings.filterwarnings('ignore')
+
+n = {n_bars}
+index = pd.date_range('2020-01-02 09:00', periods=n, freq='min')
+close = 3000 + np.cumsum(np.random.default_rng(0).normal(0, 1, n))
+df = pd.DataFrame({{'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                    'Volume': 100.0, 'OpenInterest': 0.0, 'ma_fast': close, 'ma_slow': close}}, index=index)
+
+class PandasStrategyData(bt.feeds.PandasData):
+    lines = ('ma_fast', 'ma_slow')
+    params = (('ma_fast', 'ma_fast'), ('ma_slow', 'ma_slow'))
+
+class NumpyStrategyData(NumpyData):
+    lines = ('ma_fast', 'ma_slow')
+
+class Cross(bt.Strategy):
+    def __init__(self):
+        self.cross = bt.ind.CrossOver(self.data.ma_fast, bt.ind.SMA(period=55))
+
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+cerebro = bt.Cerebro(stdstats=False)
+cerebro.adddata({feed}(dataname=df, timeframe=bt.TimeFrame.Minutes, compression=1))
+cerebro.addstrategy(Cross)
+t0 = time.perf_counter()
+cerebro.run()
+print(time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss)
+"""
+
+
+def measure(feed, n_bars):
+    out = subprocess.run([sys.executable, "-c", CODE.format(feed=feed, n_bars=n_bars)],
+                         capture_output=True, text=True, check=True)
+    elapsed, rss = out.stdout.strip().splitlines()[-1].split()
+    return float(elapsed), int(rss) / 1024
+
+
+if __name__ == "__main__":
+    n_bars = int(sys.argv[1]) if len(sys.argv) > 1 else 250000
+    print(f"K线数量: {n_bars}")
+    before = measure("PandasStrategyData", n_bars)
+    after = measure("NumpyStrategyData", n_bars)
+    print(f"{'PandasData':<16} {before[0]:8.2f} s  +{before[1]:8.1f} MB")
+    print(f"{'NumpyData':<16} {after[0]:8.2f} s  +{after[1]:8.1f} MB")
+    print(f"加速比: {before[0] / after[0]:.1f}x")
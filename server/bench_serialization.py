@@ -0,0 +1,66 @@
+import json
+import time
+import datetime
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from core.serialization import dumps
+
+# 模拟多年 1 分钟回测结果 (约 3 年 * 250 天 * 345 根/天)
+def build_payload(n_bars=258750, n_trades=2000):
+    start = datetime.datetime(2022, 1, 4, 9, 0)
+    dates = [(start + datetime.timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S') for i in range(n_bars)]
+    rng = np.random.default_rng(0)
+    close = 3000 + np.cumsum(rng.normal(0, 2, n_bars))
+    values = np.column_stack([close + 1, close, close - 3, close + 3]).round(2)
+
+    def series():
+        s = close.round(2)
+        s[:10] = np.nan # 模拟预热期缺失值
+        return s.tolist()
+
+    kline_data = {
+        "dates": dates,
+        "values": values.tolist(),
+        "volumes": rng.integers(100, 10000, n_bars).tolist(),
+        "ma": {"ma5": series(), "ma10": series(), "ma20": series(), "ma55": series()},
+        "macd": {"dif": series(), "dea": series(), "hist": series()},
+    }
+    equity_curve = [{"date": d, "value": 1000000.0 + i, "return": 0.0} for i, d in enumerate(dates)]
+    trades = [{
+        "date": dates[i * 100], "type": "buy", "action": "买多", "price": 3000.0, "size": 1.0,
+        "position": 1.0, "mdd_price": None, "mdd_date": None, "entry_price": None, "holding_direction": "无"
+    } for i in range(n_trades)]
+    logs = [f"{dates[i * 100]}, 交易执行: 【买多】 价格: 3000.00" for i in range(n_trades)]
+    return {
+        "status": "success",
+        "equity_curve": equity_curve,
+        "kline_data": kline_data,
+        "trades": trades,
+        "metrics": {"initial_cash": 1000000.0, "sharpe_ratio": float('nan')},
+        "logs": logs,
+    }
+
+
+def bench(label, fn, payload, repeat=3):
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body = fn(payload)
+        best = min(best, time.perf_counter() - t0)
+        size = len(body)
+    print(f"{label:<32} {best * 1000:10.1f} ms   {size / 1024 / 1024:8.2f} MB")
+    return best
+
+
+def default_path(payload):
+    # FastAPI 默认路径: jsonable_encoder 遍历 + 标准库 json
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=True).encode('utf-8')
+
+
+if __name__ == "__main__":
+    payload = build_payload()
+    print(f"K线数量: {len(payload['kline_data']['dates'])}")
+    before = bench("jsonable_encoder + json", default_path, payload)
+    after = bench("serialization.dumps", dumps, payload)
+    print(f"加速比: {before / after:.1f}x")
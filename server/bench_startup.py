@@ -0,0 +1,43 @@
+import os
+import sys
+import subprocess
+import statistics
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 在独立子进程中导入 main，测量导入耗时与进程峰值内存
+LAZY = """
+import time, resource
+t0 = time.perf_counter()
+import main
+elapsed = time.perf_counter() - t0
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+# 模拟改动前的行为: 导入 main 时立即加载 akshare / backtrader / 回测引擎
+EAGER = """
+import time, resource
+t0 = time.perf_counter()
+import main
+import akshare, core.engine, core.optimizer
+elapsed = time.perf_counter() - t0
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure(code, repeat=5):
+    times, rss = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], cwd=SERVER_DIR, capture_output=True, text=True, check=True)
+        elapsed, maxrss = out.stdout.strip().splitlines()[-1].split()
+        times.append(float(elapsed))
+        rss.append(int(maxrss) / 1024)
+    return statistics.median(times), statistics.median(rss)
+
+
+if __name__ == "__main__":
+    eager_t, eager_rss = measure(EAGER)
+    lazy_t, lazy_rss = measure(LAZY)
+    print(f"{'eager (akshare + backtrader)':<32} {eager_t * 1000:8.0f} ms  {eager_rss:8.1f} MB")
+    print(f"{'lazy':<32} {lazy_t * 1000:8.0f} ms  {lazy_rss:8.1f} MB")
+    print(f"启动加速: {eager_t / lazy_t:.1f}x, 内存减少: {eager_rss - lazy_rss:.1f} MB")
@@ -0,0 +1,155 @@
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+# 共享内存中保存的 K 线列 (与 data_loader 输出的列名一致)
+BAR_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume', 'OpenInterest')
+
+
+class BarSpec:
+    """
+    共享 K 线的描述信息，体积很小，可以直接传给子进程
+    内存布局: [时间戳 int64 * length][列0 float64 * length][列1 ...]
+    """
+    __slots__ = ('name', 'length', 'columns')
+
+    def __init__(self, name, length, columns):
+        self.name = name
+        self.length = length
+        self.columns = tuple(columns)
+
+    def __getstate__(self):
+        return (self.name, self.length, self.columns)
+
+    def __setstate__(self, state):
+        self.name, self.length, self.columns = state
+
+    def __repr__(self):
+        return f"BarSpec(name={self.name!r}, length={self.length}, columns={self.columns})"
+
+    @property
+    def nbytes(self):
+        return 8 * self.length * (1 + len(self.columns))
+
+
+def _attach_shm(name):
+    """
+    附加到已存在的共享内存块 (不负责 unlink，由发布方释放)
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # 3.13 以前附加时也会注册到 resource_tracker；multiprocessing 启动的子进程与父进程共用同一个 tracker，
+    # 重复注册无副作用，真正的 unlink 仍由 SharedBarStore.release 完成
+    return shared_memory.SharedMemory(name=name)
+
+
+class SharedBars:
+    """
+    共享内存中一组 K 线的 NumPy 视图 (零拷贝)
+    - dates: datetime64[ns] 数组
+    - values: (列数, length) float64 数组，每一行都是连续内存
+    """
+
+    def __init__(self, spec, shm):
+        self.spec = spec
+        self._shm = shm
+        n = spec.length
+        self.dates = np.ndarray((n,), dtype='datetime64[ns]', buffer=shm.buf, offset=0)
+        self.values = np.ndarray((len(spec.columns), n), dtype=np.float64, buffer=shm.buf, offset=8 * n)
+
+    def __len__(self):
+        return self.spec.length
+
+    def column(self, name):
+        return self.values[self.spec.columns.index(name)]
+
+    def to_frame(self):
+        """
+        转为 DataFrame (列直接引用共享内存，不复制)
+        返回的 DataFrame 只能在 close() 之前使用
+        """
+        index = pd.DatetimeIndex(self.dates, copy=False)
+        return pd.DataFrame({col: self.values[i] for i, col in enumerate(self.spec.columns)}, index=index, copy=False)
+
+    def close(self):
+        # 释放视图后才能关闭共享内存
+        self.dates = None
+        self.values = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec):
+    """
+    子进程中按 BarSpec 附加共享 K 线
+    """
+    return SharedBars(spec, _attach_shm(spec.name))
+
+
+class SharedBarStore:
+    """
+    父进程中的共享 K 线仓库
+    每个序列只发布一次，子进程通过 BarSpec 零拷贝读取，避免每个任务都 pickle 整个 DataFrame
+    使用完毕后调用 close() (或 with 语句) 释放共享内存
+    """
+
+    def __init__(self):
+        self._blocks = {} # key -> (shm, spec)
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._blocks
+
+    def get(self, key):
+        entry = self._blocks.get(key)
+        return entry[1] if entry else None
+
+    def publish(self, key, df, columns=BAR_COLUMNS):
+        """
+        将 DataFrame (DatetimeIndex + OHLCV 列) 复制到共享内存
+        :return: BarSpec
+        """
+        with self._lock:
+            if key in self._blocks:
+                return self._blocks[key][1]
+
+            columns = [col for col in columns if col in df.columns]
+            spec = BarSpec(None, len(df), columns)
+            shm = shared_memory.SharedMemory(create=True, size=max(spec.nbytes, 1))
+            spec.name = shm.name
+
+            bars = SharedBars(spec, shm)
+            bars.dates[:] = pd.DatetimeIndex(df.index).as_unit('ns').values
+            for i, col in enumerate(columns):
+                bars.values[i] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            bars.dates = bars.values = None # 只保留共享内存块本身
+
+            self._blocks[key] = (shm, spec)
+            return spec
+
+    def release(self, key):
+        with self._lock:
+            entry = self._blocks.pop(key, None)
+        if entry:
+            shm, _ = entry
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        for key in list(self._blocks):
+            self.release(key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from .downsample import lttb_bounds, lttb_indices, ohlcv_buckets
+
+DKX_STRATEGIES = ['DKXStrategy', 'DKXPartialTakeProfitStrategy', 'DKXFixedTPSLStrategy']
+
+
+def chart_bounds(n, max_points):
+    """
+    图表降采样的区间划分；不需要降采样时返回 None
+    """
+    if not max_points or n <= max_points:
+        return None
+    return lttb_bounds(n, max_points)
+
+
+def downsample_line(series, bounds):
+    """
+    折线降采样 (LTTB)，每个区间一个点，与合并后的 K 线一一对应
+    """
+    values = np.asarray(series, dtype=np.float64)
+    if bounds is None:
+        return values.tolist()
+    return values[lttb_indices(values, bounds)].tolist()
+
+
+def downsample_equity(equity_curve, max_points):
+    """
+    权益曲线 LTTB 降采样 (点数与 K 线相同时区间划分也相同，前端按位置对齐)
+    收益率改为相邻两个选中点之间的收益率
+    """
+    bounds = chart_bounds(len(equity_curve), max_points)
+    if bounds is None:
+        return equity_curve
+    values = np.array([eq['value'] for eq in equity_curve], dtype=np.float64)
+    result = []
+    prev = None
+    for i in lttb_indices(values, bounds):
+        point = dict(equity_curve[i])
+        if prev is not None:
+            point['return'] = point['value'] / prev - 1.0 if prev else 0.0
+        prev = point['value']
+        result.append(point)
+    return result
+
+
+def build_kline_data(df_kline, strategy_name, strategy_params, max_points=None, view=None):
+    """
+    构建前端 ChartPanel 使用的 K 线、均线、MACD、DKX 数据
+    :param df_kline: 回测区间内的 K 线 (指标在整个区间上计算，保证与回测结果一致)
+    :param max_points: 最大返回点数，超过时 K 线按区间合并 (OHLC)，指标线用 LTTB 降采样；None 表示全部返回
+    :param view: (开始位置, 结束位置)，只返回该可见范围的数据 (缩放)
+    """
+    lo, hi = view if view is not None else (0, len(df_kline))
+    bounds = chart_bounds(hi - lo, max_points)
+
+    def series_list(series):
+        return downsample_line(series.to_numpy()[lo:hi], bounds)
+
+    df_view = df_kline.iloc[lo:hi]
+    df_chart = ohlcv_buckets(df_view, bounds) if bounds is not None else df_view
+    kline_data = {
+        "dates": df_chart.index.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+        "values": df_chart[['Open', 'Close', 'Low', 'High']].values.tolist(),
+        "volumes": df_chart['Volume'].tolist() if 'Volume' in df_chart.columns else []
+    }
+    if bounds is not None:
+        # 前端据此把交易信号对齐到所在区间，并按需请求缩放后的明细
+        kline_data['downsample'] = {"bars": hi - lo, "points": len(bounds) - 1}
+
+    close_series = df_kline['Close'].astype(float)
+    ma5 = close_series.rolling(window=5, min_periods=1).mean()
+    ma10 = close_series.rolling(window=10, min_periods=1).mean()
+    ma20 = close_series.rolling(window=20, min_periods=1).mean()
+    ma55 = close_series.rolling(window=55, min_periods=1).mean()
+    kline_data['ma'] = {
+        "ma5": series_list(ma5.round(2)),
+        "ma10": series_list(ma10.round(2)),
+        "ma20": series_list(ma20.round(2)),
+        "ma55": series_list(ma55.round(2))
+    }
+
+    # 策略自定义均线计算 (用于前端展示策略实际使用的均线)
+    if 'fast_period' in strategy_params:
+        try:
+            p = int(strategy_params['fast_period'])
+            # 根据 ma_type 选择 SMA 或 EMA (默认 SMA)
+            is_ema = strategy_params.get('ma_type', 'SMA').upper() == 'EMA'
+
+            if is_ema:
+                kline_data['ma']['strategy_fast'] = series_list(close_series.ewm(span=p, adjust=False).mean().round(2))
+            else:
+                kline_data['ma']['strategy_fast'] = series_list(close_series.rolling(window=p, min_periods=1).mean().round(2))
+
+            kline_data['ma']['strategy_fast_period'] = p
+            kline_data['ma']['strategy_fast_label'] = f"{'EMA' if is_ema else 'MA'}{p}"
+        except:
+            pass
+
+    if 'slow_period' in strategy_params:
+        try:
+            p = int(strategy_params['slow_period'])
+            is_ema = strategy_params.get('ma_type', 'SMA').upper() == 'EMA'
+
+            if is_ema:
+                kline_data['ma']['strategy_slow'] = series_list(close_series.ewm(span=p, adjust=False).mean().round(2))
+            else:
+                kline_data['ma']['strategy_slow'] = series_list(close_series.rolling(window=p, min_periods=1).mean().round(2))
+
+            kline_data['ma']['strategy_slow_period'] = p
+            kline_data['ma']['strategy_slow_label'] = f"{'EMA' if is_ema else 'MA'}{p}"
+        except:
+            pass
+
+    # 计算 MACD (无论策略是否使用，都计算以便前端展示)
+    try:
+        fast_period = int(strategy_params.get('macd_fast', 12))
+        slow_period = int(strategy_params.get('macd_slow', 26))
+        signal_period = int(strategy_params.get('macd_signal', 9))
+
+        close_price = df_kline['Close'].astype(float)
+        exp1 = close_price.ewm(span=fast_period, adjust=False).mean()
+        exp2 = close_price.ewm(span=slow_period, adjust=False).mean()
+        dif = exp1 - exp2
+        dea = dif.ewm(span=signal_period, adjust=False).mean()
+        macd_hist = (dif - dea) * 2
+
+        kline_data['macd'] = {
+            "dif": series_list(dif.fillna(0)),
+            "dea": series_list(dea.fillna(0)),
+            "hist": series_list(macd_hist.fillna(0))
+        }
+    except Exception as e:
+        print(f"MACD Calculation Error: {e}")
+        kline_data['macd'] = None
+
+    if strategy_name in DKX_STRATEGIES:
+        try:
+            dkx_period = int(strategy_params.get('dkx_period', 20))
+            dkx_ma_period = int(strategy_params.get('dkx_ma_period', 10))
+
+            mid = (3 * df_kline['Close'] + df_kline['Low'] + df_kline['Open'] + df_kline['High']) / 6.0
+
+            # 计算 DKX (WMA)
+            # DKX = (20*MID + 19*REF(MID,1) + ... + 1*REF(MID,19)) / 210
+            dkx_values = mid.rolling(window=dkx_period).apply(
+                lambda x: np.dot(x, np.arange(1, dkx_period + 1)) / (dkx_period * (dkx_period + 1) / 2),
+                raw=True
+            )
+
+            # 计算 MADKX (SMA)
+            madkx_values = dkx_values.rolling(window=dkx_ma_period).mean()
+
+            kline_data['dkx'] = {
+                "dkx": series_list(dkx_values.fillna(0)),
+                "madkx": series_list(madkx_values.fillna(0))
+            }
+        except Exception as e:
+            print(f"DKX Calculation Error: {e}")
+            kline_data['dkx'] = None
+
+    return kline_data
+
+
+def view_range(index, view_start=None, view_end=None):
+    """
+    可见范围 [view_start, view_end] (日期时间字符串) -> K 线位置区间 (lo, hi)
+    """
+    lo = index.searchsorted(pd.to_datetime(view_start), side='left') if view_start else 0
+    hi = index.searchsorted(pd.to_datetime(view_end), side='right') if view_end else len(index)
+    return int(lo), int(max(hi, lo))
@@ -1,84 +1,95 @@
-import akshare as ak
 import pandas as pd
 import datetime
+from .lazy import lazy_import
+from .symbol_alias import weighted_daily_aliases, weighted_minute_aliases
+from .series_cache import series_cache
+from .resample import resample_bars
 
-def fetch_stock_data(symbol='sh600000', period='daily', start_date=None, end_date=None, adjust='qfq'):
+# akshare 导入较慢，首次获取数据时再导入
+ak = lazy_import("akshare")
+
+def _download_stock_series(symbol, period='daily', adjust='qfq'):
     """
-    获取股票数据
-    :param symbol: 股票代码，如 'sh600000'
-    :param period: 周期，'daily' (日线), '1', '5', '15', '30', '60' 分钟
-    :param adjust: 复权方式，'qfq' (前复权), 'hfq' (后复权), '' (不复权)
+    从 AkShare 下载股票数据并清洗 (不按日期过滤，由 series_cache 缓存)
+    :param period: 'daily' (日线) 或 '1', '5', '15', '30', '60' 分钟；周线/月线由日线合成
     """
     print(f"正在从 AkShare 获取股票({symbol}) {period} 数据...")
-    
-    df = None
-    try:
-        # 处理日线/周线/月线数据
-        if period in ['daily', 'weekly', 'monthly']:
-            # 优先尝试 AkShare 股票日线接口: stock_zh_a_hist (东方财富)
-            # symbol 需要是 6 位代码，去掉前缀
-            code = symbol[-6:]
-            try:
-                df = ak.stock_zh_a_hist(symbol=code, period=period, start_date="19900101", end_date="20500101", adjust=adjust)
-                
-                # 清洗 (东方财富返回中文列名)
-                df.rename(columns={
-                    '日期': 'date',
-                    '开盘': 'Open',
-                    '最高': 'High',
-                    '最低': 'Low',
-                    '收盘': 'Close',
-                    '成交量': 'Volume'
-                }, inplace=True)
-            except Exception as e_hist:
-                if period == 'daily':
-                    print(f"东方财富接口(stock_zh_a_hist)调用失败，尝试新浪接口: {e_hist}")
-                    # Fallback: AkShare 股票日线接口: stock_zh_a_daily (新浪)
-                    # symbol 需要带前缀
-                    df = ak.stock_zh_a_daily(symbol=symbol, start_date="19900101", end_date="20500101", adjust=adjust)
-                    
-                    # 清洗 (新浪返回英文小写列名)
-                    df.rename(columns={
-                        'date': 'date',
-                        'open': 'Open',
-                        'high': 'High',
-                        'low': 'Low',
-                        'close': 'Close',
-                        'volume': 'Volume'
-                    }, inplace=True)
-                else:
-                    raise e_hist
-            
-            df['date'] = pd.to_datetime(df['date'])
-            df.set_index('date', inplace=True)
-            df['OpenInterest'] = 0 # 股票无持仓量
+
+    if period == 'daily':
+        # 优先尝试 AkShare 股票日线接口: stock_zh_a_hist (东方财富)
+        # symbol 需要是 6 位代码，去掉前缀
+        code = symbol[-6:]
+        try:
+            df = ak.stock_zh_a_hist(symbol=code, period=period, start_date="19900101", end_date="20500101", adjust=adjust)
             
-        else:
-            # 处理分钟数据
-            # AkShare 股票分钟接口: stock_zh_a_minute
+            # 清洗 (东方财富返回中文列名)
+            df.rename(columns={
+                '日期': 'date',
+                '开盘': 'Open',
+                '最高': 'High',
+                '最低': 'Low',
+                '收盘': 'Close',
+                '成交量': 'Volume'
+            }, inplace=True)
+        except Exception as e_hist:
+            print(f"东方财富接口(stock_zh_a_hist)调用失败，尝试新浪接口: {e_hist}")
+            # Fallback: AkShare 股票日线接口: stock_zh_a_daily (新浪)
             # symbol 需要带前缀
-            df = ak.stock_zh_a_minute(symbol=symbol, period=period, adjust=adjust)
+            df = ak.stock_zh_a_daily(symbol=symbol, start_date="19900101", end_date="20500101", adjust=adjust)
             
-            # 清洗
-            # 返回列: day, open, high, low, close, volume
+            # 清洗 (新浪返回英文小写列名)
             df.rename(columns={
-                'day': 'datetime',
+                'date': 'date',
                 'open': 'Open',
                 'high': 'High',
                 'low': 'Low',
                 'close': 'Close',
                 'volume': 'Volume'
             }, inplace=True)
-            
-            df['datetime'] = pd.to_datetime(df['datetime'])
-            df.set_index('datetime', inplace=True)
-            df['OpenInterest'] = 0
-
-        # 确保数值类型
-        cols = ['Open', 'High', 'Low', 'Close', 'Volume', 'OpenInterest']
-        df[cols] = df[cols].apply(pd.to_numeric)
         
-        print(f"成功获取 {len(df)} 条股票数据")
+        df['date'] = pd.to_datetime(df['date'])
+        df.set_index('date', inplace=True)
+        df['OpenInterest'] = 0 # 股票无持仓量
+        
+    else:
+        # 处理分钟数据
+        # AkShare 股票分钟接口: stock_zh_a_minute
+        # symbol 需要带前缀
+        df = ak.stock_zh_a_minute(symbol=symbol, period=period, adjust=adjust)
+        
+        # 清洗
+        # 返回列: day, open, high, low, close, volume
+        df.rename(columns={
+            'day': 'datetime',
+            'open': 'Open',
+            'high': 'High',
+            'low': 'Low',
+            'close': 'Close',
+            'volume': 'Volume'
+        }, inplace=True)
+        
+        df['datetime'] = pd.to_datetime(df['datetime'])
+        df.set_index('datetime', inplace=True)
+        df['OpenInterest'] = 0
+
+    # 确保数值类型
+    cols = ['Open', 'High', 'Low', 'Close', 'Volume', 'OpenInterest']
+    df[cols] = df[cols].apply(pd.to_numeric)
+    
+    print(f"成功获取 {len(df)} 条股票数据")
+    return df
+
+def fetch_stock_data(symbol='sh600000', period='daily', start_date=None, end_date=None, adjust='qfq'):
+    """
+    获取股票数据
+    :param symbol: 股票代码，如 'sh600000'
+    :param period: 周期，'daily' (日线), 'weekly', 'monthly', '1', '5', '15', '30', '60' 分钟 (其他分钟数由更细周期合成)
+    :param adjust: 复权方式，'qfq' (前复权), 'hfq' (后复权), '' (不复权)
+    """
+    df = None
+    try:
+        df, base = series_cache.load(('stock', adjust, symbol), period, start_date,
+                                     lambda p: _download_stock_series(symbol, p, adjust))
 
         # 日期过滤
         if df is not None and not df.empty:
@@ -97,6 +108,11 @@ def fetch_stock_data(symbol='sh600000', period='daily', start_date=None, end_dat
                 print(f"错误: {error_msg}")
                 raise ValueError(error_msg)
 
+        # 先过滤再合成，与直接请求该周期的结果一致 (如区间首尾的周线只包含区间内的交易日)
+        if base != period:
+            df = resample_bars(df, period, base)
+            print(f"由 {base} 数据合成 {len(df)} 条 {period} 数据")
+
         return df
 
     except Exception as e:
@@ -105,179 +121,120 @@ def fetch_stock_data(symbol='sh600000', period='daily', start_date=None, end_dat
         traceback.print_exc()
         return None
 
+def slice_dates(df, start_date=None, end_date=None):
+    """
+    按日期截取已获取的数据，规则与 fetch_data 一致 (end_date 当天全部包含)
+    """
+    if df is None or df.empty:
+        return df
+    lo = df.index.searchsorted(pd.to_datetime(start_date)) if start_date else 0
+    hi = df.index.searchsorted(pd.to_datetime(end_date) + pd.Timedelta(days=1)) if end_date else len(df)
+    if lo >= hi:
+        raise ValueError(f"日期过滤后无数据。可用范围: {df.index.min()} 至 {df.index.max()}")
+    return df.iloc[lo:hi]
+
 def fetch_data(symbol, period='5', market_type='futures', start_date=None, end_date=None, data_source='main'):
     if market_type == 'stock':
         return fetch_stock_data(symbol, period, start_date, end_date)
     else:
         return fetch_futures_data(symbol, period, start_date, end_date, data_source)
 
+def _download_futures_series(symbol, period='5', data_source='main'):
+    """
+    从 AkShare 下载期货数据并清洗 (不按日期过滤，由 series_cache 缓存)
+    :param period: 'daily' 或 '1', '5', '15', '30', '60' 分钟
+    :return: DataFrame；加权数据不存在时返回 None
+    """
+    print(f"正在从 AkShare 获取期货({symbol}) {period} 数据 (Source: {data_source})...")
+
+    if period == 'daily':
+        # AkShare 获取期货日线数据接口: futures_zh_daily_sina
+        if data_source == 'weighted':
+            # 加权代码 (888/13/Index...) 的解析结果有持久化缓存，命中时只请求一次
+            fetch_symbol, df = weighted_daily_aliases.fetch(symbol, lambda code: ak.futures_zh_daily_sina(symbol=code))
+            if fetch_symbol is None:
+                return None
+        else:
+            df = ak.futures_zh_daily_sina(symbol=symbol)
+        
+        # 数据清洗和格式化
+        # 返回列：date, open, high, low, close, volume, hold, settle
+        df['date'] = pd.to_datetime(df['date'])
+        df.set_index('date', inplace=True)
+        
+        # 转换列名为 Backtrader 标准
+        df.rename(columns={
+            'open': 'Open',
+            'high': 'High',
+            'low': 'Low',
+            'close': 'Close',
+            'volume': 'Volume',
+            'hold': 'OpenInterest'
+        }, inplace=True)
+        
+        # 确保是数值类型
+        cols = ['Open', 'High', 'Low', 'Close', 'Volume', 'OpenInterest']
+        df[cols] = df[cols].apply(pd.to_numeric)
+        
+        print(f"成功获取 {len(df)} 条日线数据")
+        
+    else:
+        # 处理分钟数据请求
+        # AkShare 获取期货分钟数据接口: futures_zh_minute_sina
+        if data_source == 'weighted':
+            fetch_symbol, df = weighted_minute_aliases.fetch(symbol, lambda code: ak.futures_zh_minute_sina(symbol=code, period=period))
+            if fetch_symbol is None:
+                return None
+        else:
+            df = ak.futures_zh_minute_sina(symbol=symbol, period=period)
+        
+        # 2. 数据清洗和格式化
+        # 返回列：datetime, open, high, low, close, volume, hold
+        df['datetime'] = pd.to_datetime(df['datetime'])
+        df.set_index('datetime', inplace=True)
+        
+        # 转换列名为 Backtrader 标准
+        df.rename(columns={
+            'open': 'Open',
+            'high': 'High',
+            'low': 'Low',
+            'close': 'Close',
+            'volume': 'Volume',
+            'hold': 'OpenInterest' # 持仓量
+        }, inplace=True)
+        
+        # 确保是数值类型
+        cols = ['Open', 'High', 'Low', 'Close', 'Volume', 'OpenInterest']
+        df[cols] = df[cols].apply(pd.to_numeric)
+        
+        print(f"成功获取 {len(df)} 条分钟数据")
+
+    return df
+
 def fetch_futures_data(symbol='LH0', period='5', start_date=None, end_date=None, data_source='main'):
     """
     获取期货数据
     :param symbol: 合约代码
-    :param period: 周期
+    :param period: 周期 ('daily', 'weekly', 'monthly', '1', '5', '15', '30', '60'，其他分钟数由更细周期合成)
     :param start_date: 开始日期
     :param end_date: 结束日期
     :param data_source: 数据来源 'main' (主力连续), 'weighted' (加权/指数)
     :return: DataFrame
     """
-    # 处理加权/指数数据源
     fetch_symbol = symbol
     if data_source == 'weighted':
-        # 尝试将主力合约代码转换为加权代码
-        # 用户反馈：加权一般是888 (如 SH888)
-        # 之前的逻辑是 13，现在优先尝试 888
-        if symbol.endswith('0'):
-            fetch_symbol = symbol.replace('0', '888')
-        elif symbol.endswith('888'):
-            fetch_symbol = symbol
-        else:
-            fetch_symbol = symbol + '888'
-        print(f"请求加权数据，转换代码: {symbol} -> {fetch_symbol}")
+        print(f"请求加权数据: {symbol}")
 
-    print(f"正在从 AkShare 获取期货({fetch_symbol}) {period} 数据 (Source: {data_source})...")
-    
     df = None
     try:
-        # 处理周线数据请求 (通过日线 Resample)
-        if period == 'weekly':
-            print("周线数据：正在获取日线数据并进行重采样...")
-            df_daily = fetch_futures_data(symbol=symbol, period='daily', start_date=start_date, end_date=end_date, data_source=data_source)
-            
-            if df_daily is not None and not df_daily.empty:
-                # Resample logic
-                # Rule: W-FRI means weekly frequency ending on Friday
-                logic = {
-                    'Open': 'first',
-                    'High': 'max',
-                    'Low': 'min',
-                    'Close': 'last',
-                    'Volume': 'sum',
-                    'OpenInterest': 'last'
-                }
-                # 使用 'W-FRI' 以匹配国内期货交易周习惯 (周五结束)
-                # 注意：如果数据中有周六日交易（极少），可能会归到下一周
-                df = df_daily.resample('W-FRI').agg(logic)
-                df.dropna(inplace=True) # 去除可能产生的空行
-                print(f"成功将日线数据重采样为 {len(df)} 条周线数据")
-                return df
-            else:
-                return None
+        # 同一品种的各周期共用一份下载: 周线/月线由日线合成，分钟周期优先由已缓存的更细周期合成
+        df, base = series_cache.load(('futures', data_source, symbol), period, start_date,
+                                     lambda p: _download_futures_series(symbol, p, data_source))
 
-        # 处理日线数据请求
-        if period == 'daily':
-            # AkShare 获取期货日线数据接口: futures_zh_daily_sina
-            try:
-                df = ak.futures_zh_daily_sina(symbol=fetch_symbol)
-            except Exception as e_weighted:
-                if data_source == 'weighted':
-                    print(f"加权数据({fetch_symbol})获取失败: {e_weighted}")
-                    print(f"尝试其他加权代码格式 (如 13, Index)...")
-                    alternatives = []
-                    base_symbol = symbol.rstrip('0') if symbol.endswith('0') else symbol.replace('888', '')
-                    
-                    # 尝试列表
-                    alternatives.append(f"{base_symbol}13")      # 旧版加权/指数
-                    alternatives.append(f"{base_symbol}Index")   # 指数
-                    alternatives.append(f"{base_symbol}88")      # 其他可能
-                    alternatives.append(f"{base_symbol}99")      # 其他可能
-                    alternatives.append(f"{base_symbol}0")       # 主力 (作为最后尝试，但通常走fallback逻辑)
-                    
-                    found = False
-                    for alt in alternatives:
-                        try:
-                            if alt == fetch_symbol: continue
-                            print(f"尝试: {alt}")
-                            df = ak.futures_zh_daily_sina(symbol=alt)
-                            if df is not None and not df.empty:
-                                print(f"成功获取替代代码: {alt}")
-                                found = True
-                                break
-                        except:
-                            continue
-                    
-                    if not found:
-                        print(f"未找到 {symbol} 的有效加权/指数数据，自动回退到主力连续数据源。")
-                        return fetch_futures_data(symbol=symbol, period=period, start_date=start_date, end_date=end_date, data_source='main')
-                else:
-                    raise e_weighted
-            
-            # 数据清洗和格式化
-            # 返回列：date, open, high, low, close, volume, hold, settle
-            df['date'] = pd.to_datetime(df['date'])
-            df.set_index('date', inplace=True)
-            
-            # 转换列名为 Backtrader 标准
-            df.rename(columns={
-                'open': 'Open',
-                'high': 'High',
-                'low': 'Low',
-                'close': 'Close',
-                'volume': 'Volume',
-                'hold': 'OpenInterest'
-            }, inplace=True)
-            
-            # 确保是数值类型
-            cols = ['Open', 'High', 'Low', 'Close', 'Volume', 'OpenInterest']
-            df[cols] = df[cols].apply(pd.to_numeric)
-            
-            print(f"成功获取 {len(df)} 条日线数据")
-            
-        else:
-            # 处理分钟数据请求
-            # AkShare 获取期货分钟数据接口: futures_zh_minute_sina
-            try:
-                df = ak.futures_zh_minute_sina(symbol=fetch_symbol, period=period)
-            except Exception as e_weighted:
-                if data_source == 'weighted':
-                    print(f"加权分钟数据({fetch_symbol})获取失败: {e_weighted}")
-                    alternatives = []
-                    base_symbol = symbol.rstrip('0') if symbol.endswith('0') else symbol.replace('888', '')
-                    
-                    alternatives.append(f"{base_symbol}13")
-                    alternatives.append(f"{base_symbol}Index")
-                    alternatives.append(f"{base_symbol}88")
-                    alternatives.append(f"{base_symbol}99")
-                    
-                    found = False
-                    for alt in alternatives:
-                        try:
-                            if alt == fetch_symbol: continue
-                            print(f"尝试分钟数据: {alt}")
-                            df = ak.futures_zh_minute_sina(symbol=alt, period=period)
-                            if df is not None and not df.empty:
-                                print(f"成功获取替代代码: {alt}")
-                                found = True
-                                break
-                        except:
-                            continue
-                    
-                    if not found:
-                        print(f"未找到 {symbol} 的有效加权/指数分钟数据，自动回退到主力连续数据源。")
-                        return fetch_futures_data(symbol=symbol, period=period, start_date=start_date, end_date=end_date, data_source='main')
-                else:
-                    raise e_weighted
-            
-            # 2. 数据清洗和格式化
-            # 返回列：datetime, open, high, low, close, volume, hold
-            df['datetime'] = pd.to_datetime(df['datetime'])
-            df.set_index('datetime', inplace=True)
-            
-            # 转换列名为 Backtrader 标准
-            df.rename(columns={
-                'open': 'Open',
-                'high': 'High',
-                'low': 'Low',
-                'close': 'Close',
-                'volume': 'Volume',
-                'hold': 'OpenInterest' # 持仓量
-            }, inplace=True)
-            
-            # 确保是数值类型
-            cols = ['Open', 'High', 'Low', 'Close', 'Volume', 'OpenInterest']
-            df[cols] = df[cols].apply(pd.to_numeric)
-            
-            print(f"成功获取 {len(df)} 条分钟数据")
+        if df is None and data_source == 'weighted':
+            kind = "" if base == 'daily' else "分钟"
+            print(f"未找到 {symbol} 的有效加权/指数{kind}数据，自动回退到主力连续数据源。")
+            return fetch_futures_data(symbol=symbol, period=period, start_date=start_date, end_date=end_date, data_source='main')
             
         # 日期过滤
         if df is not None and not df.empty:
@@ -296,6 +253,11 @@ def fetch_futures_data(symbol='LH0', period='5', start_date=None, end_date=None,
                 error_msg = f"日期过滤后无数据。可用范围: {data_start} 至 {data_end}，请求范围: {start_date} 至 {end_date}。分钟数据通常仅提供近期历史。"
                 print(f"错误: {error_msg}")
                 raise ValueError(error_msg)
+
+        # 先过滤再合成 (周线首尾只包含区间内的交易日，与原先先取日线再重采样一致)
+        if base != period and df is not None:
+            df = resample_bars(df, period, base)
+            print(f"由 {base} 数据合成 {len(df)} 条 {period} 数据")
         
         return df
         
@@ -320,6 +282,20 @@ def fetch_futures_data(symbol='LH0', period='5', start_date=None, end_date=None,
             print(f"获取日线数据也失败: {e2}")
             return None
 
+def publish_data(store, symbol, period='5', market_type='futures', start_date=None, end_date=None, data_source='main'):
+    """
+    获取数据并发布到共享内存 (core.bar_store.SharedBarStore)，同一序列只获取和复制一次
+    :return: BarSpec，子进程用 bar_store.attach(spec) 零拷贝读取；无数据时返回 None
+    """
+    key = (market_type, data_source, symbol, period, start_date, end_date)
+    spec = store.get(key)
+    if spec is None:
+        df = fetch_data(symbol, period, market_type, start_date, end_date, data_source)
+        if df is None or df.empty:
+            return None
+        spec = store.publish(key, df)
+    return spec
+
 def fetch_lh_data(period='5', adjust='0'):
     return fetch_futures_data(symbol='LH0', period=period)
 
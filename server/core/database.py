@@ -1,25 +1,56 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, Text
+from sqlalchemy import create_engine, event, insert, text, Column, Integer, String, Float, DateTime, JSON, Text, LargeBinary, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship, deferred
+from sqlalchemy.schema import CreateTable
 import datetime
 import os
+from .serialization import pack, unpack
 
 # 数据库文件路径
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "quant.db")
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    # timeout: 写锁被占用时等待 (秒)，而不是立即报 database is locked
+    connect_args={"check_same_thread": False, "timeout": 30},
+    # 多个并发请求 (用户保存 + 优化结果保存) 各自持有连接
+    pool_size=10,
+    max_overflow=20,
+    pool_timeout=30,
+    pool_pre_ping=True,
 )
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    """
+    每个新连接的 SQLite 调优
+    - WAL: 读写互不阻塞，并发写入排队而不是互相等待整个库
+    - synchronous=NORMAL: WAL 模式下安全且比 FULL 少一次 fsync
+    - foreign_keys: 删除记录时级联删除 backtest_details
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 class BacktestRecord(Base):
     __tablename__ = "backtest_records"
+    __table_args__ = (
+        # 历史列表: WHERE has_detail = 1 ORDER BY timestamp
+        Index("ix_backtest_records_has_detail_timestamp", "has_detail", "timestamp"),
+        # 按品种/策略/周期查询
+        Index("ix_backtest_records_symbol_strategy_period", "symbol", "strategy_name", "period"),
+        # 禁止 SQLite 复用已删除的 id，避免客户端缓存的 /api/backtest/{id} 指向新记录
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime, default=datetime.datetime.now)
+    timestamp = Column(DateTime, default=datetime.datetime.now, index=True)
     symbol = Column(String, index=True)
     period = Column(String)
     strategy_name = Column(String, default="TrendFollowingStrategy")
@@ -38,10 +69,231 @@ class BacktestRecord(Base):
     win_rate = Column(Float)
     
     # 标记是否为自动优化的结果
-    is_optimized = Column(Integer, default=0) # 0: 原始, 1: 优化后
+    is_optimized = Column(Integer, default=0) # 0: 原始, 1: 优化后, 2: 优化过程中的试验
+
+    # 完整的回测结果数据 (旧版未压缩存储，新记录写入 backtest_details)
+    # 延迟加载: 仅在访问该属性时才读取
+    detail_data = deferred(Column(JSON))
+
+    # 是否保存了完整结果 (0: 否, 1: 是)
+    has_detail = Column(Integer, default=0)
+
+    # 压缩后的完整结果，仅在访问时加载
+    detail_blob = relationship("BacktestDetail", uselist=False, lazy="select", cascade="all, delete-orphan")
+
+class BacktestDetail(Base):
+    """
+    回测完整结果 (K线、均线、MACD、日志等) 的压缩存储
+    与 BacktestRecord 分表，避免列表查询读取大字段
+    """
+    __tablename__ = "backtest_details"
+
+    record_id = Column(Integer, ForeignKey("backtest_records.id", ondelete="CASCADE"), primary_key=True)
+    codec = Column(String, default="zlib+json")
+    payload = Column(LargeBinary)
+
+class SymbolAlias(Base):
+    """
+    品种代码别名解析结果 (如加权数据: SH -> SH888 / SH13 / 无)
+    resolved 为空表示该品种没有可用的别名 (负缓存)
+    """
+    __tablename__ = "symbol_aliases"
+
+    variety = Column(String, primary_key=True)
+    source = Column(String, primary_key=True)
+    resolved = Column(String, nullable=True)
+    checked_at = Column(DateTime, default=datetime.datetime.now)
+
+class StockSymbol(Base):
+    """
+    A股代码列表 (带交易所前缀)，作为代码索引的本地持久化，定时从 AkShare 刷新
+    """
+    __tablename__ = "stock_symbols"
+
+    code = Column(String, primary_key=True)
+    name = Column(String)
+    seq = Column(Integer, index=True) # 数据源中的原始顺序
+    updated_at = Column(DateTime, default=datetime.datetime.now)
+
+class ScheduledScan(Base):
+    """
+    收盘后定时运行的扫描配置 (批量分析 / 开仓信号扫描)
+    """
+    __tablename__ = "scheduled_scans"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, default="batch") # batch: 批量分析持仓状态, scan: 最近 scan_window 根 K 线的开仓信号
+    strategy_name = Column(String, default="TrendFollowingStrategy")
+    period = Column(String)
+    market_type = Column(String, default="futures")
+    symbols = Column(JSON)
+    strategy_params = Column(JSON)
+    scan_window = Column(Integer, nullable=True)
+    enabled = Column(Integer, default=1)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+class StrategyScanResult(Base):
+    """
+    定时扫描的物化结果，每个品种一行
+    payload 为该品种结果的 JSON 原文，读取时直接拼接返回，不再解析/序列化
+    """
+    __tablename__ = "strategy_scan_results"
+    __table_args__ = (
+        # 按配置读取某个交易日的结果；同一配置同一交易日重新运行时整体替换
+        Index("ix_strategy_scan_results_scan_date", "scan_id", "trade_date", "symbol", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    scan_id = Column(Integer, ForeignKey("scheduled_scans.id", ondelete="CASCADE"))
+    kind = Column(String)
+    strategy_name = Column(String)
+    period = Column(String)
+    market_type = Column(String)
+    trade_date = Column(String) # 结果对应的交易日 (YYYY-MM-DD)
+    symbol = Column(String)
+    seq = Column(Integer) # 在配置品种列表中的顺序
+    payload = Column(LargeBinary)
+    computed_at = Column(DateTime, default=datetime.datetime.now)
+
+def set_detail(record, data):
+    """
+    压缩保存回测完整结果
+    """
+    codec, payload = pack(data)
+    record.detail_blob = BacktestDetail(codec=codec, payload=payload)
+    record.detail_data = None
+    record.has_detail = 1
+
+def get_detail(record):
+    """
+    读取回测完整结果 (兼容未迁移的旧版 detail_data 列)
+    """
+    if record.detail_blob is not None:
+        return unpack(record.detail_blob.codec, record.detail_blob.payload)
+    return record.detail_data
+
+def record_fields_from_result(symbol, period, strategy_name, strategy_params, metrics, is_optimized=0):
+    """
+    从回测结果 metrics 构建 BacktestRecord 字段
+    """
+    initial_cash = metrics['initial_cash']
+    net_profit = metrics['net_profit']
+    return {
+        "symbol": symbol,
+        "period": period,
+        "strategy_name": strategy_name,
+        "strategy_params": strategy_params,
+        "initial_cash": initial_cash,
+        "final_value": metrics['final_value'],
+        "net_profit": net_profit,
+        "return_rate": (net_profit / initial_cash) * 100 if initial_cash else None,
+        "sharpe_ratio": metrics.get('sharpe_ratio'),
+        "max_drawdown": metrics.get('max_drawdown'),
+        "total_trades": metrics.get('total_trades'),
+        "win_rate": metrics.get('win_rate'),
+        "is_optimized": is_optimized,
+        "has_detail": 0,
+        "timestamp": datetime.datetime.now(),
+    }
+
+class RecordBuffer:
+    """
+    缓冲待保存的 BacktestRecord (基准结果、优化结果、优化试验等)
+    flush 时在一个事务中批量插入，避免每条记录各自 add/commit/refresh
+    """
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.rows = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, **fields):
+        self.rows.append(fields)
+
+    def add_result(self, symbol, period, strategy_name, strategy_params, metrics, is_optimized=0):
+        self.rows.append(record_fields_from_result(symbol, period, strategy_name, strategy_params, metrics, is_optimized))
+
+    def flush(self):
+        """
+        批量写入并清空缓冲区，返回写入条数
+        可作为 BackgroundTasks 任务在响应返回后执行
+        """
+        if not self.rows:
+            return 0
+        rows, self.rows = self.rows, []
+        db = self.session_factory()
+        try:
+            db.execute(insert(BacktestRecord), rows)
+            db.commit()
+            return len(rows)
+        except Exception as e:
+            db.rollback()
+            print(f"批量保存回测记录失败 ({len(rows)} 条): {e}")
+            raise
+        finally:
+            db.close()
+
+def ensure_indexes(bind=engine):
+    """
+    为已有数据库补建索引 (create_all 不会修改已存在的表)
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+def upgrade_schema(bind=engine):
+    """
+    为旧版数据库补充列 (create_all 不会修改已存在的表)
+    - has_detail: 旧记录的完整结果仍在 detail_data 列 (未运行 migrate_db.py 压缩转存)，标记为有详情，
+      历史列表按 has_detail 过滤时不会丢失这些记录
+    - 删除不再使用的 ix_strategy_scan_results_lookup (结果只按 scan_id 读取)
+    """
+    with bind.connect() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_strategy_scan_results_lookup"))
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(backtest_records)")).fetchall()}
+        if 'has_detail' not in columns:
+            print("backtest_records 增加 has_detail 列")
+            conn.execute(text("ALTER TABLE backtest_records ADD COLUMN has_detail INTEGER DEFAULT 0"))
+        if 'detail_data' in columns:
+            conn.execute(text(
+                "UPDATE backtest_records SET has_detail = 1 WHERE detail_data IS NOT NULL AND (has_detail IS NULL OR has_detail = 0)"
+            ))
+        conn.commit()
+    if not has_autoincrement(bind):
+        print("提示: backtest_records 可能复用已删除记录的 id (被缓存的 /api/backtest/{id} 会指向新记录)，请运行 migrate_db.py 重建该表")
+
+def has_autoincrement(bind=engine):
+    with bind.connect() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'backtest_records'")).scalar()
+    return sql is None or 'AUTOINCREMENT' in sql.upper()
 
-    # 完整的回测结果数据
-    detail_data = Column(JSON) 
+def rebuild_with_autoincrement(bind=engine):
+    """
+    按当前模型重建 backtest_records (AUTOINCREMENT)，禁止 SQLite 复用已删除的 id
+    sqlite_autoincrement 只在建表时生效，旧库需要重建: 新建表 -> 复制 -> 删除旧表 -> 重命名
+    重建期间关闭外键约束，删除旧表时不会级联删除 backtest_details
+    :return: 是否重建
+    """
+    if has_autoincrement(bind):
+        return False
+    table = BacktestRecord.__table__
+    create_sql = str(CreateTable(table).compile(bind)).replace(f"CREATE TABLE {table.name}", f"CREATE TABLE {table.name}_new", 1)
+    with bind.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        old_columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table.name})")).fetchall()}
+        columns = ", ".join(c.name for c in table.columns if c.name in old_columns)
+        conn.execute(text(create_sql))
+        conn.execute(text(f"INSERT INTO {table.name}_new ({columns}) SELECT {columns} FROM {table.name}"))
+        conn.execute(text(f"DROP TABLE {table.name}"))
+        conn.execute(text(f"ALTER TABLE {table.name}_new RENAME TO {table.name}"))
+        conn.commit()
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+    # 旧表的索引随表删除，重新创建
+    ensure_indexes(bind)
+    return True
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    ensure_indexes(engine)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+
+def ohlcv_buckets(df, bounds):
+    """
+    K 线按区间合并: 开盘取首根、收盘取末根、最高/最低取极值、成交量求和
+    :return: 以区间首根 K 线时间为索引的 DataFrame
+    """
+    starts = bounds[:-1]
+    ends = bounds[1:] - 1
+    result = pd.DataFrame(index=df.index[starts])
+    result['Open'] = df['Open'].to_numpy()[starts]
+    result['Close'] = df['Close'].to_numpy()[ends]
+    result['High'] = np.maximum.reduceat(df['High'].to_numpy(), starts)
+    result['Low'] = np.minimum.reduceat(df['Low'].to_numpy(), starts)
+    if 'Volume' in df.columns:
+        result['Volume'] = np.add.reduceat(df['Volume'].to_numpy(dtype=np.float64), starts)
+    return result
+
+
+def lttb_bounds(n, max_points):
+    """
+    LTTB 的区间划分: 首尾各单独成一个区间，中间 n-2 个点均分为 max_points-2 个区间
+    :return: 区间起始位置数组 (长度 = 区间数 + 1，最后一个元素为 n)
+    """
+    max_points = max(int(max_points), 3)
+    if n <= max_points:
+        return np.arange(n + 1)
+    inner = 1 + np.linspace(0, n - 2, max_points - 1).astype(np.int64)
+    return np.unique(np.concatenate(([0], inner, [n])))
+
+
+def lttb_indices(values, bounds):
+    """
+    Largest-Triangle-Three-Buckets: 每个区间选出与 "上一个选中点" 和 "下一区间均值点" 构成三角形面积最大的点
+    比取区间末尾值更能保留尖峰和拐点；NaN (指标预热期) 不参与选择
+    :return: 每个区间选中的位置 (长度 = 区间数)
+    """
+    y = np.asarray(values, dtype=np.float64)
+    starts = bounds[:-1]
+    count = len(starts)
+    if count == len(y):
+        return np.arange(len(y))
+
+    valid = ~np.isnan(y)
+    sizes = np.add.reduceat(valid.astype(np.int64), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_y = np.add.reduceat(np.where(valid, y, 0.0), starts) / sizes
+    avg_x = (starts + bounds[1:] - 1) / 2.0
+
+    selected = np.empty(count, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = len(y) - 1
+    prev = 0
+    for i in range(1, count - 1):
+        lo, hi = bounds[i], bounds[i + 1]
+        px, py = float(prev), y[prev]
+        ax, ay = avg_x[i + 1], avg_y[i + 1]
+        if np.isnan(py) or np.isnan(ay):
+            # 预热期没有可比较的三角形，取区间内最后一个有效值
+            seg = valid[lo:hi]
+            j = lo + (len(seg) - 1 - int(np.argmax(seg[::-1])) if seg.any() else len(seg) - 1)
+        else:
+            xs = np.arange(lo, hi, dtype=np.float64)
+            area = np.abs((px - ax) * (y[lo:hi] - py) - (px - xs) * (ay - py))
+            j = lo + int(np.argmax(np.where(valid[lo:hi], area, -1.0)))
+        selected[i] = j
+        prev = j
+    return selected
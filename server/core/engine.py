@@ -3,17 +3,113 @@ import pandas as pd
 import numpy as np
 import datetime
 import importlib
-from .data_loader import fetch_data
+from .data_loader import fetch_data, slice_dates
+from .feeds import NumpyData
+from .spill import SpillArray, SpillList
+from .downsample import lttb_indices
+from .chart import build_kline_data, chart_bounds, downsample_equity, view_range
+from .warmup import strategy_lookback, warmup_start
+from .panel import has_vector_signals
+from .scan_state import incremental_books, scan_start
+from .profiling import StageTimer, stage_stats, profile_call, PROFILE_MODES
 from . import strategy
 
-class StrategyData(bt.feeds.PandasData):
+class StrategyData(NumpyData):
+    # 预计算的均线列 (df['ma_fast'] / df['ma_slow'])，按列名自动匹配
     lines = ('ma_fast', 'ma_slow',)
-    params = (
-        ('ma_fast', 'ma_fast'),
-        ('ma_slow', 'ma_slow'),
-    )
+
+# 批量分析/信号扫描只关心最终持仓和订单，不需要权益曲线和图表
+# - stdstats=False: 不添加 Broker/BuySell/Trades 观察者 (每根 K 线都要更新)
+# - preload + runonce: 数据一次性载入，指标按整列向量化计算
+# 注意 exactbars 会强制关闭 runonce，实测在这些路径上反而更慢且峰值内存没有下降，因此不开启
+BATCH_CEREBRO_PROFILE = {"stdstats": False, "preload": True, "runonce": True}
+
+# 超过该 K 线数时 run() 自动使用低内存模式 (约 3 年 5 分钟线 / 1 年 1 分钟线)
+LOW_MEMORY_BARS = 300000
+# 低内存模式下返回给前端的图表最大点数 (未指定 chart_points 时)
+CHART_MAX_POINTS = 5000
+
+class EquitySpill(bt.Analyzer):
+    """
+    逐根 K 线记录 [时间, 账户权益] 到临时文件 (低内存模式下替代 TimeReturn 的内存字典)
+    """
+    def start(self):
+        self.spill = SpillArray(2)
+
+    def next(self):
+        self.spill.append(self.data.datetime[0], self.strategy.broker.getvalue())
+
+    def get_analysis(self):
+        return self.spill
+
+def spilled_equity_curve(rows, initial_cash, start_dt=None, end_dt=None, max_points=CHART_MAX_POINTS):
+    """
+    从 EquitySpill 记录构建权益曲线: 按 [start_dt, end_dt) 过滤并用 LTTB 降采样到 max_points 个点
+    :return: (equity_curve, 窗口开始前最后一个权益值或 None)
+    """
+    dtnums = rows[:, 0]
+    values = rows[:, 1]
+    lo = int(np.searchsorted(dtnums, bt.date2num(start_dt), side='left')) if start_dt is not None else 0
+    hi = int(np.searchsorted(dtnums, bt.date2num(end_dt), side='left')) if end_dt is not None else len(values)
+    pre_value = float(values[lo - 1]) if start_dt is not None and lo > 0 else None
+    if hi <= lo:
+        return [], pre_value
+
+    bounds = chart_bounds(hi - lo, max_points)
+    points = lo + (lttb_indices(values[lo:hi], bounds) if bounds is not None else np.arange(hi - lo))
+    equity_curve = []
+    prev = float(values[lo - 1]) if lo > 0 else initial_cash
+    for i in points:
+        value = float(values[i])
+        equity_curve.append({
+            "date": bt.num2date(dtnums[i]).strftime("%Y-%m-%d %H:%M:%S"),
+            "value": value,
+            "return": value / prev - 1.0 if prev else 0.0 # 相对上一个选中点的收益率
+        })
+        prev = value
+    return equity_curve, pre_value
+
+# 清理 NaN 和 Inf (JSON 不支持)
+def clean_data(obj):
+    if isinstance(obj, float):
+        if pd.isna(obj) or np.isinf(obj):
+            return None
+        return obj
+    elif isinstance(obj, dict):
+        return {k: clean_data(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [clean_data(v) for v in obj]
+    elif isinstance(obj, (np.int64, np.int32)):
+        return int(obj)
+    elif isinstance(obj, (np.float64, np.float32)):
+        if pd.isna(obj) or np.isinf(obj):
+            return None
+        return float(obj)
+    return obj
 
 class BacktestEngine:
+    def _batch_cerebro(self, use_optimal_entry=False, contract_multiplier=10):
+        """
+        创建批量分析/信号扫描使用的 Cerebro
+        """
+        cerebro = bt.Cerebro(**BATCH_CEREBRO_PROFILE)
+        if use_optimal_entry:
+            cerebro.broker.set_coo(True)
+        # 设置初始资金 (足够大以避免margin问题)
+        cerebro.broker.setcash(10000000.0)
+        # 设置手续费
+        cerebro.broker.setcommission(commission=0.0001, margin=0.0, mult=int(contract_multiplier))
+        return cerebro
+
+    def _quiet_params(self, StrategyClass, params):
+        """
+        批量路径默认关闭策略日志 (逐笔 print 在扫描全市场时开销明显)
+        """
+        params = dict(params)
+        if hasattr(StrategyClass, 'params') and hasattr(StrategyClass.params, 'print_log'):
+            params.setdefault('print_log', False)
+        return params
+
     def _filter_params(self, StrategyClass, params):
         """
         根据策略类定义过滤参数，防止传入多余参数导致报错
@@ -29,7 +125,39 @@ class BacktestEngine:
         
         return valid_params
 
-    def run(self, symbol, period, strategy_params, initial_cash=1000000.0, start_date=None, end_date=None, strategy_name='TrendFollowingStrategy', market_type='futures', data_source='main'):
+    def run(self, symbol, period, strategy_params, initial_cash=1000000.0, start_date=None, end_date=None, strategy_name='TrendFollowingStrategy', market_type='futures', data_source='main', low_memory=None, chart_points=None, data=None, timing=False, profile=None):
+        """
+        :param timing: 在结果中返回各阶段耗时 result['timing'] (无论是否开启，都会累计到 stage_stats)
+        :param profile: 性能分析模式 ('cprofile' / 'pyinstrument')，报告返回在 result['profile']
+        其余参数见 _run
+        """
+        if profile is not None and profile not in PROFILE_MODES:
+            return {"error": f"未知的性能分析模式: {profile}"}
+        timer = StageTimer()
+        call = lambda: self._run(symbol, period, strategy_params, initial_cash, start_date, end_date, strategy_name,
+                                 market_type, data_source, low_memory, chart_points, data, timer)
+        if profile:
+            result, report = profile_call(profile, call)
+        else:
+            result = call()
+        stage_stats.record(timer.stages, prefix='run.')
+        if "error" not in result:
+            if timing:
+                result['timing'] = timer.as_dict()
+            if profile:
+                result['profile'] = report
+        return result
+
+    def _run(self, symbol, period, strategy_params, initial_cash, start_date, end_date, strategy_name, market_type, data_source, low_memory, chart_points, data, timer):
+        """
+        :param timer: StageTimer，记录下载、预处理、均线预计算、Cerebro 运行、结果提取、过滤、图表、clean_data 各阶段耗时
+        :param data: 预先获取的 K 线 (DataFrame，可以比回测区间长)，提供时不再调用 fetch_data，
+                     按预热开始日期和 end_date 截取使用 (walk-forward 等多次回测复用同一序列)
+        :param low_memory: 低内存模式 (exactbars=1 滚动缓冲、权益曲线和交易记录写入临时文件、图表数据降采样)
+                           None 表示数据超过 LOW_MEMORY_BARS 根时自动开启
+        :param chart_points: 图表最大点数 (一般为图表像素宽度)，超过时 K 线按区间合并、指标线和权益曲线用 LTTB 降采样
+                             None 表示返回全部 K 线 (低内存模式下为 CHART_MAX_POINTS)
+        """
         print("DEBUG: Engine.run called with Modified Code")
         # 强制重载策略模块，确保使用最新代码
         importlib.reload(strategy)
@@ -51,7 +179,8 @@ class BacktestEngine:
             def __init__(self, *args, **kwargs):
                 super(LoggingStrategy, self).__init__(*args, **kwargs)
                 self.logs = []
-                self.trades_history = []
+                # 低内存模式下交易记录写入临时文件
+                self.trades_history = SpillList() if low_memory else []
                 self.exec_start_dt = None  # 执行窗口起始日期 (仅记录窗口内的日志与交易)
                 # 最大回撤点位记录 (Price, Date)
                 self.current_mdd_price = None
@@ -446,6 +575,8 @@ class BacktestEngine:
             cerebro.broker.set_coo(True)
             print("DEBUG: Optimal Entry Mode Enabled (Cheat On Open = True)")
         
+        timer.lap('setup')
+
         # 1. 加载数据
         data_warning = None
         try:
@@ -453,22 +584,11 @@ class BacktestEngine:
             # 这样可以防止因数据过短导致指标无法计算
             fetch_start_date = start_date
             if start_date:
-                warmup_days = 150
-                if 'slow_period' in strategy_params:
-                    try:
-                        slow_p = int(strategy_params['slow_period'])
-                        warmup_days = max(warmup_days, slow_p * 3)
-                    except:
-                        pass
-                
-                # 如果是周线，需要大幅增加预热天数 (一周7天，放大倍数)
-                if period == 'weekly':
-                    warmup_days = warmup_days * 7
-                    print(f"检测到周线模式，自动放大预热天数至: {warmup_days} 天")
-
-                req_dt = pd.to_datetime(start_date)
-                fetch_start_dt = req_dt - pd.Timedelta(days=warmup_days)
+                # 按策略实际的指标回看长度 (backtrader minperiod) 计算预热 K 线数，再按交易日历换算成开始日期
+                lookback = strategy_lookback(StrategyClass, self._filter_params(StrategyClass, strategy_params))
+                fetch_start_dt = warmup_start(start_date, lookback, period, market_type)
                 fetch_start_date = fetch_start_dt.strftime('%Y-%m-%d')
+                print(f"策略预热需要 {lookback} 根 {period} K 线")
                 print(f"为了指标预热，自动调整请求开始日期: {start_date} -> {fetch_start_date}")
 
             # 将 start_date 注入到策略参数中，用于严格控制交易开始时间
@@ -476,7 +596,10 @@ class BacktestEngine:
             strategy_params['start_date'] = start_date
             strategy_params['end_date'] = end_date # 注入结束日期，用于强制平仓
 
-            df_raw = fetch_data(symbol=symbol, period=period, market_type=market_type, start_date=fetch_start_date, end_date=end_date, data_source=data_source)
+            if data is not None:
+                df_raw = slice_dates(data, fetch_start_date, end_date)
+            else:
+                df_raw = fetch_data(symbol=symbol, period=period, market_type=market_type, start_date=fetch_start_date, end_date=end_date, data_source=data_source)
             
             # 检查数据是否被截断 (数据源起始时间晚于请求时间 2 天以上)
             if start_date and df_raw is not None and not df_raw.empty:
@@ -492,13 +615,23 @@ class BacktestEngine:
         except Exception as e:
             return {"error": f"数据获取失败: {str(e)}"}
             
+        timer.lap('download')
         if df_raw is None or df_raw.empty:
             return {"error": "未找到该品种的数据，请检查代码或日期范围"}
+
+        if low_memory is None:
+            low_memory = len(df_raw) > LOW_MEMORY_BARS
+        if low_memory:
+            print(f"低内存模式: {len(df_raw)} 根 K 线")
+        max_points = chart_points or (CHART_MAX_POINTS if low_memory else None)
             
         # 转换 timeframe
         if period == 'weekly':
             timeframe = bt.TimeFrame.Weeks
             compression = 1
+        elif period == 'monthly':
+            timeframe = bt.TimeFrame.Months
+            compression = 1
         elif period == 'daily':
             timeframe = bt.TimeFrame.Days
             compression = 1
@@ -509,6 +642,7 @@ class BacktestEngine:
         # 检查数据列
         if 'OpenInterest' not in df_raw.columns and 'hold' in df_raw.columns:
              df_raw.rename(columns={'hold': 'OpenInterest'}, inplace=True)
+        timer.lap('clean')
 
         # --- 预计算策略所需的 MA 数据 (支持 min_periods=1 以消除预热期) ---
         fast_p = 20
@@ -532,6 +666,7 @@ class BacktestEngine:
             # 确保没有 NaN
             df_raw['ma_fast'] = df_raw['ma_fast'].bfill()
             df_raw['ma_slow'] = df_raw['ma_slow'].bfill()
+        timer.lap('indicators')
 
         # 使用自定义 DataFeed
         data = StrategyData(dataname=df_raw, timeframe=timeframe, compression=compression)
@@ -564,18 +699,28 @@ class BacktestEngine:
         cerebro.broker.setcommission(commission=0.0001, margin=0.0, mult=strategy_params.get('contract_multiplier', 1))
         
         # 4. 添加分析器
-        cerebro.addanalyzer(
-            bt.analyzers.TimeReturn,
-            _name='timereturn',
-            timeframe=timeframe,
-            compression=compression
-        )
+        if low_memory:
+            cerebro.addanalyzer(EquitySpill, _name='equityspill')
+        else:
+            cerebro.addanalyzer(
+                bt.analyzers.TimeReturn,
+                _name='timereturn',
+                timeframe=timeframe,
+                compression=compression
+            )
         cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe', timeframe=bt.TimeFrame.Days, compression=1, riskfreerate=0.0)
         cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
         cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
         
+        timer.lap('prepare')
+
         # 5. 运行
-        results = cerebro.run(tradehistory=True)
+        if low_memory:
+            # exactbars=1: 数据、指标、观察者都只保留计算所需的最近几根
+            results = cerebro.run(tradehistory=True, exactbars=1, stdstats=False)
+        else:
+            results = cerebro.run(tradehistory=True)
+        timer.lap('cerebro')
         if not results:
             return {"error": "回测未产生结果"}
             
@@ -588,7 +733,7 @@ class BacktestEngine:
         # 6. 提取结果
         
         # 权益曲线
-        timereturns = strat.analyzers.timereturn.get_analysis()
+        timereturns = strat.analyzers.timereturn.get_analysis() if not low_memory else {}
         
         equity_curve = []
         cumulative = 1.0
@@ -649,25 +794,32 @@ class BacktestEngine:
         # 一手盈利百分数 (每手盈利金额 / 开仓价)
         # 使用累计的 (PnL / (Size * Price)) 之和
         one_hand_profit_pct = getattr(strat, 'accum_profit_pct', 0.0) * 100.0
+        timer.lap('analyzers')
 
         # 准备 K 线数据
         # 确保索引是 datetime
         # 构建前端可视窗口数据（切片到用户请求的范围）
-        df_kline = df_raw.copy()
-        
-        # 重新构建 mask
-        range_mask = pd.Series(True, index=df_kline.index)
-        
         start_dt_ts = pd.to_datetime(start_date) if start_date else None
         end_dt_ts = (pd.to_datetime(end_date) + pd.Timedelta(days=1)) if end_date else None
-        
-        if start_dt_ts:
-            range_mask = range_mask & (df_kline.index >= start_dt_ts)
-        if end_dt_ts:
-            range_mask = range_mask & (df_kline.index < end_dt_ts)
+
+        if low_memory:
+            # 按位置切片 (不复制整个 DataFrame)
+            lo = df_raw.index.searchsorted(start_dt_ts) if start_dt_ts else 0
+            hi = df_raw.index.searchsorted(end_dt_ts) if end_dt_ts else len(df_raw)
+            df_kline = df_raw.iloc[lo:hi]
+        else:
+            df_kline = df_raw.copy()
             
-        final_mask = range_mask
-        df_kline = df_kline[final_mask]
+            # 重新构建 mask
+            range_mask = pd.Series(True, index=df_kline.index)
+            
+            if start_dt_ts:
+                range_mask = range_mask & (df_kline.index >= start_dt_ts)
+            if end_dt_ts:
+                range_mask = range_mask & (df_kline.index < end_dt_ts)
+                
+            final_mask = range_mask
+            df_kline = df_kline[final_mask]
 
         if not isinstance(df_kline.index, pd.DatetimeIndex):
              # 尝试将索引转换为 datetime，或者使用 date 列
@@ -687,8 +839,18 @@ class BacktestEngine:
         pre_window_pnl = 0.0
         has_pre_window_pnl = False
         
+        if low_memory:
+            equity_spill = strat.analyzers.equityspill.get_analysis()
+            equity_curve, pre_window_value = spilled_equity_curve(
+                equity_spill.to_numpy(), initial_cash, start_dt_ts, end_dt_ts, max_points
+            )
+            equity_spill.close()
+            if pre_window_value is not None:
+                pre_window_pnl = pre_window_value - initial_cash
+                final_logs.append(f"{start_date}, --- 日志过滤窗口开始 (此前累计盈亏: {pre_window_pnl:.2f}) ---")
+
         # 尝试从 equity_curve 获取 start_date 之前的最后一条记录的盈亏
-        if start_dt_ts and equity_curve:
+        elif start_dt_ts and equity_curve:
             # equity_curve 是按时间排序的
             last_pnl = 0.0
             for eq in equity_curve:
@@ -739,10 +901,12 @@ class BacktestEngine:
                 final_trades.append(trade)
             except:
                 final_trades.append(trade)
+        if low_memory:
+            strat.trades_history.close()
                 
-        # 3. 过滤 Equity Curve
-        final_equity_curve = []
-        for eq in equity_curve:
+        # 3. 过滤 Equity Curve (低内存模式下已在 spilled_equity_curve 中过滤)
+        final_equity_curve = [] if not low_memory else equity_curve
+        for eq in (equity_curve if not low_memory else []):
             try:
                 eq_dt = pd.to_datetime(eq['date'])
                 # equity curve 通常是日频或按 bar，如果是日频，end_date 当天应包含
@@ -755,120 +919,12 @@ class BacktestEngine:
             except:
                 final_equity_curve.append(eq)
 
-        kline_data = {
-            "dates": df_kline.index.strftime('%Y-%m-%d %H:%M:%S').tolist(),
-            "values": df_kline[['Open', 'Close', 'Low', 'High']].values.tolist(),
-            "volumes": df_kline['Volume'].tolist() if 'Volume' in df_kline.columns else []
-        }
-        
-        close_series = df_kline['Close'].astype(float)
-        ma5 = close_series.rolling(window=5, min_periods=1).mean()
-        ma10 = close_series.rolling(window=10, min_periods=1).mean()
-        ma20 = close_series.rolling(window=20, min_periods=1).mean()
-        ma55 = close_series.rolling(window=55, min_periods=1).mean()
-        kline_data['ma'] = {
-            "ma5": ma5.round(2).tolist(),
-            "ma10": ma10.round(2).tolist(),
-            "ma20": ma20.round(2).tolist(),
-            "ma55": ma55.round(2).tolist()
-        }
+        if not low_memory:
+            final_equity_curve = downsample_equity(final_equity_curve, max_points)
+        timer.lap('filter')
 
-        # 策略自定义均线计算 (用于前端展示策略实际使用的均线)
-        if 'fast_period' in strategy_params:
-            try:
-                p = int(strategy_params['fast_period'])
-                # 根据 ma_type 选择 SMA 或 EMA (默认 SMA)
-                is_ema = strategy_params.get('ma_type', 'SMA').upper() == 'EMA'
-                
-                if is_ema:
-                    kline_data['ma']['strategy_fast'] = close_series.ewm(span=p, adjust=False).mean().round(2).tolist()
-                else:
-                    kline_data['ma']['strategy_fast'] = close_series.rolling(window=p, min_periods=1).mean().round(2).tolist()
-                
-                kline_data['ma']['strategy_fast_period'] = p
-                kline_data['ma']['strategy_fast_label'] = f"{'EMA' if is_ema else 'MA'}{p}"
-            except:
-                pass
-
-        if 'slow_period' in strategy_params:
-            try:
-                p = int(strategy_params['slow_period'])
-                is_ema = strategy_params.get('ma_type', 'SMA').upper() == 'EMA'
-                
-                if is_ema:
-                    kline_data['ma']['strategy_slow'] = close_series.ewm(span=p, adjust=False).mean().round(2).tolist()
-                else:
-                    kline_data['ma']['strategy_slow'] = close_series.rolling(window=p, min_periods=1).mean().round(2).tolist()
-                
-                kline_data['ma']['strategy_slow_period'] = p
-                kline_data['ma']['strategy_slow_label'] = f"{'EMA' if is_ema else 'MA'}{p}"
-            except:
-                pass
-
-        # 计算 MACD (无论策略是否使用，都计算以便前端展示)
-        try:
-            fast_period = int(strategy_params.get('macd_fast', 12))
-            slow_period = int(strategy_params.get('macd_slow', 26))
-            signal_period = int(strategy_params.get('macd_signal', 9))
-            
-            close_price = df_kline['Close'].astype(float)
-            exp1 = close_price.ewm(span=fast_period, adjust=False).mean()
-            exp2 = close_price.ewm(span=slow_period, adjust=False).mean()
-            dif = exp1 - exp2
-            dea = dif.ewm(span=signal_period, adjust=False).mean()
-            macd_hist = (dif - dea) * 2
-            
-            kline_data['macd'] = {
-                "dif": dif.fillna(0).tolist(),
-                "dea": dea.fillna(0).tolist(),
-                "hist": macd_hist.fillna(0).tolist()
-            }
-        except Exception as e:
-            print(f"MACD Calculation Error: {e}")
-            kline_data['macd'] = None
-
-        if strategy_name in ['DKXStrategy', 'DKXPartialTakeProfitStrategy', 'DKXFixedTPSLStrategy']:
-            try:
-                dkx_period = int(strategy_params.get('dkx_period', 20))
-                dkx_ma_period = int(strategy_params.get('dkx_ma_period', 10))
-                
-                mid = (3 * df_kline['Close'] + df_kline['Low'] + df_kline['Open'] + df_kline['High']) / 6.0
-                
-                # 计算 DKX (WMA)
-                # DKX = (20*MID + 19*REF(MID,1) + ... + 1*REF(MID,19)) / 210
-                dkx_values = mid.rolling(window=dkx_period).apply(
-                    lambda x: np.dot(x, np.arange(1, dkx_period + 1)) / (dkx_period * (dkx_period + 1) / 2),
-                    raw=True
-                )
-                
-                # 计算 MADKX (SMA)
-                madkx_values = dkx_values.rolling(window=dkx_ma_period).mean()
-                
-                kline_data['dkx'] = {
-                    "dkx": dkx_values.fillna(0).tolist(),
-                    "madkx": madkx_values.fillna(0).tolist()
-                }
-            except Exception as e:
-                print(f"DKX Calculation Error: {e}")
-                kline_data['dkx'] = None
-
-        # 辅助函数：清理 NaN 和 Inf
-        def clean_data(obj):
-            if isinstance(obj, float):
-                if pd.isna(obj) or np.isinf(obj):
-                    return None
-                return obj
-            elif isinstance(obj, dict):
-                return {k: clean_data(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [clean_data(v) for v in obj]
-            elif isinstance(obj, (np.int64, np.int32)):
-                return int(obj)
-            elif isinstance(obj, (np.float64, np.float32)):
-                if pd.isna(obj) or np.isinf(obj):
-                    return None
-                return float(obj)
-            return obj
+        kline_data = build_kline_data(df_kline, strategy_name, strategy_params, max_points)
+        timer.lap('chart')
 
         raw_result = {
             "status": "success",
@@ -895,7 +951,39 @@ class BacktestEngine:
             "logs": final_logs
         }
         
-        return clean_data(raw_result)
+        result = clean_data(raw_result)
+        timer.lap('clean_data')
+        return result
+
+    def chart_data(self, symbol, period, strategy_params, start_date=None, end_date=None, view_start=None, view_end=None,
+                   strategy_name='TrendFollowingStrategy', market_type='futures', data_source='main', max_points=None):
+        """
+        图表缩放: 只返回可见范围 [view_start, view_end] 内的 K 线和指标 (默认不降采样，即完整明细)
+        指标仍在整个回测区间 [start_date, end_date] 上计算，与 run() 返回的图表一致
+        """
+        try:
+            df_raw = fetch_data(symbol=symbol, period=period, market_type=market_type, start_date=start_date, end_date=end_date, data_source=data_source)
+        except ValueError as ve:
+            return {"error": str(ve)}
+        except Exception as e:
+            return {"error": f"数据获取失败: {str(e)}"}
+
+        if df_raw is None or df_raw.empty:
+            return {"error": "未找到该品种的数据，请检查代码或日期范围"}
+
+        # 与 run() 相同的回测区间切片 [start_date, end_date + 1天)
+        lo = df_raw.index.searchsorted(pd.to_datetime(start_date)) if start_date else 0
+        hi = df_raw.index.searchsorted(pd.to_datetime(end_date) + pd.Timedelta(days=1)) if end_date else len(df_raw)
+        df_kline = df_raw.iloc[lo:hi]
+
+        view = view_range(df_kline.index, view_start, view_end)
+        kline_data = build_kline_data(df_kline, strategy_name, strategy_params, max_points, view)
+        return clean_data({
+            "status": "success",
+            "kline_data": kline_data,
+            "offset": view[0], # 可见范围第一根 K 线在回测区间中的位置
+            "total": len(df_kline)
+        })
 
     def analyze_batch(self, symbols, period, strategy_params, strategy_name='TrendFollowingStrategy', market_type='futures'):
         """
@@ -974,10 +1062,47 @@ class BacktestEngine:
         use_optimal_entry = strategy_params.pop('optimal_entry', False)
         
         # 预先过滤策略参数
-        filtered_strategy_params = self._filter_params(StrategyClass, strategy_params)
+        filtered_strategy_params = self._quiet_params(StrategyClass, self._filter_params(StrategyClass, strategy_params))
         
-        # 默认回测最近1年数据，确保指标计算充分
-        start_date = (datetime.datetime.now() - datetime.timedelta(days=365)).strftime('%Y-%m-%d')
+        # 默认回测最近1年数据 (从月初开始，一个月内起点不变，可以从检查点继续)，确保指标计算充分
+        start_date = scan_start(365)
+
+        def analyze_one(symbol, df):
+            cerebro = self._batch_cerebro(use_optimal_entry, strategy_params.get('contract_multiplier', 10))
+
+            data = NumpyData(dataname=df)
+            
+            # 针对周线，显式设置 TimeFrame
+            if period == 'weekly':
+                # 虽然数据已经是周线（Resampled），但为了保险，告诉 Cerebro 这是周线数据
+                # 不过如果 compression=1, timeframe=Weeks，Cerebro 会认为这是周线
+                # 关键是数据已经是周频了，所以 timeframe=Weeks, compression=1 是匹配的
+                # 如果不设置，默认是 Daily? PandasData 不会自动推断 TimeFrame
+                data = NumpyData(dataname=df, timeframe=bt.TimeFrame.Weeks, compression=1)
+            elif period == 'monthly':
+                data = NumpyData(dataname=df, timeframe=bt.TimeFrame.Months, compression=1)
+
+            cerebro.adddata(data)
+            
+            # 添加策略
+            cerebro.addstrategy(BatchStrategy, **filtered_strategy_params)
+            
+            # 运行 (不生成图表数据，速度较快)
+            strats = cerebro.run()
+            if not strats:
+                return None
+                
+            strat = strats[0]
+            return self._holding_result(
+                symbol, df,
+                getattr(strat, 'final_size', 0),
+                getattr(strat, 'final_entry_price', "-"),
+                getattr(strat, 'hold_bars', 0)
+            )
+
+        # 策略声明了向量化信号时整个品种池一次计算，并从上次的检查点继续 (core.scan_state)
+        vectorized = has_vector_signals(StrategyClass) and not use_optimal_entry
+        frames = [] # (results 中的位置, symbol, df)
 
         for symbol in symbols:
             try:
@@ -998,89 +1123,83 @@ class BacktestEngine:
                     })
                     continue
 
-                cerebro = bt.Cerebro()
-                # 禁用标准输出
-                cerebro.check = False
-                
-                if use_optimal_entry:
-                    cerebro.broker.set_coo(True)
-                
-                # 设置初始资金 (足够大以避免margin问题)
-                cerebro.broker.setcash(10000000.0)
-                # 设置手续费
-                cerebro.broker.setcommission(commission=0.0001, margin=0.0, mult=int(strategy_params.get('contract_multiplier', 10)))
-
-                data = bt.feeds.PandasData(dataname=df)
-                
-                # 针对周线，显式设置 TimeFrame
-                if period == 'weekly':
-                    # 虽然数据已经是周线（Resampled），但为了保险，告诉 Cerebro 这是周线数据
-                    # 不过如果 compression=1, timeframe=Weeks，Cerebro 会认为这是周线
-                    # 关键是数据已经是周频了，所以 timeframe=Weeks, compression=1 是匹配的
-                    # 如果不设置，默认是 Daily? PandasData 不会自动推断 TimeFrame
-                    data = bt.feeds.PandasData(dataname=df, timeframe=bt.TimeFrame.Weeks, compression=1)
-                
-                cerebro.adddata(data)
-                
-                # 添加策略
-                cerebro.addstrategy(BatchStrategy, **filtered_strategy_params)
-                
-                # 运行 (不生成图表数据，速度较快)
-                strats = cerebro.run()
-                if not strats:
+                if vectorized:
+                    frames.append((len(results), symbol, df))
+                    results.append(None)
                     continue
-                    
-                strat = strats[0]
-                
-                # 获取当前价格
-                current_price = df['close'].iloc[-1]
-                
-                # 判断方向
-                size = getattr(strat, 'final_size', 0)
-                entry_price = getattr(strat, 'final_entry_price', "-")
-                hold_bars = getattr(strat, 'hold_bars', 0)
-                
-                direction = "空仓"
-                color = "default" # default/green/red
-                
-                if size > 0:
-                    direction = "多"
-                elif size < 0:
-                    direction = "空"
-                
-                # 计算盈利点数
-                profit_points = 0
-                if entry_price != "-" and isinstance(entry_price, (int, float)):
-                    if size > 0:
-                        profit_points = current_price - entry_price
-                    elif size < 0:
-                        profit_points = entry_price - current_price
-                
-                results.append({
-                    "symbol": symbol,
-                    "price": float(current_price),
-                    "direction": direction,
-                    "entry_price": entry_price,
-                    "size": size,
-                    "profit_points": profit_points if size != 0 else "-",
-                    "hold_bars": hold_bars
-                })
+
+                result = analyze_one(symbol, df)
+                if result is not None:
+                    results.append(result)
                 
             except Exception as e:
                 import traceback
                 traceback.print_exc()
                 print(f"Error analyzing {symbol}: {e}")
-                results.append({
-                    "symbol": symbol,
-                    "error": str(e),
-                    "price": 0, # 填充默认值防止前端空白
-                    "direction": "Error",
-                    "entry_price": "-",
-                    "profit_points": "-"
-                })
+                results.append(self._analyze_error(symbol, e))
+
+        if frames:
+            try:
+                books = incremental_books(StrategyClass, [(symbol, df) for _, symbol, df in frames], filtered_strategy_params,
+                                          'batch', period, market_type)
+            except Exception as e:
+                print(f"向量化分析失败，改用逐品种回测: {e}")
+                books = None
+            for n, (pos, symbol, df) in enumerate(frames):
+                try:
+                    results[pos] = self._holding_result(symbol, df, *books[n].holding()) if books is not None else analyze_one(symbol, df)
+                except Exception as e:
+                    print(f"Error analyzing {symbol}: {e}")
+                    results[pos] = self._analyze_error(symbol, e)
+            results = [r for r in results if r is not None]
         
         return results
 
+    @staticmethod
+    def _holding_result(symbol, df, size, entry_price, hold_bars):
+        """
+        批量分析的单个品种结果: 持仓方向、开仓均价、盈利点数
+        """
+        # 获取当前价格
+        current_price = df['close'].iloc[-1]
+        
+        direction = "空仓"
+        color = "default" # default/green/red
+        
+        if size > 0:
+            direction = "多"
+        elif size < 0:
+            direction = "空"
+        
+        # 计算盈利点数
+        profit_points = 0
+        if entry_price != "-" and isinstance(entry_price, (int, float)):
+            if size > 0:
+                profit_points = current_price - entry_price
+            elif size < 0:
+                profit_points = entry_price - current_price
+        
+        return {
+            "symbol": symbol,
+            "price": float(current_price),
+            "direction": direction,
+            "entry_price": entry_price,
+            "size": size,
+            "profit_points": profit_points if size != 0 else "-",
+            "hold_bars": hold_bars
+        }
+
+    @staticmethod
+    def _analyze_error(symbol, e):
+        return {
+            "symbol": symbol,
+            "error": str(e),
+            "price": 0, # 填充默认值防止前端空白
+            "direction": "Error",
+            "entry_price": "-",
+            "profit_points": "-"
+        }
+
     def scan_signals(self, symbols, period, scan_window, strategy_params, strategy_name='TrendFollowingStrategy', market_type='futures'):
         """
         扫描最近 N 根 K 线的开仓信号
@@ -1246,20 +1365,36 @@ class BacktestEngine:
                 if hasattr(super(), 'stop'):
                     super().stop()
 
-        results = []
-        
         # Handle optimal_entry
         use_optimal_entry = strategy_params.pop('optimal_entry', False)
         
         # 强制禁用自动平仓，避免产生虚假信号
         strategy_params['disable_auto_close'] = True
         
-        filtered_strategy_params = self._filter_params(StrategyClass, strategy_params)
+        filtered_strategy_params = self._quiet_params(StrategyClass, self._filter_params(StrategyClass, strategy_params))
         
         # 足够的数据以覆盖扫描窗口和指标预热
         # 假设 N=100, 预热=100 -> 200天
-        # 默认取 365 天比较稳妥
-        start_date = (datetime.datetime.now() - datetime.timedelta(days=max(365, scan_window * 2))).strftime('%Y-%m-%d')
+        # 默认取 365 天比较稳妥 (从月初开始，同 analyze_batch)
+        start_date = scan_start(max(365, scan_window * 2))
+
+        def scan_one(symbol, df):
+            cerebro = self._batch_cerebro(use_optimal_entry, strategy_params.get('contract_multiplier', 10))
+            
+            data = NumpyData(dataname=df)
+            cerebro.adddata(data)
+            
+            cerebro.addstrategy(ScanStrategy, **filtered_strategy_params)
+            strats = cerebro.run()
+            if not strats:
+                return None
+            return self._scan_result(symbol, df, strats[0].signals, scan_window)
+
+        # 策略声明了向量化信号时整个品种池一次计算 (core.panel)，否则逐品种运行 Cerebro
+        # 开盘价成交模式 (cheat-on-open) 的成交时点不同，仍走 backtrader
+        vectorized = has_vector_signals(StrategyClass) and not use_optimal_entry
+        results = []
+        frames = [] # (results 中的位置, symbol, df)
 
         for symbol in symbols:
             try:
@@ -1268,63 +1403,17 @@ class BacktestEngine:
                     df.columns = [c.lower() for c in df.columns]
                 
                 if df is None or df.empty:
+                    # 保留占位行，每个品种都有一行结果 (物化结果按品种数判断是否完整)
+                    results.append(self._scan_missing(symbol, "未找到该品种的数据"))
                     continue
 
-                total_bars = len(df)
-                
-                cerebro = bt.Cerebro()
-                cerebro.check = False
-                if use_optimal_entry:
-                    cerebro.broker.set_coo(True)
-                cerebro.broker.setcash(10000000.0)
-                cerebro.broker.setcommission(commission=0.0001, margin=0.0, mult=int(strategy_params.get('contract_multiplier', 10)))
-                
-                data = bt.feeds.PandasData(dataname=df)
-                cerebro.adddata(data)
-                
-                cerebro.addstrategy(ScanStrategy, **filtered_strategy_params)
-                strats = cerebro.run()
-                if not strats:
+                if vectorized:
+                    frames.append((len(results), symbol, df))
+                    results.append(None)
                     continue
-                
-                strat = strats[0]
-                
-                # 筛选最近 scan_window 内的信号
-                # 这里的 bar_index 是基于 1-based (len(self))
-                
-                valid_signals = []
-                seen_dates = set()
-                
-                # 倒序遍历，优先处理最新的信号
-                for sig in sorted(strat.signals, key=lambda x: x['bar_index'], reverse=True):
-                    offset = total_bars - sig['bar_index'] + 1
-                    
-                    if offset <= scan_window:
-                        # 同一日期只保留一个信号（通常是成交信号或最新的挂单信号）
-                        if sig['date'] in seen_dates:
-                            continue
-                            
-                        valid_signals.append({
-                            "date": sig['date'],
-                            "action": sig['action'],
-                            "offset": offset, 
-                            "price": sig['price']
-                        })
-                        seen_dates.add(sig['date'])
-                
-                # 重新排序回正序（前端展示需要）
-                valid_signals.sort(key=lambda x: x['offset'], reverse=True)
-                
-                # 获取当前价格
-                current_price = df['close'].iloc[-1] if not df.empty else 0.0
 
-                results.append({
-                    "symbol": symbol,
-                    "name": symbol, 
-                    "signal_text": "有" if valid_signals else "无",
-                    "raw_signals": valid_signals,
-                    "current_price": current_price
-                })
+                result = scan_one(symbol, df)
+                results.append(result if result is not None else self._scan_missing(symbol, "回测未产生结果"))
                 
             except Exception as e:
                 print(f"Error scanning {symbol}: {e}")
@@ -1332,6 +1421,78 @@ class BacktestEngine:
                     "symbol": symbol,
                     "error": str(e)
                 })
+
+        if frames:
+            try:
+                books = incremental_books(StrategyClass, [(symbol, df) for _, symbol, df in frames], filtered_strategy_params,
+                                          'scan', period, market_type)
+            except Exception as e:
+                print(f"向量化扫描失败，改用逐品种回测: {e}")
+                books = None
+            for n, (pos, symbol, df) in enumerate(frames):
+                try:
+                    if books is not None:
+                        signals = books[n].entry_signals(df.index[-1], df['close'].iloc[-1])
+                        results[pos] = self._scan_result(symbol, df, signals, scan_window, books[n].bars)
+                    else:
+                        results[pos] = scan_one(symbol, df) or self._scan_missing(symbol, "回测未产生结果")
+                except Exception as e:
+                    print(f"Error scanning {symbol}: {e}")
+                    results[pos] = {"symbol": symbol, "error": str(e)}
         
         return results
 
+    @staticmethod
+    def _scan_missing(symbol, error):
+        return {
+            "symbol": symbol,
+            "name": symbol,
+            "error": error,
+            "signal_text": "无",
+            "raw_signals": [],
+            "current_price": 0.0
+        }
+
+    @staticmethod
+    def _scan_result(symbol, df, signals, scan_window, total_bars=None):
+        """
+        筛选最近 scan_window 根 K 线内的开仓信号
+        :param signals: [{date, action, price, bar_index}]，bar_index 基于 1 (len(self))，0 为最后一根 K 线的挂单
+        :param total_bars: bar_index 对应的 K 线总数 (从检查点继续时大于 len(df))
+        """
+        if total_bars is None:
+            total_bars = len(df)
+        valid_signals = []
+        seen_dates = set()
+        
+        # 倒序遍历，优先处理最新的信号
+        for sig in sorted(signals, key=lambda x: x['bar_index'], reverse=True):
+            offset = total_bars - sig['bar_index'] + 1
+            
+            if offset <= scan_window:
+                # 同一日期只保留一个信号（通常是成交信号或最新的挂单信号）
+                if sig['date'] in seen_dates:
+                    continue
+                    
+                valid_signals.append({
+                    "date": sig['date'],
+                    "action": sig['action'],
+                    "offset": offset, 
+                    "price": sig['price']
+                })
+                seen_dates.add(sig['date'])
+        
+        # 重新排序回正序（前端展示需要）
+        valid_signals.sort(key=lambda x: x['offset'], reverse=True)
+        
+        # 获取当前价格
+        current_price = df['close'].iloc[-1] if not df.empty else 0.0
+
+        return {
+            "symbol": symbol,
+            "name": symbol, 
+            "signal_text": "有" if valid_signals else "无",
+            "raw_signals": valid_signals,
+            "current_price": current_price
+        }
+
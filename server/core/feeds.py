@@ -0,0 +1,138 @@
+import array
+from fractions import Fraction
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+# datetime64 纪元 (1970-01-01) 对应的 backtrader 日期序数
+_EPOCH_ORDINAL = 719163
+_NS_PER_DAY = 86400 * 10**9
+
+
+def _day_fraction(tod_ns):
+    """
+    日内时间 -> (hi, lo)，hi + lo 精确等于 date2num 中 时/24 + 分/1440 + 秒/86400 + 微秒/8.64e10 之和
+    """
+    micros = tod_ns // 1000
+    hours, rem = divmod(micros, 3600 * 10**6)
+    minutes, rem = divmod(rem, 60 * 10**6)
+    seconds, micros = divmod(rem, 10**6)
+    parts = [Fraction(hours / 24.0), Fraction(minutes / 1440.0), Fraction(seconds / 86400.0), Fraction(micros / 86400000000.0)]
+    exact = sum(parts)
+    hi = float(exact)
+    return hi, float(exact - Fraction(hi))
+
+
+def datetime64_to_num(dates):
+    """
+    向量化版本的 bt.date2num，结果与逐个调用 date2num (math.fsum 求和) 一致
+    日内时间的种类很少 (分钟线每天最多几百种)，先对去重后的日内时间精确求和，再用 Fast2Sum 与日序数相加
+    """
+    ns = np.asarray(dates, dtype='datetime64[ns]').astype(np.int64)
+    days, tod = np.divmod(ns, _NS_PER_DAY)
+    base = (days + _EPOCH_ORDINAL).astype(np.float64)
+
+    uniq, inverse = np.unique(tod, return_inverse=True)
+    table = np.array([_day_fraction(int(t)) for t in uniq], dtype=np.float64).reshape(-1, 2)
+    hi = table[inverse, 0]
+    lo = table[inverse, 1]
+
+    total = base + hi
+    err = (base - total) + hi # base >= 1 > hi，Fast2Sum 误差项精确
+    return total + (err + lo)
+
+
+def _source_arrays(dataname):
+    """
+    从数据源取出 (日期数组, {列名: float64 数组})
+    支持 DataFrame (DatetimeIndex) 和 core.bar_store.SharedBars (共享内存/内存映射，不复制)
+    """
+    if isinstance(dataname, pd.DataFrame):
+        dates = pd.DatetimeIndex(dataname.index).as_unit('ns').values
+        columns = {}
+        for col in dataname.columns:
+            series = dataname[col]
+            if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+                # 可空整数等扩展类型: 缺失值转为 NaN
+                if pd.api.types.is_numeric_dtype(series):
+                    columns[str(col)] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            elif pd.api.types.is_numeric_dtype(series):
+                # float64 列直接引用原数组，不复制
+                columns[str(col)] = np.asarray(series, dtype=np.float64)
+        return dates, columns
+    return dataname.dates, {col: dataname.column(col) for col in dataname.spec.columns}
+
+
+class NumpyData(bt.feed.DataBase):
+    """
+    基于连续 NumPy 数组的数据源，替代 bt.feeds.PandasData
+    - PandasData 每根 K 线按 iloc 逐列取值；这里预加载时直接把整列写入 line 缓冲区
+    - line 名称与列名按不区分大小写匹配 (close -> Close)，子类新增的 line (如 ma_fast) 同样自动匹配
+    - 使用重采样/过滤器/时区或非预加载模式 (exactbars) 时退回逐根加载
+    """
+
+    def start(self):
+        super(NumpyData, self).start()
+        dates, columns = _source_arrays(self.p.dataname)
+        self._dtnums = datetime64_to_num(dates)
+
+        lookup = {name.lower(): arr for name, arr in columns.items()}
+        self._colarrays = []
+        for alias in self.getlinealiases():
+            if alias == 'datetime':
+                continue
+            arr = lookup.get(alias.lower())
+            if arr is not None:
+                self._colarrays.append((getattr(self.lines, alias), arr))
+        self._idx = -1
+
+    @property
+    def total_bars(self):
+        """
+        过滤 fromdate/todate 后的 K 线数，供策略在 exactbars (缓冲区不保留全部数据) 时判断是否到达末尾
+        使用过滤器/重采样时无法预知，返回 None
+        """
+        if self._filters or self._ffilters or self._tzinput:
+            return None
+        lo, hi = self._date_range()
+        return hi - lo
+
+    def _date_range(self):
+        lo = int(np.searchsorted(self._dtnums, self.fromdate, side='left'))
+        hi = int(np.searchsorted(self._dtnums, self.todate, side='right'))
+        return lo, hi
+
+    def _can_bulk_load(self):
+        if self._filters or self._ffilters or self._tzinput:
+            return False
+        return all(line.mode != line.QBuffer for line in self.lines)
+
+    def preload(self):
+        if not self._can_bulk_load():
+            return super(NumpyData, self).preload()
+
+        # fromdate/todate 过滤 (与 load() 中的逐根判断等价)
+        lo, hi = self._date_range()
+
+        self.lines.datetime.array.frombytes(np.ascontiguousarray(self._dtnums[lo:hi]).tobytes())
+        for line, arr in self._colarrays:
+            line.array.frombytes(np.ascontiguousarray(arr[lo:hi], dtype=np.float64).tobytes())
+        # 没有数据列的 line 填充 NaN，保证各 line 长度一致
+        filled = {id(line) for line, _ in self._colarrays}
+        for line in self.lines:
+            if line is not self.lines.datetime and id(line) not in filled:
+                line.array.extend(array.array('d', [float('nan')]) * (hi - lo))
+
+        self._idx = hi - 1
+        self.home()
+
+    def _load(self):
+        # 逐根加载 (exactbars 等内存受限场景)，直接按位置取值，不额外生成整列的 Python 列表
+        self._idx += 1
+        if self._idx >= len(self._dtnums):
+            return False
+
+        for line, arr in self._colarrays:
+            line[0] = arr.item(self._idx)
+        self.lines.datetime[0] = self._dtnums.item(self._idx)
+        return True
@@ -0,0 +1,49 @@
+import importlib
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    延迟导入的模块代理
+    首次访问属性时才真正 import，用于 akshare / backtrader 等导入耗时、占内存的依赖
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with self.__dict__["_lazy_lock"]:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__dict__["_lazy_name"])
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    @property
+    def is_loaded(self):
+        return self.__dict__["_lazy_module"] is not None
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<lazy module '{self.__dict__['_lazy_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """
+    返回模块代理，用法与 import 后的模块一致:
+        ak = lazy_import("akshare")
+        ak.futures_zh_daily_sina(...)  # 此时才导入 akshare
+    """
+    return LazyModule(name)
@@ -5,8 +5,10 @@ from .engine import BacktestEngine
 class StrategyOptimizer:
     def __init__(self):
         self.engine = BacktestEngine()
+        # 最近一次 optimize 的全部试验 (参数 + 指标)
+        self.trials = []
         
-    def optimize(self, symbol, period, initial_params, target_return=20.0, max_trials=10, start_date=None, end_date=None, strategy_name='TrendFollowingStrategy', data_source='main'):
+    def optimize(self, symbol, period, initial_params, target_return=20.0, max_trials=10, start_date=None, end_date=None, strategy_name='TrendFollowingStrategy', data_source='main', market_type='futures', data=None):
         """
         简单的随机搜索优化器
         :param symbol: 交易品种
@@ -17,11 +19,13 @@ class StrategyOptimizer:
         :param start_date: 开始时间
         :param end_date: 结束时间
         :param strategy_name: 策略名称
+        :param data: 预先获取的 K 线，每次试验复用 (见 BacktestEngine.run)
         :return: (best_params, best_result)
         """
         best_result = None
         best_return = -float('inf')
         best_params = initial_params.copy()
+        self.trials = []
         
         # 定义参数搜索空间
         param_ranges = {}
@@ -91,7 +95,7 @@ class StrategyOptimizer:
             print(f"优化尝试 #{i+1}: {trial_params}")
             
             # 运行回测
-            result = self.engine.run(symbol, period, trial_params, start_date=start_date, end_date=end_date, strategy_name=strategy_name, data_source=data_source)
+            result = self.engine.run(symbol, period, trial_params, start_date=start_date, end_date=end_date, strategy_name=strategy_name, data_source=data_source, market_type=market_type, data=data)
             
             if "error" in result:
                 continue
@@ -103,6 +107,7 @@ class StrategyOptimizer:
             return_rate = (net_profit / initial_cash) * 100
             
             print(f"  -> 收益率: {return_rate:.2f}%")
+            self.trials.append({"params": trial_params, "metrics": result['metrics']})
             
             # 更新最佳结果
             if return_rate > best_return:
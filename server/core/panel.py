@@ -0,0 +1,343 @@
+import math
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 向量化计算与 backtrader 逐点计算 (math.fsum) 只有末位舍入差异；
+# 两条线的相对差距小于该值时按 backtrader 的方式重新精确计算再比较
+TIE_TOLERANCE = 1e-10
+
+
+class Line:
+    """
+    面板上的一条序列，形状 (品种数, K 线数)；各品种按最后一根 K 线右对齐，左侧无数据或指标未就绪处为 NaN
+    values 为向量化计算的值，exact(i, t) 返回与 backtrader 完全一致的值 (只在接近相等时调用)
+    key 标识指标 (如 ('sma', 'close', 20))，用于保存和恢复检查点状态
+    """
+
+    def __init__(self, values, exact=None, key=None):
+        self.values = values
+        self._exact = exact
+        self.key = key
+
+    def exact(self, i, t):
+        return self._exact(i, t) if self._exact is not None else float(self.values[i, t])
+
+
+class Panel:
+    """
+    多品种 K 线面板，用于对整个品种池一次性计算指标和信号 (替代逐品种运行 Cerebro)
+    策略类通过 vector_signals(panel, params) 声明向量化信号，返回每根 K 线的目标仓位
+
+    检查点: 每个品种在倒数第二根 K 线 (最后一根可能尚未收盘) 记录递归指标的状态 (state)，
+    之后传入 resume=(尾部 K 线数, state)、数据为检查点保存的尾部 K 线 + 新 K 线，即可从检查点继续计算；
+    滑动窗口指标 (sma) 由尾部 K 线重新计算，递归指标 (ema、crossover) 从保存的状态继续
+    """
+
+    def __init__(self, frames, resume=None):
+        """
+        :param frames: DataFrame 列表 (小写列名 open/high/low/close)
+        :param resume: 每个品种的 (尾部 K 线数, 指标状态) 或 None (从头计算)
+        """
+        self.lengths = np.array([len(df) for df in frames], dtype=np.int64)
+        self.bars = int(self.lengths.max()) if len(frames) else 0
+        self.starts = self.bars - self.lengths
+        self._frames = frames
+        self._fields = {} # 行情字段在第一次使用时读取
+        self._resume = [] # [(行, 上次检查点所在列, 指标状态)]
+        for i, r in enumerate(resume or []):
+            if r is not None:
+                self._resume.append((i, self.starts[i] + r[0] - 1, r[1]))
+        # 本次检查点所在列 (倒数第二根 K 线)，不足两根时不记录
+        self.marks = np.where(self.lengths >= 2, self.bars - 2, -1)
+        self.state = [{} for _ in frames]
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def _line(self, source):
+        return self.field(source) if isinstance(source, str) else source
+
+    def _carried(self, key):
+        """
+        [(行, 上次检查点所在列, 保存的值)]，只包含保存了有效值的品种
+        """
+        carried = []
+        for i, col, state in self._resume:
+            value = state.get(key)
+            if value is not None and not math.isnan(value):
+                carried.append((i, col, value))
+        return carried
+
+    def _save(self, key, values):
+        rows = np.flatnonzero(self.marks >= 0)
+        for i, value in zip(rows, values[rows, self.marks[rows]]):
+            self.state[i][key] = float(value)
+
+    def field(self, name):
+        line = self._fields.get(name)
+        if line is None:
+            values = np.full((len(self), self.bars), np.nan)
+            for i, df in enumerate(self._frames):
+                values[i, self.starts[i]:] = df[name].to_numpy(dtype=np.float64)
+            line = self._fields[name] = Line(values, key=name)
+        return line
+
+    def sma(self, source, period):
+        """
+        简单移动平均，与 bt.ind.SMA 一致 (窗口内有 NaN 时为 NaN)
+        """
+        src = self._line(source)
+        values = np.full(src.values.shape, np.nan)
+        if period <= self.bars:
+            values[:, period - 1:] = sliding_window_view(src.values, period, axis=1).sum(axis=-1) / period
+
+        def exact(i, t):
+            return math.fsum(src.exact(i, k) for k in range(t - period + 1, t + 1)) / period
+        return Line(values, exact, key=('sma', src.key, period))
+
+    def ema(self, source, period):
+        """
+        指数移动平均，与 bt.ind.EMA 一致: 以前 period 根的简单平均为初值，之后 prev * (1 - alpha) + x * alpha
+        source 需为行情字段或 EMA (初值按 source 的值精确求和)
+        """
+        src = self._line(source)
+        key = ('ema', src.key, period)
+        alpha = 2.0 / (1.0 + period)
+        alpha1 = 1.0 - alpha
+        values = np.full(src.values.shape, np.nan)
+        # 每个品种第一个有效值的位置
+        valid = ~np.isnan(src.values)
+        first = np.where(valid.any(axis=1), valid.argmax(axis=1), self.bars)
+        seed_at = first + period - 1
+        carried = self._carried(key)
+        for i, col, value in carried:
+            seed_at[i] = col
+            values[i, col] = value
+        resumed = {i for i, _, _ in carried}
+        for i in np.flatnonzero(seed_at < self.bars):
+            if i not in resumed:
+                values[i, seed_at[i]] = math.fsum(src.values[i, first[i]:seed_at[i] + 1]) / period
+        for t in range(1, self.bars):
+            rows = seed_at < t
+            values[rows, t] = values[rows, t - 1] * alpha1 + src.values[rows, t] * alpha
+        self._save(key, values)
+        return Line(values, key=key)
+
+    def diff(self, a, b):
+        """
+        a - b，接近相等的点按精确值重新计算 (保证比较结果与 backtrader 相同)
+        """
+        a, b = self._line(a), self._line(b)
+        d = a.values - b.values
+        with np.errstate(invalid='ignore'):
+            near = np.abs(d) <= TIE_TOLERANCE * (np.abs(a.values) + np.abs(b.values))
+        for i, t in zip(*np.nonzero(near)):
+            d[i, t] = a.exact(i, t) - b.exact(i, t)
+        return d
+
+    def crossover(self, a, b):
+        """
+        与 bt.ind.CrossOver 一致: 上穿 +1，下穿 -1，否则 0；未就绪处为 NaN
+        "上一次非零差值" < 0 且当前 a > b 为上穿 (差值为 0 的 K 线沿用之前的差值)
+        """
+        a, b = self._line(a), self._line(b)
+        key = ('nzd', a.key, b.key)
+        d = self.diff(a, b)
+        valid = ~np.isnan(d)
+        first = valid & ~np.pad(valid, ((0, 0), (1, 0)))[:, :-1]
+        keep = valid & ((d != 0) | first)
+        # 从检查点恢复: 检查点处的"上一次非零差值"可能来自更早的 K 线
+        source = d
+        carried = self._carried(key)
+        if carried:
+            source = d.copy()
+            for i, col, value in carried:
+                source[i, col] = value
+                keep[i, col] = True
+        cols = np.where(keep, np.arange(self.bars), -1)
+        cols = np.maximum.accumulate(cols, axis=1)
+        nzd = np.where(cols >= 0, np.take_along_axis(source, cols.clip(0), axis=1), np.nan)
+        self._save(key, nzd)
+        before = np.full(d.shape, np.nan)
+        before[:, 1:] = nzd[:, :-1]
+        with np.errstate(invalid='ignore'):
+            cross = (before < 0) & (d > 0)
+            cross = cross.astype(np.float64) - ((before > 0) & (d < 0))
+        cross[np.isnan(before) | ~valid] = np.nan
+        return cross
+
+    def targets(self, long=None, short=None, close=None):
+        """
+        组合信号为目标仓位 (单位 fixed_size): 做多 +1，做空 -1，平仓 0，无操作 NaN
+        目标与当前持仓相同时不下单 (close 在空仓时无操作)
+        """
+        result = np.full((len(self), self.bars), np.nan)
+        if close is not None:
+            result[close] = 0.0
+        if short is not None:
+            result[short] = -1.0
+        if long is not None:
+            result[long] = 1.0
+        return result
+
+
+def _fill_action(buy, prev, pos):
+    # 同 ScanStrategy.notify_order: 开仓、加仓、反手视为开仓，其余为平仓 (None)
+    if buy:
+        if prev >= 0:
+            return "买入开仓" if prev == 0 else "买入加仓"
+        return "反手做多" if pos >= 0 else None
+    if prev <= 0:
+        return "卖出开仓" if prev == 0 else "卖出加空"
+    return "反手做空" if pos <= 0 else None
+
+
+class EntryBook:
+    """
+    单个品种按目标仓位模拟下单和成交 (市价单在下一根 K 线开盘成交)，
+    记录的开仓信号和持仓与 backtrader 中 ScanStrategy / BatchStrategy 的记录一致:
+    - 开仓、加仓、反手记为开仓信号，bar_index 为成交 K 线的序号 (从 1 开始)；减仓、平仓不记录
+      (平多后持仓为 0 时沿用原逻辑记为反手做空)
+    - 最后一根 K 线产生的订单尚未成交，由 pending_signal 输出为 "(信号)"
+    状态 (state()) 只包含简单类型，可以保存为检查点，之后从下一根 K 线继续
+    """
+
+    def __init__(self, fixed_size, state=None):
+        state = state or {}
+        self.fixed_size = fixed_size
+        self.bars = state.get('bars', 0) # 已处理的 K 线数
+        self.pos = state.get('pos', 0)
+        self.pending = state.get('pending') # 已下单未成交的目标仓位
+        self.price = state.get('price', 0.0) # 持仓均价 (同 bt Position.price)
+        self.entry_price = state.get('entry_price', "-") # 最近一次有持仓时的均价
+        self.entry_bar = state.get('entry_bar', -1) # 最近一次开仓/调仓成交的 K 线序号
+        self.signals = list(state.get('signals', ()))
+
+    def state(self):
+        return {'bars': self.bars, 'pos': self.pos, 'pending': self.pending, 'price': self.price,
+                'entry_price': self.entry_price, 'entry_bar': self.entry_bar, 'signals': list(self.signals)}
+
+    def _fill(self, bar_index, date, price):
+        size = self.pending - self.pos
+        prev, self.pos, self.pending = self.pos, self.pending, None
+        price = float(price)
+        if self.pos == 0:
+            self.price = 0.0
+        elif prev == 0 or (prev > 0) != (self.pos > 0):
+            self.price = price
+        elif abs(self.pos) > abs(prev):
+            self.price = (self.price * prev + size * price) / self.pos
+        if self.pos != 0:
+            self.entry_price = self.price
+            self.entry_bar = bar_index
+        else:
+            self.entry_bar = -1
+        action = _fill_action(size > 0, prev, self.pos)
+        if action:
+            # 成交均价按 backtrader 的方式计算 (size * price / size，保证末位一致)
+            self.signals.append({"date": date.strftime('%Y-%m-%d'), "action": action, "price": size * price / size, "bar_index": bar_index})
+
+    def run(self, targets, opens, dates, lo, hi):
+        """
+        处理数组中第 lo 至 hi - 1 根 K 线 (紧接已处理的 K 线)
+        :param targets: 目标仓位 (NaN 无操作)
+        :param dates: K 线时间 (DatetimeIndex)
+        """
+        base = int(self.bars) - lo # 数组下标 -> 已处理 K 线数
+        last = lo - 1 # 上一次下单的 K 线 (未成交的订单在其下一根成交)
+        for t in (lo + np.flatnonzero(~np.isnan(targets[lo:hi]))).tolist():
+            if self.pending is not None:
+                self._fill(base + last + 2, dates[last + 1], opens[last + 1])
+            size = int(targets[t]) * self.fixed_size
+            self.pending = size if size != self.pos else None
+            last = t
+        if self.pending is not None and last + 1 < hi:
+            self._fill(base + last + 2, dates[last + 1], opens[last + 1])
+        self.bars = base + hi
+
+    def pending_signal(self, date, close):
+        """
+        最后一根 K 线产生、尚未成交的订单 (同 ScanStrategy.stop)
+        """
+        if self.pending is None:
+            return None
+        if self.pending > self.pos:
+            action = ("买入开仓" if self.pos == 0 else "买入加仓") if self.pos >= 0 else "反手做多"
+        else:
+            action = ("卖出开仓" if self.pos == 0 else "卖出加空") if self.pos <= 0 else "反手做空"
+        return {"date": date.strftime('%Y-%m-%d'), "action": action + "(信号)", "price": float(close), "bar_index": 0}
+
+    def entry_signals(self, date, close):
+        """
+        全部开仓信号 (格式同 ScanStrategy.signals)
+        """
+        pending = self.pending_signal(date, close)
+        return self.signals + [pending] if pending else list(self.signals)
+
+    def holding(self):
+        """
+        当前持仓 (同 BatchStrategy.stop): (持仓数量, 开仓均价, 持有 K 线数)
+        """
+        if self.pos != 0:
+            return self.pos, self.price, self.bars - self.entry_bar if self.entry_bar > 0 else 0
+        return self.pos, self.entry_price, 0
+
+
+def strategy_params(StrategyClass, params):
+    """
+    策略参数对象 (默认值 + 传入参数)，传给 vector_signals
+    """
+    p = StrategyClass.params()
+    for key, value in params.items():
+        setattr(p, key, value)
+    return p
+
+
+def has_vector_signals(StrategyClass):
+    """
+    策略类自身是否声明了 vector_signals (子类会改变交易逻辑，不沿用父类的向量化信号)
+    """
+    return 'vector_signals' in vars(StrategyClass)
+
+
+def panel_books(StrategyClass, frames, params, resume=None):
+    """
+    对整个品种池计算向量化信号并模拟成交
+    :param params: 策略参数 (已过滤)，start_date 之前的 K 线不产生信号 (同 pre_next)
+    :param resume: 每个品种的检查点 {'tail': 尾部 K 线数, 'indicators': 指标状态, 'book': EntryBook 状态} 或 None；
+                   有检查点时对应的 frame 为尾部 K 线 + 新 K 线
+    :return: [(EntryBook, 新检查点 或 None)]，新检查点位于倒数第二根 K 线，不含 'tail'
+    """
+    resume = resume or [None] * len(frames)
+    panel = Panel(frames, [(cp['tail'], cp['indicators']) if cp else None for cp in resume])
+    p = strategy_params(StrategyClass, params)
+    targets = StrategyClass.vector_signals(panel, p)
+    opens = panel.field('open').values
+    start = pd.Timestamp(p.start_date).normalize() if p.start_date else None
+    results = []
+    for i, (df, cp) in enumerate(zip(frames, resume)):
+        lo = panel.starts[i]
+        row = targets[i, lo:]
+        if start is not None:
+            row = np.where(df.index.normalize() < start, np.nan, row)
+        book = EntryBook(p.fixed_size, cp['book'] if cp else None)
+        begin = cp['tail'] if cp else 0
+        mark = len(df) - 2 # 检查点: 倒数第二根 K 线
+        checkpoint = None
+        if mark >= begin:
+            book.run(row, opens[i, lo:], df.index, begin, mark + 1)
+            checkpoint = {'indicators': panel.state[i], 'book': book.state()}
+            begin = mark + 1
+        book.run(row, opens[i, lo:], df.index, begin, len(df))
+        results.append((book, checkpoint))
+    return results
+
+
+def panel_signals(StrategyClass, frames, params):
+    """
+    对整个品种池计算向量化信号
+    :return: 每个品种的信号列表 (格式同 ScanStrategy.signals)
+    """
+    return [book.entry_signals(df.index[-1], df['close'].iloc[-1])
+            for df, (book, _) in zip(frames, panel_books(StrategyClass, frames, params))]
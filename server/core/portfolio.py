@@ -0,0 +1,276 @@
+from concurrent.futures import ThreadPoolExecutor
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from .constants import get_multiplier
+from .data_loader import fetch_data, slice_dates
+from .engine import BacktestEngine, CHART_MAX_POINTS, LOW_MEMORY_BARS, clean_data, spilled_equity_curve
+from .feeds import NumpyData
+from .spill import SpillArray
+from .warmup import strategy_lookback, warmup_start
+from . import strategy
+
+# 并行获取数据的最大线程数 (网络 IO 为主)
+LOAD_WORKERS = 8
+
+
+def period_timeframe(period):
+    """
+    周期 -> (backtrader timeframe, compression)
+    """
+    if period == 'weekly':
+        return bt.TimeFrame.Weeks, 1
+    if period == 'monthly':
+        return bt.TimeFrame.Months, 1
+    if period == 'daily':
+        return bt.TimeFrame.Days, 1
+    return bt.TimeFrame.Minutes, int(period)
+
+
+class PortfolioMember:
+    """
+    组合回测中单个品种的策略实例 (混入在策略类之前)
+    - cerebro 默认把所有数据传给每个策略，这里只保留 addstrategy 时追加的本品种数据，
+      策略内不带数据参数创建的指标、下单、持仓都绑定到本品种
+    - 任一品种有新 K 线时所有策略都会被调用，本品种没有新 K 线时跳过 next，避免同一根 K 线重复发出信号
+    """
+
+    def __init__(self):
+        own = self.datas[-1]
+        self.datas = [own]
+        self.ddatas = {own: None}
+        self.data = self.data0 = own
+        self.dnames = bt.utils.DotDict([(own._name, own)])
+        self._clock = own
+        self._own_len = 0
+        super().__init__()
+
+    def _clk_update(self):
+        # 本品种还没有 K 线 (其他品种上市更早) 时不推进策略时钟
+        if not len(self.data):
+            return len(self)
+        return super()._clk_update()
+
+    def next(self):
+        if len(self.data) == self._own_len:
+            return
+        self._own_len = len(self.data)
+        super().next()
+
+
+class PortfolioLedger(bt.Analyzer):
+    """
+    组合回测记录 (内存只与交易日数、品种数相关):
+    - 每个品种按交易日记录本品种累计盈亏 (已平仓净利 + 持仓浮动盈亏) 和已平仓交易统计
+    - 第一个品种的实例另外逐根记录 [时间, 组合权益] 到临时文件
+    """
+
+    def start(self):
+        self.realized = 0.0
+        self.trades = 0
+        self.won = 0
+        self.daily = {} # 日期序数 -> 当日收盘时的累计盈亏
+        self.mult = getattr(self.strategy.p, 'contract_multiplier', 1)
+        self.equity = SpillArray(2) if self.strategy.p.portfolio_index == 0 else None
+        self._all_datas = self.strategy.env.datas
+
+    def notify_trade(self, trade):
+        if trade.isclosed:
+            self.realized += trade.pnlcomm
+            self.trades += 1
+            if trade.pnlcomm > 0:
+                self.won += 1
+
+    def next(self):
+        if self.equity is not None:
+            dt = max(d.datetime[0] for d in self._all_datas if len(d))
+            self.equity.append(dt, self.strategy.broker.getvalue())
+        data = self.strategy.data
+        if len(data):
+            pos = self.strategy.position
+            pnl = self.realized + (pos.size * (data.close[0] - pos.price) * self.mult if pos.size else 0.0)
+            self.daily[int(data.datetime[0])] = pnl
+
+    def get_analysis(self):
+        return self
+
+
+def load_symbols(symbols, period, market_type='futures', start_date=None, end_date=None, data_source='main', max_workers=LOAD_WORKERS):
+    """
+    并行获取多个品种的数据
+    :return: [(symbol, df 或 None, 错误信息 或 None)]，顺序与 symbols 一致
+    """
+    def load(symbol):
+        try:
+            df = fetch_data(symbol=symbol, period=period, market_type=market_type, start_date=start_date, end_date=end_date, data_source=data_source)
+        except Exception as e:
+            return symbol, None, str(e)
+        if df is None or df.empty:
+            return symbol, None, "未找到该品种的数据"
+        return symbol, df, None
+
+    if not symbols:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as pool:
+        return list(pool.map(load, symbols))
+
+
+def _daily_returns(rows):
+    """
+    逐根 [时间, 权益] -> 每日收盘权益的收益率
+    """
+    days = rows[:, 0].astype(np.int64)
+    last = np.r_[days[1:] != days[:-1], True]
+    values = rows[last, 1]
+    return values[1:] / values[:-1] - 1.0
+
+
+def _max_drawdown(values):
+    if len(values) == 0:
+        return 0.0
+    peak = np.maximum.accumulate(values)
+    return float(np.max((peak - values) / peak) * 100)
+
+
+def pnl_correlation(daily):
+    """
+    各品种每日盈亏变动的相关系数 (交易日取并集，品种尚未上市或停牌的日期盈亏视为不变)
+    :param daily: {symbol: {日期序数: 累计盈亏}}
+    """
+    frame = pd.DataFrame({symbol: pd.Series(values, dtype=np.float64) for symbol, values in daily.items()})
+    if frame.empty or len(frame.columns) < 2:
+        return None
+    changes = frame.sort_index().ffill().fillna(0.0).diff().iloc[1:]
+    matrix = changes.corr()
+    return {"symbols": list(matrix.columns), "matrix": matrix.to_numpy().tolist()}
+
+
+def run_portfolio(symbols, period, strategy_params, initial_cash=1000000.0, start_date=None, end_date=None,
+                  strategy_name='TrendFollowingStrategy', market_type='futures', data_source='main',
+                  low_memory=None, chart_points=None, max_workers=LOAD_WORKERS, datas=None):
+    """
+    多品种组合回测: 所有品种加入同一个 Cerebro，共用一个账户资金，每个品种一个策略实例
+    - 数据并行获取；各品种按时间对齐推进 (交易日历不同的品种在各自有 K 线时才处理信号)
+    - 期货按品种设置合约乘数 (get_multiplier)，股票使用 strategy_params 中的 contract_multiplier
+    - 权益记录写入临时文件，K 线总数超过 LOW_MEMORY_BARS 时使用 exactbars=1，内存不随回测长度增长
+    :param datas: 预先获取的数据 {symbol: DataFrame} (测试或调用方已有数据时使用)
+    :return: 组合权益曲线、组合指标、各品种盈亏归因、品种盈亏相关系数
+    """
+    engine = BacktestEngine()
+    StrategyClass = getattr(strategy, strategy_name, None)
+    if StrategyClass is None:
+        return {"error": f"未在代码中找到策略类 '{strategy_name}'。"}
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {"error": "品种列表为空"}
+
+    strategy_params = dict(strategy_params)
+    use_optimal_entry = strategy_params.pop('optimal_entry', False)
+    params = engine._quiet_params(StrategyClass, engine._filter_params(StrategyClass, strategy_params))
+    params.update(start_date=start_date, end_date=end_date)
+
+    fetch_start_date = start_date
+    if start_date:
+        lookback = strategy_lookback(StrategyClass, params)
+        fetch_start_date = warmup_start(start_date, lookback, period, market_type).strftime('%Y-%m-%d')
+
+    if datas is None:
+        loaded = load_symbols(symbols, period, market_type, fetch_start_date, end_date, data_source, max_workers)
+    else:
+        loaded = []
+        for s in symbols:
+            try:
+                df = slice_dates(datas[s], fetch_start_date, end_date) if s in datas else None
+                loaded.append((s, df, None if df is not None else "未找到该品种的数据"))
+            except ValueError as e:
+                loaded.append((s, None, str(e)))
+    errors = [{"symbol": s, "error": err} for s, df, err in loaded if df is None]
+    loaded = [(s, df) for s, df, err in loaded if df is not None]
+    if not loaded:
+        return {"error": "所有品种均未获取到数据", "errors": errors}
+
+    total_bars = sum(len(df) for _, df in loaded)
+    if low_memory is None:
+        low_memory = total_bars > LOW_MEMORY_BARS
+    print(f"组合回测: {len(loaded)} 个品种, {total_bars} 根 K 线{', 低内存模式' if low_memory else ''}")
+
+    timeframe, compression = period_timeframe(period)
+    cerebro = bt.Cerebro(stdstats=False)
+    if use_optimal_entry:
+        cerebro.broker.set_coo(True)
+    cerebro.broker.setcash(initial_cash)
+
+    Member = type('PortfolioStrategy', (PortfolioMember, StrategyClass), {'params': (('portfolio_index', 0),)})
+    multipliers = {}
+    for i, (symbol, df) in enumerate(loaded):
+        if market_type == 'futures':
+            mult = get_multiplier(symbol)
+        else:
+            mult = int(strategy_params.get('contract_multiplier', 1))
+        multipliers[symbol] = mult
+        feed = NumpyData(dataname=df, timeframe=timeframe, compression=compression)
+        cerebro.adddata(feed, name=symbol)
+        cerebro.broker.setcommission(commission=0.0001, margin=0.0, mult=mult, name=symbol)
+        member_params = dict(params, portfolio_index=i)
+        if hasattr(StrategyClass.params, 'contract_multiplier'):
+            member_params['contract_multiplier'] = mult
+        cerebro.addstrategy(Member, feed, **member_params)
+    cerebro.addanalyzer(PortfolioLedger, _name='ledger')
+
+    if low_memory:
+        strats = cerebro.run(exactbars=1)
+    else:
+        strats = cerebro.run()
+    ledgers = [strat.analyzers.ledger.get_analysis() for strat in strats]
+
+    start_dt = pd.to_datetime(start_date) if start_date else None
+    end_dt = (pd.to_datetime(end_date) + pd.Timedelta(days=1)) if end_date else None
+    equity_spill = ledgers[0].equity
+    rows = equity_spill.to_numpy()
+    equity_spill.close()
+    equity_curve, _ = spilled_equity_curve(rows, initial_cash, start_dt, end_dt, chart_points or CHART_MAX_POINTS)
+    lo = int(np.searchsorted(rows[:, 0], bt.date2num(start_dt), side='left')) if start_dt is not None else 0
+    window = rows[lo:]
+    daily_returns = _daily_returns(window) if len(window) else np.array([])
+
+    # 相关系数只统计回测区间 (预热期没有交易)
+    first_day = int(bt.date2num(start_dt)) if start_dt is not None else 0
+
+    final_value = cerebro.broker.getvalue()
+    net_profit = final_value - initial_cash
+    attribution = []
+    for (symbol, df), ledger in zip(loaded, ledgers):
+        pnl = ledger.daily[max(ledger.daily)] if ledger.daily else 0.0
+        attribution.append({
+            "symbol": symbol,
+            "contract_multiplier": multipliers[symbol],
+            "bars": len(df),
+            "start": df.index[0].strftime('%Y-%m-%d %H:%M:%S'),
+            "end": df.index[-1].strftime('%Y-%m-%d %H:%M:%S'),
+            "net_profit": pnl,
+            "contribution": (pnl / net_profit * 100) if net_profit else None,
+            "total_trades": ledger.trades,
+            "won_trades": ledger.won,
+            "win_rate": (ledger.won / ledger.trades * 100) if ledger.trades else 0,
+        })
+
+    result = {
+        "status": "success",
+        "equity_curve": equity_curve,
+        "metrics": {
+            "initial_cash": initial_cash,
+            "final_value": final_value,
+            "net_profit": net_profit,
+            "return": net_profit / initial_cash * 100,
+            "max_drawdown": _max_drawdown(window[:, 1]) if len(window) else 0.0,
+            # 与单品种回测一致: 日收益率、无风险利率 0、不年化
+            "sharpe_ratio": float(daily_returns.mean() / daily_returns.std()) if len(daily_returns) > 1 and daily_returns.std() > 0 else None,
+            "total_trades": sum(ledger.trades for ledger in ledgers),
+            "symbols": len(loaded),
+        },
+        "attribution": attribution,
+        "correlation": pnl_correlation({symbol: {day: pnl for day, pnl in ledger.daily.items() if day >= first_day}
+                                        for (symbol, _), ledger in zip(loaded, ledgers)}),
+        "errors": errors,
+    }
+    return clean_data(result)
@@ -0,0 +1,106 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+
+# cProfile 报告保留的函数数 (按累计耗时排序)
+PROFILE_TOP = 40
+PROFILE_MODES = ('cprofile', 'pyinstrument')
+
+
+class StageTimer:
+    """
+    请求内各阶段耗时 (毫秒)
+    lap(name) 记录上一次 lap 以来的耗时，各阶段之和即总耗时；同名阶段累加
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + (now - self._last) * 1000.0
+        self._last = now
+
+    def as_dict(self):
+        return {
+            "stages": {name: round(ms, 3) for name, ms in self.stages.items()},
+            "total_ms": round((self._last - self._start) * 1000.0, 3),
+        }
+
+
+class StageStats:
+    """
+    进程内各阶段耗时的累计统计 (次数、总耗时、最大耗时)，用于找出最值得优化的阶段
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, stages, prefix=''):
+        with self._lock:
+            for name, ms in stages.items():
+                stat = self._stats.setdefault(prefix + name, [0, 0.0, 0.0])
+                stat[0] += 1
+                stat[1] += ms
+                stat[2] = max(stat[2], ms)
+
+    def timed(self, name, fn, *args, **kwargs):
+        """
+        运行 fn 并记录耗时 (如响应返回后在后台执行的数据库保存)
+        """
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.record({name: (time.perf_counter() - start) * 1000.0})
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {"count": count, "total_ms": round(total, 3), "mean_ms": round(total / count, 3), "max_ms": round(peak, 3)}
+                for name, (count, total, peak) in sorted(self._stats.items(), key=lambda kv: -kv[1][1])
+            }
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+stage_stats = StageStats()
+
+
+def profile_call(mode, fn):
+    """
+    在性能分析器下运行 fn
+    :param mode: 'cprofile' 或 'pyinstrument' (未安装 pyinstrument 时退化为 cProfile)
+    :return: (fn 的返回值, {"mode": 实际使用的分析器, "report": 文本报告})
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"未知的性能分析模式: {mode}")
+    if mode == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("未安装 pyinstrument，使用 cProfile")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                result = fn()
+            finally:
+                profiler.stop()
+            return result, {"mode": "pyinstrument", "report": profiler.output_text(unicode=True)}
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn()
+    finally:
+        profiler.disable()
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(PROFILE_TOP)
+    return result, {"mode": "cprofile", "report": stream.getvalue()}
@@ -0,0 +1,171 @@
+import time
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .lazy import lazy_import
+from .symbol_alias import weighted_daily_aliases
+
+# akshare 导入较慢，首次获取行情时再导入
+ak = lazy_import("akshare")
+
+# 交易时段内行情变化快，缓存时间短；收盘后最新 K 线不再变化，可缓存更久
+TRADING_TTL = 30
+CLOSED_TTL = 600
+
+# 国内期货交易时段 (含夜盘)
+TRADING_SESSIONS = [
+    (datetime.time(9, 0), datetime.time(11, 30)),
+    (datetime.time(13, 0), datetime.time(15, 0)),
+    (datetime.time(21, 0), datetime.time(23, 59, 59)),
+    (datetime.time(0, 0), datetime.time(2, 30)),
+]
+# A 股交易时段 (没有夜盘)
+STOCK_SESSIONS = [
+    (datetime.time(9, 30), datetime.time(11, 30)),
+    (datetime.time(13, 0), datetime.time(15, 0)),
+]
+
+
+class TTLCache:
+    """
+    线程安全的过期缓存，每个 key 可以有不同的过期时间
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            if len(self._data) >= self.max_entries and key not in self._data:
+                # 淘汰最早过期的条目
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest]
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_quote_cache = TTLCache()
+
+
+def in_trading_session(now=None, market_type='futures'):
+    now = now or datetime.datetime.now()
+    t = now.time()
+    if market_type == 'stock':
+        return now.weekday() < 5 and any(start <= t <= end for start, end in STOCK_SESSIONS)
+    # 周六凌晨仍属于周五夜盘
+    if now.weekday() == 5:
+        return t <= datetime.time(2, 30)
+    if now.weekday() == 6:
+        return False
+    # 周一凌晨没有夜盘
+    if now.weekday() == 0 and t <= datetime.time(2, 30):
+        return False
+    return any(start <= t <= end for start, end in TRADING_SESSIONS)
+
+
+def quote_ttl(now=None, market_type='futures'):
+    return TRADING_TTL if in_trading_session(now, market_type) else CLOSED_TTL
+
+
+def fetch_latest_quote(symbol, market_type='futures', data_source='main'):
+    """
+    从数据源获取最新一根日线的收盘价 (不走缓存)
+    :raises LookupError: 所有数据源均无数据
+    """
+    if market_type == 'stock':
+        # 只需要最后一根 K 线，取最近 30 天即可 (覆盖长假)
+        start_dt = (datetime.datetime.now() - datetime.timedelta(days=30)).strftime("%Y%m%d")
+        end_dt = (datetime.datetime.now() + datetime.timedelta(days=1)).strftime("%Y%m%d")
+        code = symbol[-6:]
+        try:
+            df = ak.stock_zh_a_hist(symbol=code, period="daily", start_date=start_dt, end_date=end_dt, adjust="qfq")
+
+            if df is None or df.empty:
+                raise ValueError("Empty dataframe from EastMoney")
+
+            latest = df.iloc[-1]
+            price = float(latest['收盘'])
+            date = str(latest['日期'])
+        except Exception as e:
+            print(f"Quote EastMoney failed, trying Sina: {e}")
+            # Fallback to Sina
+            df = ak.stock_zh_a_daily(symbol=symbol, start_date=start_dt, end_date=end_dt, adjust="qfq")
+
+            if df is None or df.empty:
+                raise LookupError("Symbol not found in both sources")
+
+            latest = df.iloc[-1]
+            price = float(latest['close'])
+            date = str(latest['date'])
+    else:
+        df = None
+        if data_source == 'weighted':
+            # 加权代码解析结果有持久化缓存，命中时只请求一次
+            fetch_symbol, df = weighted_daily_aliases.fetch(symbol, lambda code: ak.futures_zh_daily_sina(symbol=code))
+            if fetch_symbol is None:
+                # 没有加权数据，回退到主力
+                print(f"Quote: Fallback to main contract {symbol}")
+                df = None
+
+        if df is None:
+            main_symbol = symbol if not symbol.endswith('888') else symbol.replace('888', '0')
+            df = ak.futures_zh_daily_sina(symbol=main_symbol)
+
+        if df is None or df.empty:
+            raise LookupError("Symbol not found")
+        latest = df.iloc[-1]
+        price = float(latest['close'])
+        date = str(latest['date'])
+
+    return {
+        "symbol": symbol,
+        "price": price,
+        "date": date
+    }
+
+
+def get_latest_quote(symbol, market_type='futures', data_source='main'):
+    """
+    获取最新行情 (带过期缓存，前端轮询时不会每次都下载完整历史)
+    """
+    key = (market_type, data_source, symbol)
+    quote = _quote_cache.get(key)
+    if quote is None:
+        quote = fetch_latest_quote(symbol, market_type, data_source)
+        _quote_cache.set(key, quote, quote_ttl(market_type=market_type))
+    return quote
+
+
+def get_latest_quotes(symbols, market_type='futures', data_source='main', max_workers=8):
+    """
+    批量获取最新行情，未命中缓存的品种并发获取
+    单个品种失败时返回 {"symbol", "error"}，不影响其他品种
+    """
+    def fetch_one(symbol):
+        try:
+            return get_latest_quote(symbol, market_type, data_source)
+        except Exception as e:
+            print(f"Error fetching quote for {symbol}: {e}")
+            return {"symbol": symbol, "error": str(e)}
+
+    symbols = list(dict.fromkeys(symbols)) # 去重并保持顺序
+    if not symbols:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as pool:
+        return list(pool.map(fetch_one, symbols))
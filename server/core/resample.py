@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+# 数据源直接提供的周期 (新浪期货/股票分钟接口 1/5/15/30/60，日线)
+UPSTREAM_MINUTES = (1, 5, 15, 30, 60)
+
+# 日线 -> 周线/月线 的重采样规则 (周线按国内期货交易周习惯以周五结束)
+DAILY_RULES = {
+    'weekly': 'W-FRI',
+    'monthly': 'ME',
+}
+
+# 相邻两根分钟线间隔超过该值视为新的交易时段 (夜盘 / 日盘分开计数)
+SESSION_GAP_MINUTES = 180
+# 间隔超过 "周期 + 该值" 视为时段内休市 (10:15-10:30 小节休息、午休)，休市时间不计入交易分钟
+BREAK_MINUTES = 15
+# 交易时段开盘 / 收盘时间 (距零点的分钟数): 期货日盘 09:00、股票和股指 09:30、夜盘 21:00
+# 收盘: 日盘 15:00 (国债 15:15)、夜盘 23:00 / 23:30 / 01:00 / 02:30
+SESSION_OPENS = np.array([9 * 60, 9 * 60 + 30, 13 * 60, 13 * 60 + 30, 21 * 60])
+SESSION_CLOSES = np.array([60, 2 * 60 + 30, 15 * 60, 15 * 60 + 15, 23 * 60, 23 * 60 + 30])
+DAY_MINUTES = 24 * 60
+
+OHLCV_AGG = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+    'OpenInterest': 'last'
+}
+
+
+def period_minutes(period):
+    """
+    分钟周期 -> 分钟数；日线/周线/月线返回 None
+    """
+    try:
+        minutes = int(period)
+    except (TypeError, ValueError):
+        return None
+    return minutes if minutes > 0 else None
+
+
+def upstream_period(period):
+    """
+    请求周期对应的下载周期: 周线/月线由日线合成，自定义分钟周期 (如 10/120) 由能整除它的最大标准周期合成
+    """
+    if period in DAILY_RULES:
+        return 'daily'
+    minutes = period_minutes(period)
+    if minutes is None or minutes in UPSTREAM_MINUTES:
+        return period
+    for base in reversed(UPSTREAM_MINUTES):
+        if minutes % base == 0:
+            return str(base)
+    return '1'
+
+
+def can_derive(period, base):
+    """
+    base 周期的数据能否合成 period 周期 (base 更细且能整除)
+    """
+    if period == base:
+        return True
+    if base == 'daily':
+        return period in DAILY_RULES
+    target, source = period_minutes(period), period_minutes(base)
+    return target is not None and source is not None and target > source and target % source == 0
+
+
+def _aggregate(df, starts, label_positions):
+    """
+    按连续分组 (starts 为每组第一行位置) 合并 OHLCV，索引取 label_positions 对应的时间
+    """
+    ends = np.r_[starts[1:], len(df)] - 1
+    result = pd.DataFrame(index=df.index[label_positions])
+    for col in df.columns:
+        values = df[col].to_numpy()
+        how = OHLCV_AGG.get(col, 'last')
+        if how == 'first':
+            result[col] = values[starts]
+        elif how == 'last':
+            result[col] = values[ends]
+        elif how == 'max':
+            result[col] = np.maximum.reduceat(values, starts)
+        elif how == 'min':
+            result[col] = np.minimum.reduceat(values, starts)
+        else:
+            result[col] = np.add.reduceat(values, starts)
+    result.index.name = df.index.name
+    return result
+
+
+def _is_end_labeled(first, last, base_minutes):
+    """
+    判断时间戳是 K 线结束时间还是开始时间
+    按已知的开盘/收盘时间投票: 结束时间约定下时段第一根为 "开盘 + 周期"、最后一根为收盘时间；
+    开始时间约定下第一根为开盘时间、最后一根为 "收盘 - 周期"
+    (只用整点判断会出错: 15 分钟线结束时间 09:15、30 分钟线 09:30 都是 15 的倍数)
+    :param first, last: 各时段第一根 / 最后一根 K 线距零点的分钟数
+    """
+    end_votes = np.isin((first - base_minutes) % DAY_MINUTES, SESSION_OPENS).astype(int) - np.isin(first, SESSION_OPENS)
+    end_votes += np.isin(last, SESSION_CLOSES).astype(int) - np.isin((last + base_minutes) % DAY_MINUTES, SESSION_CLOSES)
+    score = end_votes.sum()
+    if score != 0:
+        return score > 0
+    # 时间不在已知时段上 (数据不完整等): 结束时间约定下 1/5 分钟线的第一根不在 15 分钟整点
+    return np.median(first % BREAK_MINUTES) > 0
+
+
+def _session_offset(first, base_minutes, end_labeled):
+    """
+    各时段第一根 K 线距开盘的分钟数 (开盘取不晚于该 K 线开始时间的最近开盘时间)
+    """
+    begin = (first - base_minutes) % DAY_MINUTES if end_labeled else first
+    pos = np.searchsorted(SESSION_OPENS, begin, side='right') - 1
+    # 早于当天第一个开盘时间: 属于前一天的夜盘
+    opens = np.where(pos >= 0, SESSION_OPENS[np.maximum(pos, 0)], SESSION_OPENS[-1] - DAY_MINUTES)
+    return begin - opens + (base_minutes if end_labeled else 0)
+
+
+def resample_minutes(df, minutes, base_minutes=1):
+    """
+    分钟线合成更大周期，按交易时段计数而不是按自然时间切分:
+    - 时段内按 "已交易分钟数" 每 minutes 分钟合成一根，小节休息和午休不计入
+      (如期货 60 分钟: 10:00, 11:15, 14:15, 15:00；股票 60 分钟: 10:30, 11:30, 14:00, 15:00)
+    - 夜盘与日盘分开计数，跨零点的夜盘不会在 00:00 被截断
+    - 自动识别时间戳是 K 线结束时间 (09:01 为第一根) 还是开始时间 (09:00 为第一根)，合成后沿用同一约定
+    """
+    if df is None or df.empty or minutes == base_minutes:
+        return df
+
+    ts = df.index.as_unit('ns').asi8 // (60 * 10**9) # 分钟
+    gap = np.diff(ts)
+    session_start = np.r_[True, gap > SESSION_GAP_MINUTES]
+    session_end = np.r_[session_start[1:], True]
+
+    first = ts[session_start] % DAY_MINUTES
+    end_labeled = _is_end_labeled(first, ts[session_end] % DAY_MINUTES, base_minutes)
+
+    # 每根 K 线推进的交易分钟数: 正常间隔 (含少量缺失) 按实际间隔，休市按一个周期
+    step = np.empty(len(ts), dtype=np.int64)
+    step[1:] = np.where(gap < base_minutes + BREAK_MINUTES, gap, base_minutes)
+    # 时段第一根: 距开盘的分钟数
+    first_offset = _session_offset(first, base_minutes, end_labeled)
+    step[session_start] = first_offset
+
+    session_id = np.cumsum(session_start) - 1
+    total = np.cumsum(step)
+    elapsed = total - (total[session_start] - first_offset)[session_id]
+
+    chunk = (elapsed - (1 if end_labeled else 0)) // minutes
+
+    change = np.r_[True, (session_id[1:] != session_id[:-1]) | (chunk[1:] != chunk[:-1])]
+    starts = np.flatnonzero(change)
+    labels = (np.r_[starts[1:], len(df)] - 1) if end_labeled else starts
+    return _aggregate(df, starts, labels)
+
+
+def resample_daily(df, period):
+    """
+    日线合成周线 (W-FRI) / 月线
+    """
+    if df is None or df.empty:
+        return df
+    logic = {col: OHLCV_AGG.get(col, 'last') for col in df.columns}
+    result = df.resample(DAILY_RULES[period]).agg(logic)
+    return result.dropna(subset=['Close'])
+
+
+def resample_bars(df, period, base):
+    """
+    base 周期的 K 线合成 period 周期
+    """
+    if period == base:
+        return df
+    if base == 'daily':
+        return resample_daily(df, period)
+    return resample_minutes(df, period_minutes(period), period_minutes(base))
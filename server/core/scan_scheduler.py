@@ -0,0 +1,287 @@
+import datetime
+import threading
+from sqlalchemy import func, desc
+from .database import SessionLocal, ScheduledScan, StrategyScanResult
+from .lazy import lazy_import
+from .serialization import dumps
+from .trading_calendar import trading_calendar
+
+engine_module = lazy_import("core.engine")
+
+# 收盘后运行: 日盘 15:00 收盘，夜盘最晚 02:30 收盘 (黄金、白银、原油)
+RUN_TIMES = ((datetime.time(15, 30), 'day'), (datetime.time(2, 45), 'night'))
+# 夜盘 21:00 开始，到次日凌晨 03:00 前都属于下一个交易日
+NIGHT_START = datetime.time(20, 0)
+NIGHT_END = datetime.time(3, 0)
+
+
+def next_trading_day(date, calendar=trading_calendar, inclusive=False):
+    """
+    date 之后的第一个交易日 (inclusive 时包含 date 当天)
+    """
+    day = date if inclusive else date + datetime.timedelta(days=1)
+    for _ in range(60):
+        if calendar.is_trading_day(day):
+            return day
+        day += datetime.timedelta(days=1)
+    return day
+
+
+def trade_date_for(now, calendar=trading_calendar):
+    """
+    now 时刻最新数据所属的交易日
+    夜盘归属下一个交易日 (周五夜盘属于下周一)；非交易日白天也归属下一个交易日
+    """
+    if now.time() < NIGHT_END:
+        return next_trading_day(now.date() - datetime.timedelta(days=1), calendar)
+    if now.time() >= NIGHT_START:
+        return next_trading_day(now.date(), calendar)
+    return next_trading_day(now.date(), calendar, inclusive=True)
+
+
+def next_run_at(now, run_times=RUN_TIMES):
+    """
+    now 之后最近的一次运行时间和对应的交易时段
+    """
+    candidates = []
+    for at, session in run_times:
+        run_at = datetime.datetime.combine(now.date(), at)
+        if run_at <= now:
+            run_at += datetime.timedelta(days=1)
+        candidates.append((run_at, session))
+    return min(candidates)
+
+
+def scan_config(row):
+    return {
+        "id": row.id,
+        "kind": row.kind,
+        "strategy_name": row.strategy_name,
+        "period": row.period,
+        "market_type": row.market_type,
+        "symbols": row.symbols or [],
+        "strategy_params": row.strategy_params or {},
+        "scan_window": row.scan_window,
+        "enabled": bool(row.enabled),
+    }
+
+
+def load_results(db, scan_id, trade_date=None, symbols=None):
+    """
+    读取一个扫描配置的物化结果 (按索引查询，不做任何计算)
+    :param trade_date: 交易日 (YYYY-MM-DD)，为空时取该配置最新的一个交易日
+    :param symbols: 只取这些品种 (按该顺序返回)，为空时返回全部
+    :return: (trade_date, computed_at, [payload])，没有结果时返回 (None, None, [])
+    """
+    if trade_date is None:
+        trade_date = db.query(func.max(StrategyScanResult.trade_date)).filter(StrategyScanResult.scan_id == scan_id).scalar()
+        if trade_date is None:
+            return None, None, []
+    query = db.query(StrategyScanResult.symbol, StrategyScanResult.payload, StrategyScanResult.computed_at).filter(
+        StrategyScanResult.scan_id == scan_id, StrategyScanResult.trade_date == trade_date
+    )
+    if symbols is not None:
+        query = query.filter(StrategyScanResult.symbol.in_(symbols))
+    rows = query.order_by(StrategyScanResult.seq).all()
+    if not rows:
+        return trade_date, None, []
+    if symbols is not None:
+        by_symbol = {r.symbol: r for r in rows}
+        rows = [by_symbol[symbol] for symbol in symbols if symbol in by_symbol]
+    return trade_date, min(r.computed_at for r in rows), [r.payload for r in rows]
+
+
+def results_body(trade_date, computed_at, payloads):
+    """
+    拼接 JSON 响应: 各品种结果保存的是 JSON 原文，直接拼接，不再解析
+    """
+    head = dumps({"trade_date": trade_date, "computed_at": computed_at})
+    return head[:-1] + b',"results":[' + b','.join(payloads) + b']}'
+
+
+class ScanScheduler:
+    """
+    收盘后 (日盘、夜盘) 定时运行已配置的扫描，结果物化到 strategy_scan_results
+    批量分析 / 信号扫描请求与某个配置一致时直接读取物化结果，不在请求时计算
+    """
+
+    def __init__(self, session_factory=SessionLocal, run_times=RUN_TIMES, calendar=trading_calendar):
+        self.session_factory = session_factory
+        self.run_times = run_times
+        self.calendar = calendar
+        self._timer = None
+        self._run_lock = threading.Lock()
+
+    def configs(self, enabled_only=True):
+        db = self.session_factory()
+        try:
+            query = db.query(ScheduledScan)
+            if enabled_only:
+                query = query.filter(ScheduledScan.enabled == 1)
+            return [scan_config(row) for row in query.order_by(ScheduledScan.id).all()]
+        finally:
+            db.close()
+
+    def session_runs(self, run_at, session, market_type=None):
+        """
+        该收盘时间点是否运行扫描: 日盘只在交易日运行；夜盘只在交易日晚上有，股票没有夜盘
+        """
+        if session == 'night':
+            return market_type != 'stock' and self.calendar.is_trading_day(run_at.date() - datetime.timedelta(days=1))
+        return self.calendar.is_trading_day(run_at.date())
+
+    def last_run_at(self, now, market_type=None):
+        """
+        now 之前最近一次 (该市场) 运行扫描的收盘时间点，之后计算的物化结果仍是最新的
+        """
+        for days in range(30):
+            day = now.date() - datetime.timedelta(days=days)
+            runs = [(datetime.datetime.combine(day, at), session) for at, session in self.run_times]
+            runs = [run_at for run_at, session in runs if run_at <= now and self.session_runs(run_at, session, market_type)]
+            if runs:
+                return max(runs)
+        return None
+
+    def find_materialized(self, db, kind, strategy_name, period, market_type, strategy_params, symbols, scan_window=None, now=None):
+        """
+        查找与请求一致 (策略、周期、市场、参数相同且品种已覆盖) 且最近一次收盘后计算的物化结果
+        :return: (trade_date, computed_at, [payload])，没有可用结果时返回 None
+        """
+        configs = db.query(ScheduledScan).filter(
+            ScheduledScan.kind == kind, ScheduledScan.strategy_name == strategy_name, ScheduledScan.period == period,
+            ScheduledScan.market_type == market_type, ScheduledScan.enabled == 1
+        ).order_by(desc(ScheduledScan.id)).all()
+        wanted = set(symbols)
+        last_run = self.last_run_at(now or datetime.datetime.now(), market_type)
+        for row in configs:
+            config = scan_config(row)
+            if config['strategy_params'] != strategy_params or not wanted <= set(config['symbols']):
+                continue
+            if kind == 'scan' and config['scan_window'] != scan_window:
+                continue
+            trade_date, computed_at, payloads = load_results(db, config['id'], symbols=list(symbols))
+            if len(payloads) == len(symbols) and (last_run is None or computed_at >= last_run):
+                return trade_date, computed_at, payloads
+        return None
+
+    def compute(self, config):
+        """
+        运行一个扫描配置 (品种有检查点时只计算新 K 线)
+        """
+        engine = engine_module.BacktestEngine()
+        if config['kind'] == 'scan':
+            return engine.scan_signals(config['symbols'], config['period'], config['scan_window'] or 5,
+                                       dict(config['strategy_params']), strategy_name=config['strategy_name'],
+                                       market_type=config['market_type'])
+        return engine.analyze_batch(config['symbols'], config['period'], dict(config['strategy_params']),
+                                    strategy_name=config['strategy_name'], market_type=config['market_type'])
+
+    def materialize(self, config, trade_date, results):
+        """
+        在一个事务中整体替换该配置在该交易日的结果，读取方只会看到旧结果或新结果
+        :return: 写入行数
+        """
+        now = datetime.datetime.now()
+        rows = [{
+            "scan_id": config['id'],
+            "kind": config['kind'],
+            "strategy_name": config['strategy_name'],
+            "period": config['period'],
+            "market_type": config['market_type'],
+            "trade_date": trade_date,
+            "symbol": result['symbol'],
+            "seq": seq,
+            "payload": dumps(result),
+            "computed_at": now,
+        } for seq, result in enumerate(results)]
+
+        db = self.session_factory()
+        try:
+            db.query(StrategyScanResult).filter(
+                StrategyScanResult.scan_id == config['id'], StrategyScanResult.trade_date == trade_date
+            ).delete(synchronize_session=False)
+            if rows:
+                db.bulk_insert_mappings(StrategyScanResult, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return len(rows)
+
+    def run_scan(self, config, trade_date=None):
+        """
+        运行并物化一个扫描配置
+        :param trade_date: 结果对应的交易日，为空时按当前时间推算
+        """
+        if trade_date is None:
+            trade_date = trade_date_for(datetime.datetime.now(), self.calendar)
+        trade_date = str(trade_date)[:10]
+        results = self.compute(config)
+        if isinstance(results, dict):
+            raise ValueError(results.get("error", "扫描失败"))
+        count = self.materialize(config, trade_date, results)
+        print(f"定时扫描完成: #{config['id']} {config['strategy_name']} {config['period']} {trade_date} ({count} 个品种)")
+        return count
+
+    def run_session(self, run_at, session):
+        """
+        运行一个交易时段收盘后的全部扫描
+        """
+        if not self.session_runs(run_at, session):
+            return 0
+        trade_date = trade_date_for(run_at, self.calendar)
+        done = 0
+        with self._run_lock:
+            for config in self.configs():
+                if not self.session_runs(run_at, session, config['market_type']):
+                    continue
+                try:
+                    self.run_scan(config, trade_date)
+                    done += 1
+                except Exception as e:
+                    print(f"定时扫描 #{config['id']} 失败: {e}")
+        return done
+
+    def run_in_background(self, config):
+        """
+        立即运行一个扫描 (手动触发)，与定时任务串行
+        """
+        def run():
+            with self._run_lock:
+                try:
+                    self.run_scan(config)
+                except Exception as e:
+                    print(f"扫描 #{config['id']} 失败: {e}")
+
+        threading.Thread(target=run, name=f"scheduled-scan-{config['id']}", daemon=True).start()
+
+    def start_scheduler(self):
+        """
+        在应用启动时调用，每个收盘时间点运行一次
+        """
+        self._schedule()
+
+    def _schedule(self):
+        run_at, session = next_run_at(datetime.datetime.now(), self.run_times)
+
+        def tick():
+            try:
+                self.run_session(run_at, session)
+            except Exception as e:
+                print(f"定时扫描失败: {e}")
+            self._schedule()
+
+        delay = max((run_at - datetime.datetime.now()).total_seconds(), 0)
+        self._timer = threading.Timer(delay, tick)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop_scheduler(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+scan_scheduler = ScanScheduler()
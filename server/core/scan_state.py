@@ -0,0 +1,120 @@
+import datetime
+import threading
+from collections import OrderedDict
+import numpy as np
+from .panel import panel_books, strategy_params
+from .warmup import strategy_lookback
+
+class ScanCheckpoints:
+    """
+    批量扫描的检查点 (进程内缓存)
+    key 为 (扫描类型, 策略, 参数, 周期, 市场, 代码)，保存倒数第二根 K 线处的策略状态:
+    尾部 K 线收盘价 (滑动窗口指标)、递归指标状态、持仓和未成交订单、已记录的开仓信号
+    再次扫描时只计算检查点之后的 K 线
+    持仓状态与数据起点有关，只有数据起点不变时才从检查点继续 (见 scan_start)，因此结果与从头扫描一致
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            checkpoint = self._items.get(key)
+            if checkpoint is not None:
+                self._items.move_to_end(key)
+            return checkpoint
+
+    def put(self, key, checkpoint):
+        with self._lock:
+            self._items[key] = checkpoint
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+scan_checkpoints = ScanCheckpoints()
+
+
+def scan_start(days, now=None):
+    """
+    批量分析/信号扫描的数据开始日期: 至少 days 天前，取所在月份的第一天
+    开始日期每天滑动时，策略状态 (持仓、反手) 随起点变化，检查点无法复用；
+    固定到月初后一个月内起点不变，每天只需计算新 K 线
+    """
+    now = now or datetime.datetime.now()
+    return (now - datetime.timedelta(days=days)).strftime('%Y-%m-01')
+
+
+def checkpoint_key(kind, StrategyClass, params, period, market_type, symbol):
+    p = strategy_params(StrategyClass, params)
+    # 策略代码参与 key: engine 每次重新加载策略文件，修改 vector_signals 后旧检查点失效
+    code = StrategyClass.vector_signals.__func__.__code__
+    values = repr([(name, getattr(p, name)) for name in p._getkeys()])
+    return (kind, StrategyClass.__name__, code, values, period, market_type, symbol)
+
+
+def resume_at(checkpoint, df):
+    """
+    检查点之后第一根 K 线在 df 中的位置
+    数据起点与检查点链的起点不同 (起点变化后持仓状态不同)、尾部收盘价与 df 不一致 (数据被修正、前复权价格随除权变化)
+    或之后没有 K 线时返回 None (需要从头计算)
+    """
+    if df.index[0] != checkpoint['first']:
+        return None
+    last = checkpoint['last']
+    pos = int(df.index.searchsorted(last))
+    tail = len(checkpoint['closes'])
+    if pos >= len(df) - 1 or df.index[pos] != last or pos + 1 < tail:
+        return None
+    closes = df['close'].to_numpy(dtype=np.float64)[pos + 1 - tail:pos + 1]
+    if not np.array_equal(closes, checkpoint['closes'], equal_nan=True):
+        return None
+    return pos + 1
+
+
+def incremental_books(StrategyClass, items, params, kind, period, market_type, store=None):
+    """
+    向量化扫描整个品种池，有检查点的品种只计算新 K 线 (每日扫描的计算量与新 K 线数成正比)
+    :param items: [(symbol, df)]，df 为本次扫描的完整数据
+    :param kind: 扫描类型 ('scan' / 'batch')，数据区间不同，检查点分开保存
+    :return: 每个品种的 EntryBook；bars 为检查点链起点 (即 df 起点) 以来的 K 线数，bar_index 与之对应
+    """
+    store = scan_checkpoints if store is None else store
+    tail_bars = strategy_lookback(StrategyClass, params) + 1
+    keys, frames, resume = [], [], []
+    for symbol, df in items:
+        key = checkpoint_key(kind, StrategyClass, params, period, market_type, symbol)
+        checkpoint = store.get(key)
+        at = resume_at(checkpoint, df) if checkpoint is not None else None
+        if at is None:
+            frames.append(df)
+            resume.append(None)
+        else:
+            tail = len(checkpoint['closes'])
+            frames.append(df.iloc[at - tail:])
+            resume.append(dict(checkpoint, tail=tail))
+        keys.append(key)
+    resumed = sum(cp is not None for cp in resume)
+    if resumed:
+        print(f"增量扫描: {resumed}/{len(items)} 个品种从检查点继续")
+
+    books = []
+    for (symbol, df), frame, key, (book, checkpoint) in zip(items, frames, keys, panel_books(StrategyClass, frames, params, resume)):
+        books.append(book)
+        if checkpoint is None:
+            continue
+        mark = len(frame) - 2
+        checkpoint['first'] = df.index[0]
+        checkpoint['last'] = frame.index[mark]
+        checkpoint['closes'] = frame['close'].to_numpy(dtype=np.float64)[max(0, mark + 1 - tail_bars):mark + 1]
+        store.put(key, checkpoint)
+    return books
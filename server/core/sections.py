@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# 已保存回测中可以单独分页读取的部分
+DETAIL_SECTIONS = ('kline_data', 'equity_curve', 'trades', 'logs')
+
+
+class DetailCache:
+    """
+    最近读取的回测完整结果 (已解压)
+    前端懒加载时同一条记录的多个部分/多页会连续请求，避免每次都重新解压整个结果
+    保存的记录不可变，按 (id, 创建时间) 缓存即可
+    """
+
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        value = loader()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+def _item_date(section, item):
+    if section == 'logs':
+        # 日志格式: "2024-01-02 09:30:00, 买入..."
+        return item.split(',', 1)[0] if isinstance(item, str) else None
+    return item.get('date') if isinstance(item, dict) else None
+
+
+def _date_mask(dates, start=None, end=None):
+    """
+    日期过滤 [start, end]；end 只有日期部分时包含当天全部 K 线
+    无法解析日期的条目在指定范围时被排除
+    """
+    parsed = pd.to_datetime(pd.Series(dates, dtype=object), errors='coerce', format='mixed')
+    mask = parsed.notna()
+    if start:
+        mask &= parsed >= pd.to_datetime(start)
+    if end:
+        end_ts = pd.to_datetime(end)
+        if len(str(end).strip()) <= 10:
+            mask &= parsed < end_ts + pd.Timedelta(days=1)
+        else:
+            mask &= parsed <= end_ts
+    return mask.to_numpy()
+
+
+def _take(obj, positions, length):
+    """
+    K 线数据中所有与 dates 等长的数组 (K线、成交量、均线、MACD、DKX) 按同一组位置截取
+    """
+    if isinstance(obj, dict):
+        return {k: _take(v, positions, length) for k, v in obj.items()}
+    if isinstance(obj, list) and len(obj) == length:
+        return [obj[i] for i in positions]
+    return obj
+
+
+def slice_section(detail, section, start=None, end=None, offset=0, limit=None):
+    """
+    按日期范围和/或位置 (offset/limit) 截取回测结果中的一部分
+    :return: {"section", "total", "offset", "limit", "index", "data"}
+             total 为日期过滤后的条数，index 为返回的第一条在完整数据中的位置
+    """
+    raw = (detail or {}).get(section)
+    if section == 'kline_data':
+        raw = raw or {}
+        length = len(raw.get('dates') or [])
+        dates = raw.get('dates') or []
+    else:
+        raw = raw or []
+        length = len(raw)
+        dates = [_item_date(section, item) for item in raw] if (start or end) else None
+
+    if start or end:
+        positions = [i for i, keep in enumerate(_date_mask(dates, start, end)) if keep]
+    else:
+        positions = range(length)
+
+    total = len(positions)
+    offset = max(0, offset or 0)
+    stop = total if limit is None else min(total, offset + max(1, limit))
+    page = positions[offset:stop]
+
+    if section == 'kline_data':
+        data = _take(raw, page, length)
+    else:
+        data = [raw[i] for i in page]
+
+    return {
+        "section": section,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "index": page[0] if len(page) else None,
+        "data": data,
+    }
+
+
+detail_cache = DetailCache()
@@ -0,0 +1,140 @@
+import json
+import math
+import zlib
+import hashlib
+import datetime
+import numpy as np
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    # 未安装 orjson 时回退到标准库 json (功能一致，速度较慢)
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    # 未安装 zstandard 时使用标准库 zlib 压缩
+    zstandard = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """
+    处理 orjson / json 无法直接序列化的类型 (pandas Timestamp, numpy 标量等)
+    """
+    if isinstance(obj, np.ndarray):
+        return _sanitize(obj.tolist())
+    if isinstance(obj, np.generic):
+        return _sanitize(obj.item())
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        # pandas.Timestamp 是 datetime 的子类，orjson 不直接支持
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _sanitize(obj):
+    """
+    递归将 NaN/Inf 替换为 None (仅用于标准库 json 回退路径，orjson 会自动输出 null)
+    """
+    if isinstance(obj, float):
+        if math.isnan(obj) or math.isinf(obj):
+            return None
+        return obj
+    if isinstance(obj, dict):
+        return {k: _sanitize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sanitize(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return _sanitize(obj.tolist())
+    if isinstance(obj, np.generic):
+        return _sanitize(obj.item())
+    return obj
+
+
+def dumps(obj):
+    """
+    将结果序列化为 JSON bytes
+    - 支持 numpy 数组/标量、datetime
+    - NaN/Inf 输出为 null
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        _sanitize(obj), default=_default, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def pack(obj):
+    """
+    将对象编码为紧凑 JSON 并压缩，用于数据库 blob 存储
+    :return: (codec, bytes)，codec 记录压缩方式以便解码
+    """
+    raw = dumps(obj)
+    if zstandard is not None:
+        return "zstd+json", zstandard.ZstdCompressor(level=3).compress(raw)
+    return "zlib+json", zlib.compress(raw, 6)
+
+
+def unpack(codec, data):
+    """
+    pack 的逆操作
+    """
+    if codec == "zstd+json":
+        if zstandard is None:
+            raise RuntimeError("该记录使用 zstd 压缩，请安装 zstandard")
+        return loads(zstandard.ZstdDecompressor().decompress(data))
+    if codec == "zlib+json":
+        return loads(zlib.decompress(data))
+    raise ValueError(f"未知的编码格式: {codec}")
+
+
+class FastJSONResponse(Response):
+    """
+    大体积结果的快速 JSON 响应
+    直接返回该响应对象可以跳过 FastAPI 默认的 jsonable_encoder 遍历
+    """
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
+
+
+# 已保存的回测记录不会被修改，允许浏览器/代理长期缓存
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def make_etag(*parts):
+    """
+    根据记录的不可变标识 (如 id + 创建时间) 生成强 ETag
+    无需序列化结果即可判断缓存是否命中
+    """
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    判断请求头 If-None-Match 是否命中当前 ETag
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # 弱比较: 忽略 W/ 前缀 (压缩中间件或代理可能会将 ETag 改为弱校验)
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+from .resample import upstream_period, can_derive
+
+# 分钟数据会不断产生新 K 线，缓存时间较短；日线只在收盘后变化
+MINUTE_TTL = 120
+DAILY_TTL = 1800
+
+
+class SeriesCache:
+    """
+    已下载 K 线 (清洗后、未按日期过滤) 的进程内缓存
+    key 为 (市场, 数据源, 代码)，每个 key 下按周期保存
+    请求某个周期时优先用已缓存的更细周期合成 (1分钟 -> 5/15/30/60，日线 -> 周线/月线)，
+    切换周期不需要重新下载
+    """
+
+    def __init__(self, maxsize=64, minute_ttl=MINUTE_TTL, daily_ttl=DAILY_TTL):
+        self.maxsize = maxsize
+        self.minute_ttl = minute_ttl
+        self.daily_ttl = daily_ttl
+        self._items = OrderedDict() # (key, period) -> (fetched_at, df)
+        self._lock = threading.Lock()
+
+    def _ttl(self, period):
+        return self.daily_ttl if period == 'daily' else self.minute_ttl
+
+    def get(self, key, period):
+        with self._lock:
+            entry = self._items.get((key, period))
+            if entry is None:
+                return None
+            fetched_at, df = entry
+            if time.monotonic() - fetched_at > self._ttl(period):
+                del self._items[(key, period)]
+                return None
+            self._items.move_to_end((key, period))
+        # 浅拷贝: 调用方增加列 (如 ma_fast) 不会影响缓存 (pandas 写时复制)
+        return df.copy(deep=False)
+
+    def put(self, key, period, df):
+        with self._lock:
+            self._items[(key, period)] = (time.monotonic(), df)
+            self._items.move_to_end((key, period))
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def cached_periods(self, key):
+        with self._lock:
+            return [period for (k, period) in self._items if k == key]
+
+    def find_base(self, key, period, start_date=None):
+        """
+        查找可以合成 period 的已缓存更细周期 (越细越优先)
+        分钟数据源通常只提供最近一段历史，只有覆盖到 start_date 时才使用；日线视为完整历史
+        :return: (base, df) 或 None
+        """
+        candidates = [p for p in self.cached_periods(key) if p != period and can_derive(period, p)]
+        candidates.sort(key=lambda p: 0 if p == 'daily' else int(p))
+        for base in candidates:
+            df = self.get(key, base)
+            if df is None or df.empty:
+                continue
+            if base == 'daily' or (start_date and df.index[0] <= pd.to_datetime(start_date)):
+                return base, df
+        return None
+
+    def load(self, key, period, start_date, download):
+        """
+        获取 period 周期的数据来源
+        :param download: download(周期) -> DataFrame，从数据源下载 (只会以数据源支持的周期调用)
+        :return: (df, base)；base != period 时调用方需用 resample_bars 合成 (先按日期过滤再合成)
+        """
+        df = self.get(key, period)
+        if df is not None:
+            print(f"使用缓存的 {period} 数据: {key}")
+            return df, period
+
+        found = self.find_base(key, period, start_date)
+        if found is not None:
+            print(f"使用缓存的 {found[0]} 数据合成 {period} 数据: {key}")
+            return found[1], found[0]
+
+        base = upstream_period(period)
+        df = self.get(key, base) if base != period else None
+        if df is None:
+            df = download(base)
+            if df is None or df.empty:
+                return df, base
+            self.put(key, base, df)
+            df = df.copy(deep=False)
+        return df, base
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+series_cache = SeriesCache()
@@ -0,0 +1,79 @@
+import array
+import os
+import tempfile
+import numpy as np
+from .serialization import dumps, loads
+
+
+class SpillArray:
+    """
+    定长 float64 记录的磁盘缓冲 (如每根 K 线的 [时间, 权益])
+    内存中只保留最近 chunk_rows 行，其余追加写入临时文件
+    """
+
+    def __init__(self, width, chunk_rows=65536, dir=None):
+        self.width = width
+        self.chunk_rows = chunk_rows
+        self._buffer = array.array('d')
+        self._file = tempfile.TemporaryFile(prefix="spill_", suffix=".f64", dir=dir)
+        self._rows = 0
+
+    def __len__(self):
+        return self._rows
+
+    def append(self, *values):
+        self._buffer.extend(values)
+        self._rows += 1
+        if len(self._buffer) >= self.chunk_rows * self.width:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._buffer.tofile(self._file)
+            self._buffer = array.array('d')
+
+    def to_numpy(self):
+        """
+        读取全部记录，返回 (rows, width) 数组
+        """
+        self._flush()
+        self._file.seek(0)
+        data = np.fromfile(self._file, dtype=np.float64)
+        self._file.seek(0, os.SEEK_END)
+        return data.reshape(-1, self.width)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._buffer = array.array('d')
+
+
+class SpillList:
+    """
+    可追加、可迭代的 JSON 记录列表，数据写入临时文件 (每行一条)
+    用于低内存模式下替代交易记录等 list
+    """
+
+    def __init__(self, dir=None):
+        self._file = tempfile.TemporaryFile(prefix="spill_", suffix=".jsonl", dir=dir)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, item):
+        self._file.write(dumps(item) + b"\n")
+        self._count += 1
+
+    def __iter__(self):
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield loads(line)
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
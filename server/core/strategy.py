@@ -1,5 +1,6 @@
 import backtrader as bt
 import datetime
+import numpy as np
 
 # --- 基础策略类 ---
 class BaseStrategy(bt.Strategy):
@@ -22,6 +23,14 @@ class BaseStrategy(bt.Strategy):
         ('use_trailing_stop', False),
     )
 
+    def data_length(self):
+        """
+        数据总长度 (K 线数)
+        预加载时等于 buflen()；低内存模式 (exactbars) 下缓冲区只保留最近几根，使用数据源提供的总长度
+        """
+        total = getattr(self.datas[0], 'total_bars', None)
+        return total if total is not None else self.datas[0].buflen()
+
     def log(self, txt, dt=None):
         if self.params.print_log:
             dt = dt or self.datas[0].datetime.date(0)
@@ -81,9 +90,9 @@ class BaseStrategy(bt.Strategy):
         # 2. 检查数据结束 (强制平仓)
         # 优先使用 buflen 判断 (回测模式)
         is_near_end = False
-        if self.datas[0].buflen() > 0:
+        if self.data_length() > 0:
             # 在倒数第二根K线时发出平仓指令，以便在最后一根K线执行
-            if len(self.datas[0]) == self.datas[0].buflen() - 1:
+            if len(self.datas[0]) == self.data_length() - 1:
                 is_near_end = True
         
         # 辅助使用 end_date 判断 (实盘或 buflen 无效时)
@@ -116,7 +125,7 @@ class BaseStrategy(bt.Strategy):
                 return False # 停止当前K线的其他信号处理
             
         # 最后一根K线直接跳过，防止产生新信号
-        if self.datas[0].buflen() > 0 and len(self.datas[0]) >= self.datas[0].buflen():
+        if self.data_length() > 0 and len(self.datas[0]) >= self.data_length():
             if not self.params.disable_auto_close:
                 return False
 
@@ -186,6 +195,15 @@ class TrendFollowingStrategy(BaseStrategy):
             self.log(f'死叉 (快线 {self.ma_fast[0]:.2f} < 慢线 {self.ma_slow[0]:.2f})')
             self.order = self.order_target_size(target=-self.params.fixed_size)
 
+    @classmethod
+    def vector_signals(cls, panel, p):
+        """
+        向量化信号 (用于 core.panel 批量扫描): 金叉做多，死叉做空
+        """
+        ma = panel.ema if p.use_expma else panel.sma
+        cross = panel.crossover(ma('close', p.fast_period), ma('close', p.slow_period))
+        return panel.targets(long=cross > 0, short=cross < 0)
+
 class MA5MA20CrossoverStrategy(BaseStrategy):
     """
     5/20双均线交叉策略
@@ -222,6 +240,14 @@ class MA5MA20CrossoverStrategy(BaseStrategy):
             self.log(f'死叉信号: 做空 (MA{self.params.fast_period}={self.ma_fast[0]:.2f} < MA{self.params.slow_period}={self.ma_slow[0]:.2f})')
             self.order = self.order_target_size(target=-self.params.fixed_size)
 
+    @classmethod
+    def vector_signals(cls, panel, p):
+        """
+        向量化信号 (用于 core.panel 批量扫描): 金叉做多，死叉做空
+        """
+        cross = panel.crossover(panel.sma('close', p.fast_period), panel.sma('close', p.slow_period))
+        return panel.targets(long=cross > 0, short=cross < 0)
+
 class MA20MA55CrossoverStrategy(BaseStrategy):
     """
     20/55双均线交叉策略 (多空)
@@ -251,6 +277,14 @@ class MA20MA55CrossoverStrategy(BaseStrategy):
             self.log('卖出信号 (死叉)')
             self.order = self.order_target_size(target=-self.params.fixed_size)
 
+    @classmethod
+    def vector_signals(cls, panel, p):
+        """
+        向量化信号 (用于 core.panel 批量扫描): 金叉做多，死叉做空
+        """
+        cross = panel.crossover(panel.sma('close', p.fast_period), panel.sma('close', p.slow_period))
+        return panel.targets(long=cross > 0, short=cross < 0)
+
 class StockMA20MA55LongOnlyStrategy(BaseStrategy):
     """
     20/55双均线多头策略 (仅做多)
@@ -281,6 +315,14 @@ class StockMA20MA55LongOnlyStrategy(BaseStrategy):
                 self.log('平仓信号 (死叉)')
                 self.order = self.close()
 
+    @classmethod
+    def vector_signals(cls, panel, p):
+        """
+        向量化信号 (用于 core.panel 批量扫描): 金叉做多，死叉平多
+        """
+        cross = panel.crossover(panel.sma('close', p.fast_period), panel.sma('close', p.slow_period))
+        return panel.targets(long=cross > 0, close=cross < 0)
+
 class DualMAFixedTPSLStrategy(BaseStrategy):
     """
     20/55双均线交叉(多空) + 固定止盈止损策略
@@ -578,7 +620,7 @@ class DKXPartialTakeProfitStrategy(DKXStrategy):
         super().next() # 执行信号逻辑
         
         # 如果是最后两根K线（已在pre_next处理平仓或跳过），则停止后续逻辑
-        if len(self.datas[0]) >= self.datas[0].buflen() - 1:
+        if len(self.datas[0]) >= self.data_length() - 1:
             return
 
         # 止盈逻辑
@@ -624,6 +666,18 @@ class MA55BreakoutStrategy(BaseStrategy):
         elif self.data.close[0] < self.ma[0] and self.data.close[-1] >= self.ma[-1]:
             self.order = self.order_target_size(target=-self.params.fixed_size)
 
+    @classmethod
+    def vector_signals(cls, panel, p):
+        """
+        向量化信号 (用于 core.panel 批量扫描): 收盘价上穿 MA 做多，下穿做空
+        """
+        close, ma = panel.field('close'), panel.sma('close', p.ma_period)
+        d = panel.diff(close, ma)
+        before = np.full(d.shape, np.nan)
+        before[:, 1:] = d[:, :-1]
+        with np.errstate(invalid='ignore'):
+            return panel.targets(long=(d > 0) & (before <= 0), short=(d < 0) & (before >= 0))
+
 class MA55TouchExitStrategy(BaseStrategy):
     """
     MA55 突破 + 触碰平仓 (简化恢复版)
@@ -0,0 +1,134 @@
+import datetime
+import threading
+from .database import SessionLocal, SymbolAlias
+
+# 加权/指数代码的候选后缀，按优先级排列
+# 用户反馈：加权一般是888 (如 SH888)，旧版为 13
+WEIGHTED_SUFFIXES = ['888', '13', 'Index', '88', '99']
+
+
+def weighted_base(symbol):
+    """
+    从主力/加权代码中提取品种代码: SH0 -> SH, SH888 -> SH
+    """
+    if symbol.endswith('888'):
+        return symbol[:-3]
+    return symbol.rstrip('0') if symbol.endswith('0') else symbol
+
+
+def weighted_candidates(symbol):
+    base = weighted_base(symbol)
+    return [f"{base}{suffix}" for suffix in WEIGHTED_SUFFIXES]
+
+
+class AliasResolver:
+    """
+    加权代码解析结果的持久化缓存
+    - 命中: 直接用已解析的代码请求一次数据源
+    - 负缓存: 已确认没有加权数据的品种直接回退主力，不再逐个尝试
+    - 过期后重新探测 (数据源可能新增/下线代码)
+    """
+
+    def __init__(self, source='weighted_daily', session_factory=SessionLocal,
+                 positive_ttl=datetime.timedelta(days=7), negative_ttl=datetime.timedelta(days=1)):
+        self.source = source
+        self.session_factory = session_factory
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._memory = {} # variety -> (resolved, checked_at)
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, resolved, checked_at):
+        ttl = self.positive_ttl if resolved else self.negative_ttl
+        return checked_at is not None and datetime.datetime.now() - checked_at < ttl
+
+    def lookup(self, variety):
+        """
+        :return: (found, resolved)，found 为 False 表示没有有效缓存需要探测
+        """
+        with self._lock:
+            entry = self._memory.get(variety)
+        if entry is None:
+            try:
+                db = self.session_factory()
+                try:
+                    row = db.get(SymbolAlias, (variety, self.source))
+                    if row is not None:
+                        entry = (row.resolved, row.checked_at)
+                finally:
+                    db.close()
+            except Exception as e:
+                print(f"读取代码别名缓存失败: {e}")
+            if entry is not None:
+                with self._lock:
+                    self._memory[variety] = entry
+        if entry is not None and self._is_fresh(*entry):
+            return True, entry[0]
+        return False, None
+
+    def store(self, variety, resolved):
+        checked_at = datetime.datetime.now()
+        with self._lock:
+            self._memory[variety] = (resolved, checked_at)
+        try:
+            db = self.session_factory()
+            try:
+                db.merge(SymbolAlias(variety=variety, source=self.source, resolved=resolved, checked_at=checked_at))
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"保存代码别名缓存失败: {e}")
+
+    def invalidate(self, variety):
+        with self._lock:
+            self._memory.pop(variety, None)
+        try:
+            db = self.session_factory()
+            try:
+                db.query(SymbolAlias).filter(SymbolAlias.variety == variety, SymbolAlias.source == self.source).delete()
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"删除代码别名缓存失败: {e}")
+
+    def fetch(self, symbol, fetcher):
+        """
+        使用加权代码获取数据
+        :param fetcher: fetcher(code) -> DataFrame，失败时抛异常或返回空
+        :return: (resolved_code, df)，resolved_code 为 None 表示没有加权数据，调用方应回退主力
+        """
+        variety = weighted_base(symbol)
+        found, resolved = self.lookup(variety)
+        if found:
+            if resolved is None:
+                return None, None
+            try:
+                df = fetcher(resolved)
+                if df is not None and not df.empty:
+                    return resolved, df
+            except Exception as e:
+                print(f"加权代码 {resolved} 获取失败: {e}")
+            # 缓存的代码已失效，下次请求重新探测
+            self.invalidate(variety)
+            return None, None
+
+        for candidate in weighted_candidates(symbol):
+            try:
+                print(f"尝试加权代码: {candidate}")
+                df = fetcher(candidate)
+                if df is not None and not df.empty:
+                    print(f"成功获取加权代码: {candidate}")
+                    self.store(variety, candidate)
+                    return candidate, df
+            except Exception:
+                continue
+
+        self.store(variety, None)
+        return None, None
+
+
+# 日线与分钟线接口可用的加权代码不一定相同，分别缓存
+weighted_daily_aliases = AliasResolver('weighted_daily')
+weighted_minute_aliases = AliasResolver('weighted_minute')
@@ -0,0 +1,373 @@
+import bisect
+import datetime
+import threading
+from .lazy import lazy_import
+from .database import SessionLocal, StockSymbol
+from .constants import FUTURES_MULTIPLIERS, FUTURES_NAMES
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:
+    # 未安装 pypinyin 时使用 GB2312 区位表推算首字母 (覆盖一级常用汉字)
+    lazy_pinyin = None
+
+# akshare 导入较慢，刷新股票列表时再导入
+ak = lazy_import("akshare")
+
+# 股票列表每天刷新一次 (新股上市/退市/更名)
+REFRESH_INTERVAL = datetime.timedelta(hours=24)
+
+# 指数不在 stock_info_a_code_name 中，固定加在列表最前面
+STOCK_INDICES = [
+    {"code": "sh000001", "name": "上证指数", "multiplier": 1},
+    {"code": "sz399001", "name": "深证成指", "multiplier": 1},
+    {"code": "sh000300", "name": "沪深300", "multiplier": 1},
+    {"code": "sh000905", "name": "中证500", "multiplier": 1},
+    {"code": "sh000852", "name": "中证1000", "multiplier": 1},
+    {"code": "sz399006", "name": "创业板指", "multiplier": 1},
+]
+
+# 网络不可用且本地没有缓存时的兜底列表
+FALLBACK_STOCKS = [
+    {"code": "sh600519", "name": "贵州茅台", "multiplier": 100},
+    {"code": "sz000858", "name": "五粮液", "multiplier": 100},
+    {"code": "sh600036", "name": "招商银行", "multiplier": 100},
+    {"code": "sz002594", "name": "比亚迪", "multiplier": 100},
+    {"code": "sh601318", "name": "中国平安", "multiplier": 100},
+    {"code": "sz300750", "name": "宁德时代", "multiplier": 100},
+    {"code": "sh600030", "name": "中信证券", "multiplier": 100},
+]
+
+
+def stock_full_code(code):
+    """
+    6 位代码补全交易所前缀: 600519 -> sh600519
+    """
+    code = str(code)
+    if len(code) == 6:
+        if code.startswith('6'):
+            return f"sh{code}"
+        if code.startswith('0') or code.startswith('3'):
+            return f"sz{code}"
+        if code.startswith('4') or code.startswith('8') or code.startswith('9'):
+            return f"bj{code}"
+    return code
+
+
+# GB2312 一级汉字按拼音排序，每个声母区间的起始编码
+_GB2312_INITIALS = [
+    (0xB0A1, 'a'), (0xB0C5, 'b'), (0xB2C1, 'c'), (0xB4EE, 'd'), (0xB6EA, 'e'), (0xB7A2, 'f'),
+    (0xB8C1, 'g'), (0xB9FE, 'h'), (0xBBF7, 'j'), (0xBFA6, 'k'), (0xC0AC, 'l'), (0xC2E8, 'm'),
+    (0xC4C3, 'n'), (0xC5B6, 'o'), (0xC5BE, 'p'), (0xC6DA, 'q'), (0xC8BB, 'r'), (0xC8F6, 's'),
+    (0xCBFA, 't'), (0xCDDA, 'w'), (0xCEF4, 'x'), (0xD1B9, 'y'), (0xD4D1, 'z'),
+]
+_GB2312_KEYS = [code for code, _ in _GB2312_INITIALS]
+_GB2312_END = 0xD7F9
+
+# 品种名称中常见的多音字
+_POLYPHONES = {'行': 'h'}
+
+
+def _char_initial(ch):
+    if ch in _POLYPHONES:
+        return _POLYPHONES[ch]
+    if ch.isascii():
+        return ch.lower() if ch.isalnum() else ''
+    if lazy_pinyin is not None:
+        return lazy_pinyin(ch, style=Style.FIRST_LETTER)[0][:1].lower()
+    try:
+        encoded = ch.encode('gb2312')
+    except UnicodeEncodeError:
+        return ''
+    if len(encoded) != 2:
+        return ''
+    value = encoded[0] << 8 | encoded[1]
+    if value < _GB2312_KEYS[0] or value > _GB2312_END:
+        # 二级汉字按部首排序，无法推算
+        return ''
+    return _GB2312_INITIALS[bisect.bisect_right(_GB2312_KEYS, value) - 1][1]
+
+
+def pinyin_initials(text):
+    """
+    拼音首字母 (小写): 贵州茅台 -> gzmt，字母数字原样保留: 沪深300 -> hs300
+    """
+    return ''.join(_char_initial(ch) for ch in text)
+
+
+class SymbolIndex:
+    """
+    不可变的品种代码索引
+    - items: 原始顺序 (指数在前)，用于分页返回
+    - 代码/名称/拼音首字母各维护一份排序数组，前缀查询用 bisect，O(log n)
+    """
+
+    def __init__(self, items, built_at=None, names=None):
+        """
+        :param names: 用于名称/拼音匹配的名称 (默认 item["name"])，如期货用 "螺纹钢" 而不是 "RB (螺纹钢)"
+        """
+        self.items = list(items)
+        self.built_at = built_at
+        names = names or [item["name"] for item in self.items]
+
+        # (key, 原始位置)，股票按完整代码和 6 位代码、期货按主力代码和品种代码各建一个 key
+        code_keys = []
+        for i, item in enumerate(self.items):
+            code = item["code"].lower()
+            code_keys.append((code, i))
+            if len(code) == 8:
+                code_keys.append((code[2:], i))
+            elif code.endswith('0'):
+                code_keys.append((code[:-1], i))
+        self._code_keys, self._code_pos = self._sorted(code_keys)
+        self._name_keys, self._name_pos = self._sorted((name, i) for i, name in enumerate(names))
+        self._pinyin_keys, self._pinyin_pos = self._sorted((pinyin_initials(name), i) for i, name in enumerate(names))
+        self._names = names
+
+    @staticmethod
+    def _sorted(pairs):
+        pairs = sorted(pairs)
+        return [k for k, _ in pairs], [i for _, i in pairs]
+
+    def __len__(self):
+        return len(self.items)
+
+    @staticmethod
+    def _prefix_range(keys, prefix):
+        lo = bisect.bisect_left(keys, prefix)
+        hi = bisect.bisect_left(keys, prefix + "\uffff")
+        return lo, hi
+
+    def _prefix_positions(self, keys, pos, prefix):
+        lo, hi = self._prefix_range(keys, prefix)
+        return pos[lo:hi]
+
+    def search(self, q=None, exchange=None):
+        """
+        :param q: 代码前缀 (600 / sh600)、名称前缀或拼音首字母前缀；都无结果时退回名称包含匹配
+        :param exchange: sh / sz / bj
+        :return: 匹配的条目列表 (按原始顺序)
+        """
+        if q:
+            q = q.strip()
+        if q:
+            ql = q.lower()
+            positions = set(self._prefix_positions(self._code_keys, self._code_pos, ql))
+            positions.update(self._prefix_positions(self._name_keys, self._name_pos, q))
+            positions.update(self._prefix_positions(self._pinyin_keys, self._pinyin_pos, ql))
+            if not positions:
+                positions = {i for i, name in enumerate(self._names) if q in name}
+            matched = [self.items[i] for i in sorted(positions)]
+        else:
+            matched = self.items
+
+        if exchange:
+            exchange = exchange.lower()
+            matched = [item for item in matched if item["code"].startswith(exchange)]
+        return matched
+
+    def page(self, q=None, exchange=None, offset=0, limit=None):
+        matched = self.search(q, exchange)
+        end = None if limit is None else offset + limit
+        return matched[offset:end], len(matched)
+
+    def rank(self, q, k=20):
+        """
+        按匹配程度返回前 k 个结果 [(tier, item)]
+        tier: 0 代码完全匹配, 1 代码前缀, 2 名称前缀, 3 拼音首字母前缀, 4 名称包含
+        """
+        q = (q or "").strip()
+        if not q or k <= 0:
+            return []
+        ql = q.lower()
+        seen = set()
+        ranked = []
+
+        def collect(tier, positions):
+            for i in sorted(positions):
+                if len(ranked) >= k:
+                    return
+                if i not in seen:
+                    seen.add(i)
+                    ranked.append((tier, self.items[i]))
+
+        code_positions = self._prefix_positions(self._code_keys, self._code_pos, ql)
+        lo, hi = self._prefix_range(self._code_keys, ql)
+        collect(0, [i for key, i in zip(self._code_keys[lo:hi], code_positions) if key == ql])
+        collect(1, code_positions)
+        collect(2, self._prefix_positions(self._name_keys, self._name_pos, q))
+        collect(3, self._prefix_positions(self._pinyin_keys, self._pinyin_pos, ql))
+        if len(ranked) < k:
+            # 包含匹配需要线性扫描，只在前缀结果不足时进行
+            collect(4, [i for i, name in enumerate(self._names) if q in name])
+        return ranked
+
+
+def futures_items():
+    """
+    期货主力合约列表及用于搜索的中文名称
+    """
+    items, names = [], []
+    for code, multiplier in FUTURES_MULTIPLIERS.items():
+        name = FUTURES_NAMES.get(code, code)
+        items.append({
+            "code": f"{code}0", # Main contract convention
+            "name": f"{code} ({name})",
+            "multiplier": multiplier
+        })
+        names.append(name)
+    return items, names
+
+
+# 期货品种固定，启动时构建一次
+_futures_items, _futures_names = futures_items()
+futures_index = SymbolIndex(_futures_items, names=_futures_names)
+
+
+class StockSymbolStore:
+    """
+    股票代码索引的持久化与定时刷新
+    - 启动时从 stock_symbols 表加载，不依赖网络
+    - 超过 REFRESH_INTERVAL 后在后台线程从 AkShare 刷新，刷新期间继续使用旧索引
+    """
+
+    def __init__(self, session_factory=SessionLocal, refresh_interval=REFRESH_INTERVAL):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self._index = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._timer = None
+
+    def _build(self, rows, built_at):
+        stocks = [{"code": code, "name": name, "multiplier": 100} for code, name in rows]
+        return SymbolIndex(STOCK_INDICES + stocks, built_at)
+
+    def load(self):
+        """
+        从数据库加载索引，没有数据时返回 None
+        """
+        db = self.session_factory()
+        try:
+            rows = db.query(StockSymbol.code, StockSymbol.name, StockSymbol.updated_at).order_by(StockSymbol.seq).all()
+        finally:
+            db.close()
+        if not rows:
+            return None
+        built_at = max(r.updated_at for r in rows)
+        return self._build([(r.code, r.name) for r in rows], built_at)
+
+    def refresh(self):
+        """
+        从 AkShare 拉取股票列表并覆盖保存，返回新索引
+        """
+        df = ak.stock_info_a_code_name()
+        if df is None or df.empty:
+            raise ValueError("Empty stock list from AkShare")
+        now = datetime.datetime.now()
+        rows = [(stock_full_code(code), name) for code, name in zip(df['code'], df['name'])]
+
+        db = self.session_factory()
+        try:
+            db.query(StockSymbol).delete()
+            db.bulk_insert_mappings(StockSymbol, [
+                {"seq": i, "code": code, "name": name, "updated_at": now} for i, (code, name) in enumerate(rows)
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        index = self._build(rows, now)
+        with self._lock:
+            self._index = index
+        print(f"股票列表已刷新: {len(rows)} 只")
+        return index
+
+    def _is_stale(self, index):
+        return index.built_at is None or datetime.datetime.now() - index.built_at >= self.refresh_interval
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error fetching stock list from AkShare: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="stock-symbol-refresh", daemon=True).start()
+
+    def get(self):
+        """
+        获取当前索引 (不阻塞在网络请求上，除非本地从未保存过股票列表)
+        """
+        with self._lock:
+            index = self._index
+        if index is None:
+            try:
+                index = self.load()
+            except Exception as e:
+                print(f"读取本地股票列表失败: {e}")
+            if index is None:
+                # 首次运行: 同步拉取一次
+                try:
+                    index = self.refresh()
+                except Exception as e:
+                    print(f"Error fetching stock list from AkShare: {e}")
+                    # 兜底列表没有 built_at，之后的请求会在后台继续尝试刷新
+                    index = SymbolIndex(STOCK_INDICES + FALLBACK_STOCKS)
+            with self._lock:
+                if self._index is None:
+                    self._index = index
+
+        if self._is_stale(index):
+            self._refresh_in_background()
+        return index
+
+    def start_scheduler(self):
+        """
+        定时刷新 (每 refresh_interval 检查一次)，在应用启动时调用
+        """
+        def tick():
+            try:
+                self.get()
+            except Exception as e:
+                print(f"股票列表定时刷新失败: {e}")
+            self._schedule(tick)
+        self._schedule(tick)
+
+    def _schedule(self, fn):
+        self._timer = threading.Timer(self.refresh_interval.total_seconds(), fn)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop_scheduler(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+stock_symbols = StockSymbolStore()
+
+
+def search_symbols(q, market_type='all', k=20):
+    """
+    跨市场搜索品种，按匹配程度排序取前 k 个
+    """
+    ranked = []
+    if market_type in ('all', 'futures'):
+        ranked.extend((tier, 0, {**item, "market_type": "futures"}) for tier, item in futures_index.rank(q, k))
+    if market_type in ('all', 'stock'):
+        ranked.extend((tier, 1, {**item, "market_type": "stock"}) for tier, item in stock_symbols.get().rank(q, k))
+    # 同一档位期货在前，档位内保持各自索引顺序
+    ranked.sort(key=lambda r: (r[0], r[1]))
+    return [item for _, _, item in ranked[:k]]
@@ -0,0 +1,83 @@
+import math
+import threading
+import time
+import pandas as pd
+from .lazy import lazy_import
+
+ak = lazy_import("akshare")
+
+# 交易日历下载失败后，间隔一段时间再重试 (避免每次回测都请求失败的接口)
+RETRY_SECONDS = 3600
+# 无交易日历时按工作日估算: 国内每年约 244 个交易日 / 261 个工作日，另加春节、国庆长假余量
+WEEKDAY_RATIO = 261 / 244
+HOLIDAY_PAD_DAYS = 7
+
+
+def _load_sina_trade_dates():
+    df = ak.tool_trade_date_hist_sina()
+    return pd.to_datetime(df['trade_date'])
+
+
+class TradingCalendar:
+    """
+    A 股 / 国内期货交易日历 (新浪历史交易日，包含当年剩余交易日)
+    首次使用时下载并缓存在进程内；下载失败时退化为工作日估算
+    """
+
+    def __init__(self, loader=None, retry_seconds=RETRY_SECONDS):
+        self._loader = loader or _load_sina_trade_dates
+        self.retry_seconds = retry_seconds
+        self._dates = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    def trade_dates(self):
+        """
+        :return: 已排序的交易日 DatetimeIndex，不可用时返回 None
+        """
+        with self._lock:
+            if self._dates is not None:
+                return self._dates
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_seconds:
+                return None
+            try:
+                dates = pd.DatetimeIndex(self._loader()).normalize().unique().sort_values()
+            except Exception as e:
+                print(f"交易日历获取失败，按工作日估算: {e}")
+                self._failed_at = time.monotonic()
+                return None
+            if dates.empty:
+                self._failed_at = time.monotonic()
+                return None
+            self._dates = dates
+            return dates
+
+    def _covers(self, dates, date):
+        return dates is not None and dates[0] <= date <= dates[-1]
+
+    def is_trading_day(self, date):
+        date = pd.Timestamp(date).normalize()
+        dates = self.trade_dates()
+        if self._covers(dates, date):
+            return date in dates
+        return date.weekday() < 5
+
+    def shift_back(self, date, days):
+        """
+        date 之前第 days 个交易日 (不含 date 当天)
+        日历未覆盖时按工作日估算，宁多勿少
+        """
+        date = pd.Timestamp(date).normalize()
+        days = max(int(days), 0)
+        if days == 0:
+            return date
+        dates = self.trade_dates()
+        if self._covers(dates, date):
+            pos = dates.searchsorted(date)
+            if pos >= days:
+                return dates[pos - days]
+        weekdays = math.ceil(days * WEEKDAY_RATIO) + HOLIDAY_PAD_DAYS
+        return date - pd.offsets.BDay(weekdays)
+
+
+trading_calendar = TradingCalendar()
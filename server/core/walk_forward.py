@@ -0,0 +1,183 @@
+import gc
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from .bar_store import SharedBarStore, attach
+from .data_loader import fetch_data, slice_dates
+from .optimizer import StrategyOptimizer
+
+
+def walk_forward_folds(index, n_folds=4, in_sample_ratio=0.75):
+    """
+    按交易日滚动切分: 每折 = 样本内 (优化参数) + 紧随其后的样本外 (检验)
+    窗口每次向前滚动一个样本外长度，各折样本外区间首尾相接，最后一折延伸到区间结束
+    :param index: 回测区间内的 K 线时间 (DatetimeIndex)
+    :return: [{fold, in_sample: (开始日, 结束日), out_of_sample: (开始日, 结束日)}]，日期为 'YYYY-MM-DD'
+    """
+    if n_folds < 1 or not 0 < in_sample_ratio < 1:
+        raise ValueError("n_folds 至少为 1，in_sample_ratio 需在 0 与 1 之间")
+    days = index.normalize().unique()
+    ratio = in_sample_ratio / (1 - in_sample_ratio)
+    test = int(len(days) / (n_folds + ratio))
+    train = int(round(test * ratio))
+    if test < 1 or train < 1:
+        raise ValueError(f"区间内只有 {len(days)} 个交易日，不足以切分 {n_folds} 折")
+
+    fmt = lambda ts: ts.strftime('%Y-%m-%d')
+    folds = []
+    for i in range(n_folds):
+        is_lo = i * test
+        oos_lo = is_lo + train
+        oos_hi = len(days) if i == n_folds - 1 else oos_lo + test
+        folds.append({
+            "fold": i + 1,
+            "in_sample": (fmt(days[is_lo]), fmt(days[oos_lo - 1])),
+            "out_of_sample": (fmt(days[oos_lo]), fmt(days[oos_hi - 1])),
+        })
+    return folds
+
+
+def _return_rate(metrics):
+    return metrics['net_profit'] / metrics['initial_cash'] * 100
+
+
+def _evaluate_fold(df, task):
+    """
+    单折: 在样本内随机搜索参数，再用最优参数回测样本外区间
+    """
+    if task['seed'] is not None:
+        random.seed(task['seed'])
+    optimizer = StrategyOptimizer()
+    is_start, is_end = task['in_sample']
+    best_params, best_res = optimizer.optimize(
+        task['symbol'], task['period'], dict(task['strategy_params']),
+        target_return=task['target_return'], max_trials=task['max_trials'],
+        start_date=is_start, end_date=is_end, strategy_name=task['strategy_name'],
+        data_source=task['data_source'], market_type=task['market_type'], data=df
+    )
+    # engine.run 会把回测区间写入参数字典，结果中只保留策略参数
+    best_params = {k: v for k, v in best_params.items() if k not in ('start_date', 'end_date')}
+    oos_start, oos_end = task['out_of_sample']
+    oos = optimizer.engine.run(
+        task['symbol'], task['period'], dict(best_params), initial_cash=task['initial_cash'],
+        start_date=oos_start, end_date=oos_end, strategy_name=task['strategy_name'],
+        market_type=task['market_type'], data_source=task['data_source'], data=df
+    )
+    fold = {
+        "fold": task['fold'],
+        "in_sample": {"start": is_start, "end": is_end},
+        "out_of_sample": {"start": oos_start, "end": oos_end},
+        "best_params": best_params,
+        "in_sample_metrics": best_res['metrics'] if best_res else None,
+    }
+    if "error" in oos:
+        fold["error"] = oos["error"]
+    else:
+        fold.update(metrics=oos['metrics'], trades=oos['trades'], equity_curve=oos['equity_curve'])
+    return fold
+
+
+def _fold_worker(spec, task):
+    # 子进程: 零拷贝附加父进程发布的 K 线
+    with attach(spec) as bars:
+        df = bars.to_frame()
+        try:
+            return _evaluate_fold(df, task)
+        finally:
+            # 回测对象之间有循环引用，先回收掉引用共享内存的数组才能关闭
+            del df
+            gc.collect()
+
+
+def stitch_equity(folds, initial_cash):
+    """
+    各折样本外权益曲线首尾相接: 每折按上一折结束时的资金等比例缩放，相当于连续复利
+    """
+    curve = []
+    capital = initial_cash
+    for fold in folds:
+        points = fold.get('equity_curve') or []
+        if not points:
+            continue
+        scale = capital / initial_cash
+        curve.extend({"date": p['date'], "value": p['value'] * scale} for p in points)
+        capital = fold['metrics']['final_value'] * scale
+    return curve, capital
+
+
+def _max_drawdown(curve):
+    peak, worst = -math.inf, 0.0
+    for point in curve:
+        peak = max(peak, point['value'])
+        if peak > 0:
+            worst = max(worst, (peak - point['value']) / peak * 100)
+    return worst
+
+
+def walk_forward(symbol, period, strategy_params, start_date=None, end_date=None, n_folds=4, in_sample_ratio=0.75,
+                 max_trials=10, target_return=None, strategy_name='TrendFollowingStrategy', market_type='futures',
+                 data_source='main', initial_cash=1000000.0, processes=None, seed=None, data=None):
+    """
+    Walk-forward 分析: 滚动样本内优化 + 样本外检验，评估优化结果的稳健性
+    - 整个序列只获取一次，发布到共享内存，各折在子进程中并行运行
+    - 返回每折的最优参数、样本内/样本外指标，以及拼接后的样本外权益曲线
+    :param target_return: 样本内优化提前停止的收益率 (%)，None 表示跑满 max_trials
+    :param processes: 并行进程数，None 为 min(折数, CPU 数)；1 表示在当前进程顺序运行
+    :param seed: 随机搜索的种子 (第 i 折使用 seed + i)，用于复现
+    :param data: 预先获取的 K 线 (测试或调用方已有数据时使用)
+    """
+    if data is None:
+        # 不按开始日期过滤: 区间之前的数据留给第一折预热
+        data = fetch_data(symbol=symbol, period=period, market_type=market_type, start_date=None, end_date=end_date, data_source=data_source)
+    if data is None or data.empty:
+        return {"error": "未找到该品种的数据，请检查代码或日期范围"}
+    try:
+        folds = walk_forward_folds(slice_dates(data, start_date, end_date).index, n_folds, in_sample_ratio)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    base_task = {
+        "symbol": symbol, "period": period, "strategy_params": dict(strategy_params), "strategy_name": strategy_name,
+        "market_type": market_type, "data_source": data_source, "initial_cash": initial_cash, "max_trials": max_trials,
+        "target_return": float('inf') if target_return is None else target_return,
+    }
+    tasks = [dict(base_task, seed=None if seed is None else seed + fold['fold'], **fold) for fold in folds]
+
+    processes = min(len(tasks), os.cpu_count() or 1) if processes is None else max(1, processes)
+    print(f"Walk-forward: {symbol} {period}, {len(tasks)} 折, 并行进程 {processes}")
+    if processes == 1:
+        results = [_evaluate_fold(data, task) for task in tasks]
+    else:
+        # 服务进程是多线程的 (uvicorn 线程池、后台刷新)，fork 可能继承被占用的锁，子进程用 spawn 启动
+        context = multiprocessing.get_context('spawn')
+        with SharedBarStore() as store:
+            spec = store.publish((market_type, data_source, symbol, period), data)
+            with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+                results = list(pool.map(_fold_worker, [spec] * len(tasks), tasks))
+
+    valid = [fold for fold in results if 'metrics' in fold]
+    equity_curve, final_value = stitch_equity(valid, initial_cash)
+    is_returns = [_return_rate(fold['in_sample_metrics']) for fold in valid if fold['in_sample_metrics']]
+    oos_returns = [_return_rate(fold['metrics']) for fold in valid]
+    is_avg = sum(is_returns) / len(is_returns) if is_returns else None
+    oos_avg = sum(oos_returns) / len(oos_returns) if oos_returns else None
+
+    return {
+        "status": "success",
+        "folds": results,
+        "equity_curve": equity_curve,
+        "summary": {
+            "folds": len(results),
+            "failed_folds": len(results) - len(valid),
+            "initial_cash": initial_cash,
+            "final_value": final_value,
+            "oos_return": (final_value / initial_cash - 1) * 100,
+            "oos_max_drawdown": _max_drawdown(equity_curve),
+            "in_sample_avg_return": is_avg,
+            "oos_avg_return": oos_avg,
+            # 样本外 / 样本内平均收益，明显小于 1 说明参数过拟合了样本内区间
+            "efficiency": (oos_avg / is_avg) if is_avg and oos_avg is not None and is_avg > 0 else None,
+        },
+    }
@@ -0,0 +1,104 @@
+import math
+import pandas as pd
+import backtrader as bt
+from .feeds import NumpyData
+from .resample import period_minutes
+from .trading_calendar import trading_calendar
+
+# 指数平滑类指标 (EMA / SMMA / ATR 等) 的初值影响衰减到该比例以下才视为预热完成
+SMOOTHING_TOLERANCE = 0.01
+# 预热 K 线的余量 (停牌、缺失 K 线)
+WARMUP_MARGIN = 1.1
+# 单个交易日的 K 线数只按日盘计算 (期货日盘 225 分钟、股票 240 分钟)，有夜盘的品种实际更多，预热只会偏多
+SESSION_MINUTES = {'futures': 225, 'stock': 240}
+# 周线 / 月线折算交易日
+TRADING_DAYS_PER_BAR = {'daily': 1, 'weekly': 5, 'monthly': 21}
+
+class _ProbeData(NumpyData):
+    lines = ('ma_fast', 'ma_slow',)
+
+
+def _probe_feed():
+    index = pd.DatetimeIndex([pd.Timestamp('2000-01-03')])
+    df = pd.DataFrame({'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': 1.0, 'Volume': 1.0, 'OpenInterest': 0.0, 'ma_fast': 1.0, 'ma_slow': 1.0}, index=index)
+    return _ProbeData(dataname=df)
+
+
+def _smoothing_bars(alpha):
+    """
+    指数平滑初值权重 (1 - alpha)^n 衰减到 SMOOTHING_TOLERANCE 需要的 K 线数
+    """
+    if not 0 < alpha < 1:
+        return 0
+    return int(math.ceil(math.log(SMOOTHING_TOLERANCE) / math.log(1 - alpha)))
+
+
+def _indicator_lookback(owner, seen):
+    lookback = 0
+    for ind in getattr(owner, '_lineiterators', {}).get(bt.LineIterator.IndType, []):
+        if id(ind) in seen:
+            continue
+        seen.add(id(ind))
+        need = ind._minperiod
+        if isinstance(ind, bt.ind.ExponentialSmoothing):
+            need += _smoothing_bars(ind.p.alpha)
+        lookback = max(lookback, need, _indicator_lookback(ind, seen))
+    return lookback
+
+
+def _declared_lookback(StrategyClass, params):
+    """
+    无法实例化策略时，按声明的 *_period 参数估算 (取最大周期的 3 倍)
+    """
+    periods = []
+    for name in StrategyClass.params._getkeys():
+        if name.endswith('period'):
+            value = params.get(name, getattr(StrategyClass.params, name))
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                periods.append(int(value))
+    return max(periods) * 3 if periods else 0
+
+
+def strategy_lookback(StrategyClass, params):
+    """
+    策略需要的预热 K 线数: 以单根 K 线实例化策略，取 backtrader 计算出的 minperiod
+    (所有指标中最长的回看长度)，指数平滑类指标另加初值衰减所需的 K 线
+    不缓存: engine.run 每次都会重新加载策略模块，实例化一次只需几毫秒
+    :param params: 已按策略类过滤的参数
+    """
+    try:
+        cerebro = bt.Cerebro(stdstats=False)
+        cerebro.adddata(_probe_feed())
+        probe_params = dict(params)
+        if hasattr(StrategyClass.params, 'print_log'):
+            probe_params['print_log'] = False
+        cerebro.addstrategy(StrategyClass, **probe_params)
+        # 单根数据无法 runonce 向量化计算，逐根运行即可
+        strat = cerebro.run(runonce=False, preload=False)[0]
+        lookback = max(strat._minperiod, _indicator_lookback(strat, set()))
+    except Exception as e:
+        print(f"无法解析策略 {StrategyClass.__name__} 的指标周期，按参数估算: {e}")
+        lookback = _declared_lookback(StrategyClass, params)
+    return lookback
+
+
+def warmup_trading_days(bars, period, market_type='futures'):
+    """
+    预热 K 线数 -> 交易日数
+    """
+    bars = int(math.ceil(round(bars * WARMUP_MARGIN, 6)))
+    minutes = period_minutes(period)
+    if minutes is not None:
+        per_day = max(SESSION_MINUTES.get(market_type, SESSION_MINUTES['futures']) // minutes, 1)
+        return int(math.ceil(bars / per_day)) + 1
+    # 周线 / 月线多加一根，覆盖起始日所在的不完整周期
+    return (bars + 1) * TRADING_DAYS_PER_BAR.get(period, 1)
+
+
+def warmup_start(start_date, bars, period, market_type='futures', calendar=None):
+    """
+    从 start_date 往前推足 bars 根 K 线的获取开始日期
+    """
+    calendar = calendar or trading_calendar
+    days = warmup_trading_days(bars, period, market_type)
+    return calendar.shift_back(start_date, days)
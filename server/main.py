@@ -1,24 +1,36 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
-from functools import lru_cache
 import uvicorn
 import sys
 import os
 import json
+import base64
 
 # 确保 core 模块可以被导入
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-import akshare as ak
 import datetime
-from core.engine import BacktestEngine
-from core.database import init_db, SessionLocal, BacktestRecord
-from core.optimizer import StrategyOptimizer
-from core.constants import get_multiplier, FUTURES_MULTIPLIERS, FUTURES_NAMES
+from core.lazy import lazy_import
+from core import quotes
+from core.symbol_index import stock_symbols, futures_index, search_symbols
+from core.database import init_db, SessionLocal, BacktestRecord, ScheduledScan, RecordBuffer, set_detail, get_detail
+from core.profiling import stage_stats
+from core.scan_scheduler import scan_scheduler, scan_config, load_results, results_body
+from core.constants import get_multiplier
+from core.serialization import FastJSONResponse, IMMUTABLE_CACHE_CONTROL, make_etag, etag_matches
+from core.sections import DETAIL_SECTIONS, detail_cache, slice_section
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, asc, and_, or_
+
+# akshare / backtrader 导入耗时数秒且占用大量内存，延迟到第一次请求时再导入
+ak = lazy_import("akshare")
+engine_module = lazy_import("core.engine")
+optimizer_module = lazy_import("core.optimizer")
+walk_forward_module = lazy_import("core.walk_forward")
+portfolio_module = lazy_import("core.portfolio")
 
 # 初始化数据库
 init_db()
@@ -42,6 +54,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 压缩大体积响应 (K线、权益曲线、日志等)，小于 1KB 的响应不压缩
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
 class BacktestRequest(BaseModel):
     symbol: str
     period: str
@@ -53,179 +68,93 @@ class BacktestRequest(BaseModel):
     end_date: Optional[str] = None   # 结束时间 (YYYY-MM-DD)
     strategy_name: str = "TrendFollowingStrategy"
     data_source: str = "main" # 数据来源: main (主力), weighted (加权/指数)
+    persist_trials: bool = False # 是否保存自动优化过程中的每一次试验
+    low_memory: Optional[bool] = None # 低内存模式 (None: K 线数超过阈值时自动开启)
+    chart_points: Optional[int] = None # 图表最大点数 (一般为图表像素宽度)，None 返回全部 K 线
+    timing: bool = False # 返回各阶段耗时
+    profile: Optional[str] = None # 性能分析: cprofile / pyinstrument
 
-@lru_cache(maxsize=1)
-def get_all_stock_info():
-    try:
-        # 获取A股股票列表 (代码, 名称)
-        # 结果包含: code, name
-        df = ak.stock_info_a_code_name()
-        return df
-    except Exception as e:
-        print(f"Error fetching stock list from AkShare: {e}")
-        return None
+@app.on_event("startup")
+def start_symbol_refresh():
+    # 股票列表每天在后台刷新，请求时直接使用本地索引
+    stock_symbols.start_scheduler()
+    # 收盘后运行已配置的扫描，页面读取物化结果
+    scan_scheduler.start_scheduler()
+
+@app.on_event("shutdown")
+def stop_symbol_refresh():
+    stock_symbols.stop_scheduler()
+    scan_scheduler.stop_scheduler()
+
+@app.get("/api/metrics/timing")
+def get_stage_timing():
+    """
+    进程启动以来回测各阶段的累计耗时 (按总耗时降序)
+    """
+    return stage_stats.snapshot()
+
+@app.delete("/api/metrics/timing")
+def reset_stage_timing():
+    stage_stats.clear()
+    return {"status": "success"}
 
 @app.get("/api/symbols")
-async def get_symbols(market_type: str = 'futures'):
+def get_symbols(market_type: str = 'futures', q: Optional[str] = None, exchange: Optional[str] = None,
+                offset: int = 0, limit: Optional[int] = None):
+    """
+    品种列表
+    - 股票支持 q (代码/名称前缀)、exchange (sh/sz/bj) 过滤和 offset/limit 分页
+    - 不传 limit 时返回全部 (兼容旧版前端)
+    """
     if market_type == 'futures':
-        # FUTURES_NAMES is imported from core.constants
-        
-        # Generate list from FUTURES_MULTIPLIERS
-        futures_list = []
-        for code, multiplier in FUTURES_MULTIPLIERS.items():
-            # Basic name mapping (can be expanded)
-            name = FUTURES_NAMES.get(code, code)
-            futures_list.append({
-                "code": f"{code}0", # Main contract convention
-                "name": f"{code} ({name})", 
-                "multiplier": multiplier
-            })
-        return {"futures": futures_list}
+        return {"futures": futures_index.items}
     elif market_type == 'stock':
-        stocks_list = []
-        
-        # 1. Add Indices (Hardcoded as they are not in stock_info_a_code_name usually)
-        indices = [
-            {"code": "sh000001", "name": "上证指数", "multiplier": 1},
-            {"code": "sz399001", "name": "深证成指", "multiplier": 1},
-            {"code": "sh000300", "name": "沪深300", "multiplier": 1},
-            {"code": "sh000905", "name": "中证500", "multiplier": 1},
-            {"code": "sh000852", "name": "中证1000", "multiplier": 1},
-            {"code": "sz399006", "name": "创业板指", "multiplier": 1},
-        ]
-        stocks_list.extend(indices)
-
-        # 2. Fetch Stocks
-        df = get_all_stock_info()
-        
-        if df is not None and not df.empty:
-            # Optimize iteration
-            records = df.to_dict('records')
-            for row in records:
-                code = str(row['code'])
-                name = row['name']
-                
-                # Determine prefix
-                full_code = code
-                if len(code) == 6:
-                    if code.startswith('6'):
-                        full_code = f"sh{code}"
-                    elif code.startswith('0') or code.startswith('3'):
-                        full_code = f"sz{code}"
-                    elif code.startswith('4') or code.startswith('8') or code.startswith('9'):
-                        full_code = f"bj{code}"
-                
-                stocks_list.append({
-                    "code": full_code,
-                    "name": name,
-                    "multiplier": 100 # Default stock multiplier
-                })
-        else:
-             # Fallback to hardcoded list if network fails
-             stocks_list.extend([
-                {"code": "sh600519", "name": "贵州茅台", "multiplier": 100},
-                {"code": "sz000858", "name": "五粮液", "multiplier": 100},
-                {"code": "sh600036", "name": "招商银行", "multiplier": 100},
-                {"code": "sz002594", "name": "比亚迪", "multiplier": 100},
-                {"code": "sh601318", "name": "中国平安", "multiplier": 100},
-                {"code": "sz300750", "name": "宁德时代", "multiplier": 100},
-                {"code": "sh600030", "name": "中信证券", "multiplier": 100}
-             ])
-             
-        return {"stocks": stocks_list}
+        # 预先构建的索引 (本地持久化 + 定时刷新)，不再每次请求遍历整个股票列表
+        index = stock_symbols.get()
+        offset = max(offset, 0)
+        if limit is not None:
+            limit = max(1, min(limit, 1000))
+        stocks_list, total = index.page(q=q, exchange=exchange, offset=offset, limit=limit)
+        return FastJSONResponse({"stocks": stocks_list, "total": total, "offset": offset, "limit": limit})
     else:
         return {"error": "Invalid market_type"}
 
+@app.get("/api/symbols/search")
+def search_symbol_index(q: str = "", market_type: str = 'all', limit: int = 20):
+    """
+    品种搜索 (代码前缀 / 名称 / 拼音首字母)，按匹配程度返回前 limit 个
+    - market_type: all / futures / stock
+    """
+    if market_type not in ('all', 'futures', 'stock'):
+        raise HTTPException(status_code=400, detail="Invalid market_type")
+    limit = max(1, min(limit, 100))
+    return FastJSONResponse({"items": search_symbols(q, market_type, limit)})
+
 @app.get("/api/quote/latest")
-async def get_latest_quote(symbol: str, market_type: str = 'futures', data_source: str = 'main'):
+def get_latest_quote(symbol: Optional[str] = None, symbols: Optional[str] = None, market_type: str = 'futures', data_source: str = 'main'):
+    """
+    获取最新行情 (带短时缓存)
+    - symbol: 单个品种，返回 {symbol, price, date}
+    - symbols: 逗号分隔的多个品种，返回 {"quotes": [...]}，一次请求获取整个看板的行情
+    """
+    if symbols:
+        symbol_list = [s.strip() for s in symbols.split(',') if s.strip()]
+        return {"quotes": quotes.get_latest_quotes(symbol_list, market_type=market_type, data_source=data_source)}
+    if not symbol:
+        raise HTTPException(status_code=400, detail="symbol 或 symbols 参数必填")
+
     try:
-        if market_type == 'stock':
-             # 股票日线 (使用最近一年的数据以加快速度)
-             start_dt = (datetime.datetime.now() - datetime.timedelta(days=365)).strftime("%Y%m%d")
-             end_dt = (datetime.datetime.now() + datetime.timedelta(days=30)).strftime("%Y%m%d")
-             code = symbol[-6:]
-             try:
-                 df = ak.stock_zh_a_hist(symbol=code, period="daily", start_date=start_dt, end_date=end_dt, adjust="qfq")
-                 
-                 if df is None or df.empty:
-                     raise ValueError("Empty dataframe from EastMoney")
-                 
-                 latest = df.iloc[-1]
-                 price = float(latest['收盘'])
-                 date = str(latest['日期'])
-             except Exception as e:
-                 print(f"Quote EastMoney failed, trying Sina: {e}")
-                 # Fallback to Sina
-                 df = ak.stock_zh_a_daily(symbol=symbol, start_date=start_dt, end_date=end_dt, adjust="qfq")
-                 
-                 if df is None or df.empty:
-                     raise HTTPException(status_code=404, detail="Symbol not found in both sources")
-                 
-                 latest = df.iloc[-1]
-                 price = float(latest['close'])
-                 date = str(latest['date'])
-        else:
-            fetch_symbol = symbol
-            if data_source == 'weighted':
-                # 尝试将主力合约代码转换为加权代码
-                # 用户反馈：加权一般是888 (如 SH888)
-                if symbol.endswith('0'):
-                    fetch_symbol = symbol.replace('0', '888')
-                elif symbol.endswith('888'):
-                    fetch_symbol = symbol
-                else:
-                    fetch_symbol = symbol + '888'
-            
-            # 尝试获取数据
-            try:
-                df = ak.futures_zh_daily_sina(symbol=fetch_symbol)
-            except Exception:
-                df = None
-            
-            # 如果首选代码失败，尝试 fallback (仅在 weighted 模式下)
-            if (df is None or df.empty) and data_source == 'weighted':
-                print(f"Quote: {fetch_symbol} failed, trying alternatives...")
-                alternatives = []
-                base_symbol = symbol.rstrip('0') if symbol.endswith('0') else symbol.replace('888', '')
-                alternatives.append(f"{base_symbol}13")
-                alternatives.append(f"{base_symbol}Index")
-                alternatives.append(f"{base_symbol}88")
-                
-                for alt in alternatives:
-                    try:
-                         df = ak.futures_zh_daily_sina(symbol=alt)
-                         if df is not None and not df.empty:
-                             print(f"Quote: Found alternative {alt}")
-                             fetch_symbol = alt
-                             break
-                    except:
-                        pass
-                
-                # 如果还是没找到，回退到主力
-                if df is None or df.empty:
-                     print(f"Quote: Fallback to main contract {symbol}")
-                     fetch_symbol = symbol if not symbol.endswith('888') else symbol.replace('888', '0')
-                     df = ak.futures_zh_daily_sina(symbol=fetch_symbol)
-
-            if df is None or df.empty:
-                raise HTTPException(status_code=404, detail="Symbol not found")
-            latest = df.iloc[-1]
-            price = float(latest['close'])
-            date = str(latest['date'])
-        
-        return {
-            "symbol": symbol,
-            "price": price,
-            "date": date
-        }
+        return quotes.get_latest_quote(symbol, market_type=market_type, data_source=data_source)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         print(f"Error fetching quote: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/backtest")
-async def run_backtest(request: BacktestRequest, db: Session = Depends(get_db)):
+@app.post("/api/backtest", response_class=FastJSONResponse)
+async def run_backtest(request: BacktestRequest, background_tasks: BackgroundTasks):
     print(f"收到回测请求: {request.symbol}, {request.period}, {request.market_type}, {request.strategy_params}, 策略: {request.strategy_name}, 自动优化: {request.auto_optimize}, 时间段: {request.start_date} - {request.end_date}")
-    engine = BacktestEngine()
+    engine = engine_module.BacktestEngine()
     
     # 1. 运行初始回测
     result = engine.run(
@@ -237,7 +166,11 @@ async def run_backtest(request: BacktestRequest, db: Session = Depends(get_db)):
         start_date=request.start_date,
         end_date=request.end_date,
         strategy_name=request.strategy_name,
-        data_source=request.data_source
+        data_source=request.data_source,
+        low_memory=request.low_memory,
+        chart_points=request.chart_points,
+        timing=request.timing,
+        profile=request.profile
     )
     
     if "error" in result:
@@ -249,31 +182,16 @@ async def run_backtest(request: BacktestRequest, db: Session = Depends(get_db)):
     net_profit = result['metrics']['net_profit']
     return_rate = (net_profit / initial_cash) * 100
     
-    # 保存初始结果
-    record = BacktestRecord(
-        symbol=request.symbol,
-        period=request.period,
-        strategy_params=request.strategy_params,
-        initial_cash=initial_cash,
-        final_value=final_value,
-        net_profit=net_profit,
-        return_rate=return_rate,
-        sharpe_ratio=result['metrics']['sharpe_ratio'],
-        max_drawdown=result['metrics']['max_drawdown'],
-        total_trades=result['metrics']['total_trades'],
-        win_rate=result['metrics']['win_rate'],
-        is_optimized=0
-    )
-    db.add(record)
-    db.commit()
-    db.refresh(record)
+    # 待保存的记录先放入缓冲区，响应返回后在后台一次性批量写入
+    records = RecordBuffer()
+    records.add_result(request.symbol, request.period, request.strategy_name, request.strategy_params, result['metrics'], is_optimized=0)
     
     # 2. 检查是否需要自动优化
     optimized_result = None
     optimized_params = None
     
     if request.auto_optimize and return_rate < 20.0:
-        optimizer = StrategyOptimizer()
+        optimizer = optimizer_module.StrategyOptimizer()
         best_params, best_res = optimizer.optimize(
             symbol=request.symbol, 
             period=request.period, 
@@ -289,26 +207,14 @@ async def run_backtest(request: BacktestRequest, db: Session = Depends(get_db)):
              optimized_params = best_params
              
              # 保存优化后的结果
-             opt_cash = best_res['metrics']['initial_cash']
-             opt_profit = best_res['metrics']['net_profit']
-             opt_return = (opt_profit / opt_cash) * 100
-             
-             opt_record = BacktestRecord(
-                symbol=request.symbol,
-                period=request.period,
-                strategy_params=best_params,
-                initial_cash=opt_cash,
-                final_value=best_res['metrics']['final_value'],
-                net_profit=opt_profit,
-                return_rate=opt_return,
-                sharpe_ratio=best_res['metrics']['sharpe_ratio'],
-                max_drawdown=best_res['metrics']['max_drawdown'],
-                total_trades=best_res['metrics']['total_trades'],
-                win_rate=best_res['metrics']['win_rate'],
-                is_optimized=1
-            )
-             db.add(opt_record)
-             db.commit()
+             records.add_result(request.symbol, request.period, request.strategy_name, best_params, best_res['metrics'], is_optimized=1)
+
+        if request.persist_trials:
+            for trial in optimizer.trials:
+                records.add_result(request.symbol, request.period, request.strategy_name, trial['params'], trial['metrics'], is_optimized=2)
+
+    # 保存在响应之后执行，耗时只计入 /api/metrics/timing
+    background_tasks.add_task(stage_stats.timed, 'run.db_save', records.flush)
 
     message_str = "回测完成"
     if optimized_result:
@@ -327,7 +233,125 @@ async def run_backtest(request: BacktestRequest, db: Session = Depends(get_db)):
     else:
         response['optimization_info'] = {'triggered': False}
         
-    return response
+    return FastJSONResponse(response)
+
+class ChartZoomRequest(BaseModel):
+    symbol: str
+    period: str
+    market_type: str = "futures"
+    strategy_params: Dict[str, Any]
+    strategy_name: str = "TrendFollowingStrategy"
+    data_source: str = "main"
+    start_date: Optional[str] = None # 回测开始时间 (与 /api/backtest 请求一致)
+    end_date: Optional[str] = None   # 回测结束时间
+    view_start: Optional[str] = None # 可见范围开始 (图表日期, YYYY-MM-DD HH:MM:SS)
+    view_end: Optional[str] = None   # 可见范围结束 (包含)
+    max_points: Optional[int] = None # 可见范围仍然很大时的最大点数，None 返回完整明细
+
+@app.post("/api/backtest/zoom", response_class=FastJSONResponse)
+def zoom_backtest_chart(request: ChartZoomRequest):
+    """
+    图表缩放时按可见范围返回 K 线明细 (首次回测返回的是降采样后的图表)
+    """
+    engine = engine_module.BacktestEngine()
+    result = engine.chart_data(
+        symbol=request.symbol,
+        period=request.period,
+        strategy_params=request.strategy_params,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        view_start=request.view_start,
+        view_end=request.view_end,
+        strategy_name=request.strategy_name,
+        market_type=request.market_type,
+        data_source=request.data_source,
+        max_points=request.max_points
+    )
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return FastJSONResponse(result)
+
+class WalkForwardRequest(BaseModel):
+    symbol: str
+    period: str
+    market_type: str = "futures"
+    strategy_params: Dict[str, Any]
+    strategy_name: str = "TrendFollowingStrategy"
+    data_source: str = "main"
+    initial_cash: float = 1000000.0
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    n_folds: int = 4 # 折数
+    in_sample_ratio: float = 0.75 # 每折中样本内 (优化) 区间占比
+    max_trials: int = 10 # 每折样本内随机搜索次数
+    target_return: Optional[float] = None # 样本内达到该收益率 (%) 即停止搜索，None 跑满 max_trials
+    processes: Optional[int] = None # 并行进程数，None 自动
+    seed: Optional[int] = None
+
+@app.post("/api/backtest/walk-forward", response_class=FastJSONResponse)
+def run_walk_forward(request: WalkForwardRequest):
+    """
+    Walk-forward 分析: 滚动切分样本内/样本外，每折样本内优化参数、样本外检验，返回每折指标和拼接后的样本外权益曲线
+    """
+    if not 1 <= request.n_folds <= 20:
+        raise HTTPException(status_code=400, detail="n_folds 需在 1 到 20 之间")
+    result = walk_forward_module.walk_forward(
+        symbol=request.symbol,
+        period=request.period,
+        strategy_params=request.strategy_params,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        n_folds=request.n_folds,
+        in_sample_ratio=request.in_sample_ratio,
+        max_trials=max(1, min(request.max_trials, 200)),
+        target_return=request.target_return,
+        strategy_name=request.strategy_name,
+        market_type=request.market_type,
+        data_source=request.data_source,
+        initial_cash=request.initial_cash,
+        processes=request.processes,
+        seed=request.seed
+    )
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return FastJSONResponse(result)
+
+class PortfolioRequest(BaseModel):
+    symbols: List[str]
+    period: str
+    market_type: str = "futures"
+    strategy_params: Dict[str, Any]
+    strategy_name: str = "TrendFollowingStrategy"
+    data_source: str = "main"
+    initial_cash: float = 1000000.0
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    low_memory: Optional[bool] = None
+    chart_points: Optional[int] = None
+
+@app.post("/api/backtest/portfolio", response_class=FastJSONResponse)
+def run_portfolio_backtest(request: PortfolioRequest):
+    """
+    多品种组合回测: 共用资金，返回组合权益、各品种盈亏归因和相关系数
+    """
+    if not 1 <= len(request.symbols) <= 100:
+        raise HTTPException(status_code=400, detail="symbols 数量需在 1 到 100 之间")
+    result = portfolio_module.run_portfolio(
+        symbols=request.symbols,
+        period=request.period,
+        strategy_params=request.strategy_params,
+        initial_cash=request.initial_cash,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        strategy_name=request.strategy_name,
+        market_type=request.market_type,
+        data_source=request.data_source,
+        low_memory=request.low_memory,
+        chart_points=request.chart_points
+    )
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return FastJSONResponse(result)
 
 @app.get("/api/strategy/code")
 async def get_strategy_code():
@@ -370,9 +394,10 @@ async def save_backtest_result(request: SaveBacktestRequest, db: Session = Depen
             max_drawdown=request.max_drawdown,
             total_trades=request.total_trades,
             win_rate=request.win_rate,
-            detail_data=request.detail_data,
             is_optimized=0
         )
+        # 完整结果压缩后单独存储
+        set_detail(record, request.detail_data)
         db.add(record)
         db.commit()
         db.refresh(record)
@@ -381,36 +406,130 @@ async def save_backtest_result(request: SaveBacktestRequest, db: Session = Depen
         print(f"Save error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# 列表接口只读取摘要列，不加载 detail_data
+LIST_COLUMNS = (
+    BacktestRecord.id,
+    BacktestRecord.timestamp,
+    BacktestRecord.symbol,
+    BacktestRecord.period,
+    BacktestRecord.strategy_name,
+    BacktestRecord.final_value,
+    BacktestRecord.return_rate,
+    BacktestRecord.net_profit,
+    BacktestRecord.max_drawdown,
+    BacktestRecord.win_rate,
+    BacktestRecord.total_trades,
+)
+
+# 仅允许按有索引的列排序
+LIST_SORT_COLUMNS = {
+    "id": BacktestRecord.id,
+    "timestamp": BacktestRecord.timestamp,
+    "symbol": BacktestRecord.symbol,
+}
+
+def encode_list_cursor(sort_by, row):
+    value = getattr(row, sort_by)
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_list_cursor(sort_by, cursor):
+    value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    if sort_by == "timestamp" and value is not None:
+        value = datetime.datetime.fromisoformat(value)
+    return value, int(last_id)
+
 @app.get("/api/backtest/list")
-async def list_backtests(db: Session = Depends(get_db)):
+async def list_backtests(
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    sort_by: str = "timestamp",
+    order: str = "desc",
+    symbol: Optional[str] = None,
+    strategy_name: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    分页获取已保存的回测记录
+    - limit/offset: 普通分页
+    - cursor: 游标分页 (使用上一页返回的 next_cursor，大偏移量时比 offset 更快)
+    - sort_by: id / timestamp / symbol
+    """
+    if sort_by not in LIST_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"sort_by 仅支持: {', '.join(LIST_SORT_COLUMNS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order 仅支持 asc/desc")
+    limit = max(1, min(limit, 500))
+    offset = max(0, offset)
+
     try:
-        records = db.query(BacktestRecord).filter(BacktestRecord.detail_data.isnot(None)).order_by(desc(BacktestRecord.timestamp)).all()
-        result = []
-        for r in records:
-            result.append({
-                "id": r.id,
-                "timestamp": r.timestamp,
-                "symbol": r.symbol,
-                "period": r.period,
-                "strategy_name": r.strategy_name,
-                "final_value": r.final_value,
-                "return_rate": r.return_rate,
-                "net_profit": r.net_profit,
-                "max_drawdown": r.max_drawdown,
-                "win_rate": r.win_rate,
-                "total_trades": r.total_trades
-            })
-        return result
+        query = db.query(*LIST_COLUMNS).filter(BacktestRecord.has_detail == 1)
+        if symbol:
+            query = query.filter(BacktestRecord.symbol == symbol)
+        if strategy_name:
+            query = query.filter(BacktestRecord.strategy_name == strategy_name)
+        total = query.count()
+
+        sort_col = LIST_SORT_COLUMNS[sort_by]
+        direction = desc if order == "desc" else asc
+        if cursor:
+            # 游标分页: (排序列, id) 严格位于上一页最后一条之后
+            try:
+                last_value, last_id = decode_list_cursor(sort_by, cursor)
+            except Exception:
+                raise HTTPException(status_code=400, detail="无效的 cursor")
+            if order == "desc":
+                query = query.filter(or_(sort_col < last_value, and_(sort_col == last_value, BacktestRecord.id < last_id)))
+            else:
+                query = query.filter(or_(sort_col > last_value, and_(sort_col == last_value, BacktestRecord.id > last_id)))
+
+        # id 作为次级排序，保证分页顺序稳定
+        query = query.order_by(direction(sort_col), direction(BacktestRecord.id))
+        if not cursor:
+            query = query.offset(offset)
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return {
+            "items": [dict(r._mapping) for r in rows],
+            "total": total,
+            "limit": limit,
+            "offset": None if cursor else offset,
+            "next_cursor": encode_list_cursor(sort_by, rows[-1]) if has_more else None
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"List error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/backtest/{record_id}")
-async def get_backtest_detail(record_id: int, db: Session = Depends(get_db)):
+def load_record_detail(record):
+    # 解压结果按记录缓存，懒加载时多个部分/多页连续请求只解压一次
+    return detail_cache.get((record.id, record.timestamp), lambda: get_detail(record))
+
+@app.get("/api/backtest/{record_id}", response_class=FastJSONResponse)
+async def get_backtest_detail(record_id: int, request: Request, sections: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    - sections: 逗号分隔，detail_data 中只包含这些大字段 (kline_data,equity_curve,trades,logs)；
+      为空返回全部。例如 sections= (空字符串) 只返回指标，其余部分通过 /sections/{section} 按需分页读取
+    """
     try:
         record = db.query(BacktestRecord).filter(BacktestRecord.id == record_id).first()
         if not record:
             raise HTTPException(status_code=404, detail="Record not found")
+
+        # 保存的记录不可变: 使用 id + 创建时间 + 返回的部分作为强 ETag，命中时直接返回 304
+        # (sections=None 返回全部，sections="" 只返回指标，两者是不同的表示)
+        cache_headers = {
+            "ETag": make_etag("backtest", record.id, record.timestamp, repr(sections)),
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        }
+        if etag_matches(request.headers.get("if-none-match"), cache_headers["ETag"]):
+            return Response(status_code=304, headers=cache_headers)
         
         # 基础 metrics 从数据库列获取
         metrics = {
@@ -424,14 +543,20 @@ async def get_backtest_detail(record_id: int, db: Session = Depends(get_db)):
             "win_rate": record.win_rate
         }
 
+        # 按需解压完整结果
+        detail_data = load_record_detail(record)
+        if sections is not None and isinstance(detail_data, dict):
+            wanted = {name.strip() for name in sections.split(",") if name.strip()}
+            detail_data = {k: v for k, v in detail_data.items() if k not in DETAIL_SECTIONS or k in wanted}
+
         # 从 detail_data 中合并更多 metrics (如 max_capital_usage 等)
         # 优先使用 detail_data 中的数据，因为它包含更完整的指标字段
-        if record.detail_data and isinstance(record.detail_data, dict):
-            saved_metrics = record.detail_data.get("metrics", {})
+        if detail_data and isinstance(detail_data, dict):
+            saved_metrics = detail_data.get("metrics", {})
             if saved_metrics:
                 metrics.update(saved_metrics)
 
-        return {
+        return FastJSONResponse({
             "id": record.id,
             "timestamp": record.timestamp,
             "symbol": record.symbol,
@@ -439,12 +564,51 @@ async def get_backtest_detail(record_id: int, db: Session = Depends(get_db)):
             "strategy_name": record.strategy_name,
             "strategy_params": record.strategy_params,
             "metrics": metrics,
-            "detail_data": record.detail_data
-        }
+            "detail_data": detail_data
+        }, headers=cache_headers)
     except Exception as e:
         print(f"Detail error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/backtest/{record_id}/sections/{section}", response_class=FastJSONResponse)
+async def get_backtest_section(
+    record_id: int,
+    section: str,
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    按范围读取已保存回测的一部分 (kline_data / equity_curve / trades / logs)
+    - start/end: 日期范围 (包含两端，end 只写日期时包含当天)
+    - offset/limit: 在日期过滤后的结果中按位置分页 (不指定日期时即按 K 线序号)
+    kline_data 中的 K 线、成交量、均线、MACD、DKX 按同一范围截取，保持对齐
+    """
+    if section not in DETAIL_SECTIONS:
+        raise HTTPException(status_code=400, detail=f"section 仅支持: {', '.join(DETAIL_SECTIONS)}")
+
+    record = db.query(BacktestRecord).filter(BacktestRecord.id == record_id).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+
+    # 记录不可变，同一部分 + 相同范围参数的内容不会变化
+    cache_headers = {
+        "ETag": make_etag("backtest", record.id, record.timestamp, section, request.url.query),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+    }
+    if etag_matches(request.headers.get("if-none-match"), cache_headers["ETag"]):
+        return Response(status_code=304, headers=cache_headers)
+
+    try:
+        result = slice_section(load_record_detail(record), section, start=start, end=end, offset=offset, limit=limit)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"无效的日期范围: {e}")
+    result["id"] = record.id
+    return FastJSONResponse(result, headers=cache_headers)
+
 @app.delete("/api/backtest/{record_id}")
 async def delete_backtest(record_id: int, db: Session = Depends(get_db)):
     try:
@@ -465,9 +629,26 @@ class BatchAnalyzeRequest(BaseModel):
     strategy_params: Dict[str, Any]
     strategy_name: str = "TrendFollowingStrategy"
 
-@app.post("/api/strategy/batch-analyze")
+def materialized_response(kind, request, scan_window=None):
+    """
+    请求与某个定时扫描配置一致且最近一次收盘后已计算过时，直接返回物化结果
+    """
+    db = SessionLocal()
+    try:
+        found = scan_scheduler.find_materialized(db, kind, request.strategy_name, request.period, request.market_type,
+                                                 request.strategy_params, request.symbols, scan_window)
+    finally:
+        db.close()
+    if found is None:
+        return None
+    return Response(content=results_body(*found), media_type="application/json")
+
+@app.post("/api/strategy/batch-analyze", response_class=FastJSONResponse)
 async def batch_analyze(request: BatchAnalyzeRequest):
-    engine = BacktestEngine()
+    materialized = materialized_response("batch", request)
+    if materialized is not None:
+        return materialized
+    engine = engine_module.BacktestEngine()
     results = engine.analyze_batch(
         symbols=request.symbols,
         period=request.period,
@@ -475,7 +656,7 @@ async def batch_analyze(request: BatchAnalyzeRequest):
         strategy_name=request.strategy_name,
         market_type=request.market_type
     )
-    return {"results": results}
+    return FastJSONResponse({"results": results})
 
 class ScanRequest(BaseModel):
     symbols: List[str]
@@ -485,9 +666,12 @@ class ScanRequest(BaseModel):
     strategy_params: Dict[str, Any]
     strategy_name: str = "TrendFollowingStrategy"
 
-@app.post("/api/strategy/scan")
+@app.post("/api/strategy/scan", response_class=FastJSONResponse)
 async def scan_strategy(request: ScanRequest):
-    engine = BacktestEngine()
+    materialized = materialized_response("scan", request, request.scan_window)
+    if materialized is not None:
+        return materialized
+    engine = engine_module.BacktestEngine()
     results = engine.scan_signals(
         symbols=request.symbols,
         period=request.period,
@@ -496,7 +680,79 @@ async def scan_strategy(request: ScanRequest):
         strategy_name=request.strategy_name,
         market_type=request.market_type
     )
-    return {"results": results}
+    return FastJSONResponse({"results": results})
+
+class ScheduledScanRequest(BaseModel):
+    kind: str = "batch" # batch: 批量分析, scan: 开仓信号扫描
+    symbols: List[str]
+    period: str
+    market_type: str = "futures"
+    strategy_params: Dict[str, Any]
+    strategy_name: str = "TrendFollowingStrategy"
+    scan_window: Optional[int] = None
+    run_now: bool = True # 保存后立即在后台运行一次
+
+@app.get("/api/strategy/scheduled-scans")
+def list_scheduled_scans():
+    return scan_scheduler.configs(enabled_only=False)
+
+@app.post("/api/strategy/scheduled-scans")
+def create_scheduled_scan(request: ScheduledScanRequest, db: Session = Depends(get_db)):
+    """
+    添加收盘后定时运行的扫描
+    """
+    if request.kind not in ("batch", "scan"):
+        raise HTTPException(status_code=400, detail="kind must be 'batch' or 'scan'")
+    if request.kind == "scan" and not request.scan_window:
+        raise HTTPException(status_code=400, detail="scan_window is required for kind 'scan'")
+    # 结果按 (scan_id, trade_date, symbol) 唯一，重复的品种只保留一个
+    symbols = list(dict.fromkeys(request.symbols))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="symbols must not be empty")
+    row = ScheduledScan(
+        kind=request.kind,
+        strategy_name=request.strategy_name,
+        period=request.period,
+        market_type=request.market_type,
+        symbols=symbols,
+        strategy_params=request.strategy_params,
+        scan_window=request.scan_window,
+    )
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    config = scan_config(row)
+    if request.run_now:
+        scan_scheduler.run_in_background(config)
+    return config
+
+@app.delete("/api/strategy/scheduled-scans/{scan_id}")
+def delete_scheduled_scan(scan_id: int, db: Session = Depends(get_db)):
+    row = db.query(ScheduledScan).filter(ScheduledScan.id == scan_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Scheduled scan not found")
+    db.delete(row)
+    db.commit()
+    return {"status": "success", "message": "Scheduled scan deleted"}
+
+@app.post("/api/strategy/scheduled-scans/{scan_id}/run")
+def run_scheduled_scan(scan_id: int, db: Session = Depends(get_db)):
+    """
+    立即在后台重新运行 (如修改策略代码后)
+    """
+    row = db.query(ScheduledScan).filter(ScheduledScan.id == scan_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Scheduled scan not found")
+    scan_scheduler.run_in_background(scan_config(row))
+    return {"status": "started"}
+
+@app.get("/api/strategy/scheduled-scans/{scan_id}/results")
+def get_scan_results(scan_id: int, trade_date: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    读取一个定时扫描配置的物化结果 (不传 trade_date 时返回该配置最新的交易日)
+    """
+    trade_date, computed_at, payloads = load_results(db, scan_id, trade_date)
+    return Response(content=results_body(trade_date, computed_at, payloads), media_type="application/json")
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,48 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.bar_store import SharedBarStore, attach
+
+
+def _close_sum(spec):
+    # 在子进程中附加共享内存
+    with attach(spec) as bars:
+        return float(bars.column('Close').sum()), str(bars.dates[-1])
+
+
+class TestBarStore(unittest.TestCase):
+    def setUp(self):
+        index = pd.date_range('2024-01-02 09:00', periods=500, freq='min')
+        close = np.linspace(3000, 3100, 500)
+        self.df = pd.DataFrame({
+            'Open': close - 1, 'High': close + 2, 'Low': close - 2, 'Close': close,
+            'Volume': np.arange(500), 'OpenInterest': 0,
+        }, index=index)
+
+    def test_roundtrip(self):
+        with SharedBarStore() as store:
+            spec = store.publish('RB0', self.df)
+            # 同一序列只发布一次
+            self.assertIs(store.publish('RB0', self.df), spec)
+            with attach(spec) as bars:
+                expected = self.df.astype(np.float64)
+                expected.index = expected.index.as_unit('ns')
+                pd.testing.assert_frame_equal(bars.to_frame(), expected, check_freq=False)
+
+    def test_worker_process(self):
+        with SharedBarStore() as store:
+            spec = store.publish('RB0', self.df)
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                total, last = pool.submit(_close_sum, spec).result()
+            self.assertAlmostEqual(total, self.df['Close'].sum())
+            self.assertEqual(pd.Timestamp(last), self.df.index[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.downsample import lttb_bounds, lttb_indices
+from core.chart import build_kline_data, downsample_equity, view_range
+
+
+def make_bars(n):
+    idx = pd.date_range('2024-01-02 09:00', periods=n, freq='min')
+    close = 3000 + np.cumsum(np.random.default_rng(7).normal(0, 2, n))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 10.0}, index=idx)
+
+
+class TestLTTB(unittest.TestCase):
+    def test_bounds_keep_endpoints(self):
+        bounds = lttb_bounds(1000, 50)
+        self.assertEqual(len(bounds) - 1, 50)
+        self.assertEqual(bounds[:2].tolist(), [0, 1])
+        self.assertEqual(bounds[-2:].tolist(), [999, 1000])
+
+    def test_keeps_spikes(self):
+        y = np.zeros(1000)
+        y[123] = 50.0
+        y[777] = -40.0
+        bounds = lttb_bounds(len(y), 20)
+        selected = lttb_indices(y, bounds)
+        self.assertIn(123, selected)
+        self.assertIn(777, selected)
+        self.assertEqual(selected[0], 0)
+        self.assertEqual(selected[-1], 999)
+        # 每个区间恰好选一个点
+        self.assertTrue(all(bounds[i] <= selected[i] < bounds[i + 1] for i in range(len(selected))))
+
+    def test_skips_nan_warmup(self):
+        y = np.arange(100, dtype=np.float64)
+        y[:30] = np.nan
+        bounds = lttb_bounds(len(y), 10)
+        selected = lttb_indices(y, bounds)
+        # 只要区间内有有效值，选中的就不是 NaN
+        for i, j in enumerate(selected):
+            if not np.isnan(y[bounds[i]:bounds[i + 1]]).all():
+                self.assertFalse(np.isnan(y[j]))
+
+
+class TestKlineData(unittest.TestCase):
+    def test_downsampled_series_are_aligned(self):
+        df = make_bars(5000)
+        data = build_kline_data(df, 'DKXStrategy', {'fast_period': 5, 'slow_period': 20}, max_points=300)
+        self.assertEqual(data['downsample'], {"bars": 5000, "points": 300})
+        self.assertEqual(len(data['dates']), 300)
+        self.assertEqual(len(data['values']), 300)
+        self.assertEqual(sum(data['volumes']), 50000.0)
+        for series in (data['ma']['ma5'], data['ma']['strategy_fast'], data['macd']['hist'], data['dkx']['dkx']):
+            self.assertEqual(len(series), 300)
+
+    def test_view_matches_full_chart(self):
+        df = make_bars(3000)
+        params = {'fast_period': 5, 'slow_period': 20}
+        full = build_kline_data(df, 'DKXStrategy', params)
+        lo, hi = view_range(df.index, str(df.index[1000]), str(df.index[1499]))
+        self.assertEqual((lo, hi), (1000, 1500))
+
+        zoomed = build_kline_data(df, 'DKXStrategy', params, view=(lo, hi))
+        self.assertNotIn('downsample', zoomed)
+        self.assertEqual(zoomed['dates'], full['dates'][1000:1500])
+        self.assertEqual(zoomed['ma']['strategy_slow'], full['ma']['strategy_slow'][1000:1500])
+        self.assertEqual(zoomed['dkx']['madkx'], full['dkx']['madkx'][1000:1500])
+
+    def test_equity_follows_kline_buckets(self):
+        values = 1e6 + np.cumsum(np.random.default_rng(3).normal(0, 100, 2000))
+        curve = [{"date": str(i), "value": float(v), "return": 0.0} for i, v in enumerate(values)]
+        sampled = downsample_equity(curve, 100)
+        self.assertEqual(len(sampled), 100)
+        self.assertEqual(sampled[-1]['value'], curve[-1]['value'])
+        self.assertAlmostEqual(sampled[5]['return'], sampled[5]['value'] / sampled[4]['value'] - 1.0)
+        self.assertIs(downsample_equity(curve, None), curve)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.database import Base, BacktestRecord, upgrade_schema, ensure_indexes, get_detail, rebuild_with_autoincrement, set_detail
+
+
+class TestUpgradeSchema(unittest.TestCase):
+    def setUp(self):
+        self.bind = create_engine("sqlite://", poolclass=StaticPool)
+        # 旧版表结构: 完整结果保存在 detail_data 列，没有 has_detail
+        with self.bind.connect() as conn:
+            conn.execute(text(
+                "CREATE TABLE backtest_records (id INTEGER PRIMARY KEY, timestamp DATETIME, symbol VARCHAR, period VARCHAR, "
+                "strategy_name VARCHAR, strategy_params JSON, initial_cash FLOAT, final_value FLOAT, net_profit FLOAT, "
+                "return_rate FLOAT, sharpe_ratio FLOAT, max_drawdown FLOAT, total_trades INTEGER, win_rate FLOAT, "
+                "is_optimized INTEGER, detail_data JSON)"
+            ))
+            conn.execute(text("INSERT INTO backtest_records (id, symbol, detail_data) VALUES (1, 'RB0', '{\"logs\": []}'), (2, 'M0', NULL)"))
+            conn.commit()
+
+    def test_legacy_detail_rows_listed(self):
+        Base.metadata.create_all(bind=self.bind)
+        with self.bind.connect() as conn:
+            # 旧版本创建的索引
+            conn.execute(text("CREATE INDEX ix_strategy_scan_results_lookup ON strategy_scan_results (strategy_name, period, trade_date, symbol)"))
+            conn.commit()
+        upgrade_schema(self.bind)
+        ensure_indexes(self.bind)
+        db = sessionmaker(bind=self.bind)()
+        try:
+            rows = db.query(BacktestRecord).filter(BacktestRecord.has_detail == 1).all()
+            self.assertEqual([r.symbol for r in rows], ['RB0'])
+            self.assertEqual(get_detail(rows[0]), {"logs": []})
+        finally:
+            db.close()
+        # 重复启动不会出错
+        upgrade_schema(self.bind)
+        with self.bind.connect() as conn:
+            indexes = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'strategy_scan_results'")).scalars().all()
+        self.assertNotIn('ix_strategy_scan_results_lookup', indexes)
+
+    def test_rebuild_stops_id_reuse(self):
+        Base.metadata.create_all(bind=self.bind)
+        upgrade_schema(self.bind)
+        Session = sessionmaker(bind=self.bind)
+        db = Session()
+        record = BacktestRecord(id=3, symbol='IF0')
+        set_detail(record, {"logs": ["x"]})
+        db.add(record)
+        db.commit()
+        db.close()
+
+        self.assertTrue(rebuild_with_autoincrement(self.bind))
+        self.assertFalse(rebuild_with_autoincrement(self.bind))
+        db = Session()
+        try:
+            # 删除旧表时不会级联删除详情
+            self.assertEqual(get_detail(db.get(BacktestRecord, 3)), {"logs": ["x"]})
+            db.query(BacktestRecord).filter(BacktestRecord.id == 3).delete()
+            db.commit()
+            record = BacktestRecord(symbol='RB0')
+            db.add(record)
+            db.commit()
+            self.assertEqual(record.id, 4)
+            self.assertEqual(get_detail(db.get(BacktestRecord, 1)), {"logs": []})
+        finally:
+            db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
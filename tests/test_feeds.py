@@ -0,0 +1,72 @@
+import unittest
+import datetime
+import sys
+import os
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.feeds import NumpyData, datetime64_to_num
+from core.bar_store import SharedBarStore, attach
+
+
+class MAData(NumpyData):
+    lines = ('ma_fast',)
+
+
+class Recorder(bt.Strategy):
+    def __init__(self):
+        self.sma = bt.ind.SMA(self.data.close, period=5)
+        self.rows = []
+
+    def next(self):
+        extra = self.data.ma_fast[0] if hasattr(self.data.lines, 'ma_fast') else None
+        self.rows.append((self.data.datetime.datetime(0), self.data.close[0], self.data.volume[0], self.sma[0], extra))
+
+
+def run(feed, **kwargs):
+    cerebro = bt.Cerebro(stdstats=False, **kwargs)
+    cerebro.adddata(feed)
+    cerebro.addstrategy(Recorder)
+    return cerebro.run()[0].rows
+
+
+class TestNumpyData(unittest.TestCase):
+    def setUp(self):
+        index = pd.date_range('2024-01-02 09:00', periods=300, freq='5min')
+        close = 3000 + np.cumsum(np.random.default_rng(0).normal(0, 2, 300))
+        self.df = pd.DataFrame({
+            'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+            'Volume': np.arange(300), 'OpenInterest': 0, 'ma_fast': close - 0.5,
+        }, index=index)
+
+    def test_date2num(self):
+        dates = [datetime.datetime(2024, 1, 2, 9, 13, 27, 123456), datetime.datetime(1999, 12, 31, 23, 59, 59)]
+        nums = datetime64_to_num(np.array(dates, dtype='datetime64[ns]'))
+        self.assertEqual(list(nums), [bt.date2num(d) for d in dates])
+
+    def test_matches_pandas_data(self):
+        expected = run(bt.feeds.PandasData(dataname=self.df))
+        self.assertEqual(run(NumpyData(dataname=self.df)), expected)
+        # 逐根加载路径 (exactbars 关闭预加载)
+        self.assertEqual(run(NumpyData(dataname=self.df), exactbars=1), expected)
+
+    def test_extra_lines_and_dates(self):
+        fromdate = datetime.datetime(2024, 1, 2, 10, 0)
+        todate = datetime.datetime(2024, 1, 2, 12, 0)
+        rows = run(MAData(dataname=self.df, fromdate=fromdate, todate=todate))
+        self.assertEqual(rows[0][0], datetime.datetime(2024, 1, 2, 10, 20)) # SMA(5) 预热
+        self.assertEqual(rows[-1][0], todate)
+        self.assertEqual(rows[-1][4], self.df.loc[todate, 'ma_fast'])
+
+    def test_shared_bars(self):
+        with SharedBarStore() as store:
+            with attach(store.publish('RB0', self.df)) as bars:
+                rows = run(NumpyData(dataname=bars))
+        self.assertEqual(rows, run(bt.feeds.PandasData(dataname=self.df)))
+
+
+if __name__ == '__main__':
+    unittest.main()
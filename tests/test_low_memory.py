@@ -0,0 +1,88 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.spill import SpillArray, SpillList
+from core.downsample import ohlcv_buckets
+from core.feeds import NumpyData
+
+
+class TestSpill(unittest.TestCase):
+    def test_spill_array_across_chunks(self):
+        spill = SpillArray(2, chunk_rows=3)
+        for i in range(10):
+            spill.append(i, i * 0.5)
+        rows = spill.to_numpy()
+        self.assertEqual(rows.shape, (10, 2))
+        self.assertEqual(rows[7].tolist(), [7.0, 3.5])
+
+        # 读取后可以继续追加
+        spill.append(10, 5.0)
+        self.assertEqual(len(spill.to_numpy()), 11)
+        spill.close()
+
+    def test_spill_list_roundtrip(self):
+        items = SpillList()
+        items.append({"date": "2024-01-02 09:01:00", "price": 3500.0, "mdd_price": None})
+        items.append({"date": "2024-01-02 09:02:00", "price": 3501.5, "mdd_price": 3490.0})
+        self.assertEqual(len(items), 2)
+        self.assertEqual([x["price"] for x in items], [3500.0, 3501.5])
+        self.assertEqual(list(items)[0]["mdd_price"], None)
+        items.close()
+
+
+class TestDownsample(unittest.TestCase):
+    def test_ohlcv_buckets(self):
+        idx = pd.date_range('2024-01-02 09:00', periods=6, freq='min')
+        df = pd.DataFrame({
+            'Open': [1.0, 2, 3, 4, 5, 6],
+            'High': [2.0, 9, 4, 5, 6, 7],
+            'Low': [0.5, 1, 2, 0.1, 4, 5],
+            'Close': [1.5, 2.5, 3.5, 4.5, 5.5, 6.5],
+            'Volume': [1, 1, 1, 2, 2, 2],
+        }, index=idx)
+        bounds = np.array([0, 3, 6])
+        bars = ohlcv_buckets(df, bounds)
+        self.assertEqual(list(bars.index), [idx[0], idx[3]])
+        self.assertEqual(bars['Open'].tolist(), [1.0, 4.0])
+        self.assertEqual(bars['High'].tolist(), [9.0, 7.0])
+        self.assertEqual(bars['Low'].tolist(), [0.5, 0.1])
+        self.assertEqual(bars['Close'].tolist(), [3.5, 6.5])
+        self.assertEqual(bars['Volume'].tolist(), [3.0, 6.0])
+
+
+class LastBar(bt.Strategy):
+    def __init__(self):
+        self.sma = bt.ind.SMA(self.data.close, period=5)
+        self.last_seen = None
+
+    def next(self):
+        # len(self) 包含指标预热期，按 K 线计数
+        if len(self) == self.data.total_bars:
+            self.last_seen = self.data.close[0]
+
+
+class TestTotalBars(unittest.TestCase):
+    def test_total_bars_under_exactbars(self):
+        idx = pd.date_range('2024-01-02 09:00', periods=50, freq='min')
+        close = np.arange(50, dtype=np.float64)
+        df = pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1.0}, index=idx)
+
+        cerebro = bt.Cerebro(stdstats=False)
+        cerebro.adddata(NumpyData(dataname=df, fromdate=idx[10].to_pydatetime()))
+        cerebro.addstrategy(LastBar)
+        strat = cerebro.run(exactbars=1)[0]
+
+        # exactbars=1 时 buflen() 只是滚动缓冲区大小，total_bars 仍是完整长度
+        self.assertLess(strat.data.buflen(), 40)
+        self.assertEqual(strat.data.total_bars, 40)
+        self.assertEqual(strat.last_seen, 49.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import sys
+import os
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import core.engine as engine
+from core.panel import Panel
+from core.scan_state import ScanCheckpoints, incremental_books, resume_at, scan_checkpoints, scan_start
+
+
+def daily_bars(seed, n=200, ties=False):
+    index = pd.bdate_range('2023-01-02', periods=n)
+    rng = np.random.default_rng(seed)
+    # 整数价格的小幅波动会让均线频繁相等，检验差值为 0 时与 backtrader 的判断一致
+    steps = rng.integers(-2, 3, n) if ties else rng.normal(0, 20, n)
+    close = 3000 + np.cumsum(steps).astype(float)
+    open_ = close + np.round(rng.normal(0, 5, n), 1)
+    return pd.DataFrame({'Open': open_, 'High': np.maximum(open_, close) + 5, 'Low': np.minimum(open_, close) - 5,
+                         'Close': close, 'Volume': 100.0, 'OpenInterest': 0.0}, index=index)
+
+
+class TestPanel(unittest.TestCase):
+    def test_crossover(self):
+        frame = pd.DataFrame({'open': 2.0, 'high': 0.0, 'low': 0.0, 'close': [3.0, 1.0, 2.0, 3.0, 1.0]},
+                             index=pd.bdate_range('2024-01-01', periods=5))
+        panel = Panel([frame, frame.iloc[2:]])
+        cross = panel.crossover('close', 'open')
+        # 差值为 0 的 K 线沿用之前的差值: 第 4 根相对第 2 根算上穿
+        np.testing.assert_array_equal(cross[0], [np.nan, -1.0, 0.0, 1.0, -1.0])
+        # 较短的品种右对齐，第一个差值为 0 时之后不算上穿
+        np.testing.assert_array_equal(cross[1], [np.nan, np.nan, np.nan, 0.0, -1.0])
+        np.testing.assert_allclose(panel.sma('close', 2).values[0], [np.nan, 2.0, 1.5, 2.5, 2.0])
+
+
+class TestPanelScan(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.datas = {f'S{i}': daily_bars(i, n=[200, 120, 200, 60][i % 4], ties=i % 2 == 1) for i in range(8)}
+
+    def setUp(self):
+        scan_checkpoints.clear()
+
+    def patched(self, vectorized):
+        fetch = lambda symbol, *args, **kwargs: self.datas[symbol].copy()
+        vector = engine.has_vector_signals if vectorized else (lambda cls: False)
+        return mock.patch.multiple(engine, fetch_data=fetch, has_vector_signals=vector)
+
+    def scan(self, strategy_name, params, scan_window, vectorized):
+        with self.patched(vectorized):
+            return engine.BacktestEngine().scan_signals(list(self.datas), 'daily', scan_window, dict(params), strategy_name=strategy_name)
+
+    def analyze(self, strategy_name, params, vectorized):
+        with self.patched(vectorized):
+            return engine.BacktestEngine().analyze_batch(list(self.datas), 'daily', dict(params), strategy_name=strategy_name)
+
+    def test_matches_backtrader(self):
+        cases = [
+            ('TrendFollowingStrategy', {'fast_period': 5, 'slow_period': 20}),
+            ('TrendFollowingStrategy', {'fast_period': 3, 'slow_period': 8, 'use_expma': True, 'fixed_size': 3}),
+            ('StockMA20MA55LongOnlyStrategy', {'fast_period': 3, 'slow_period': 8}),
+            ('MA55BreakoutStrategy', {'ma_period': 5}),
+        ]
+        for name, params in cases:
+            for scan_window in (5, 60, 201):
+                with self.subTest(strategy=name, params=params, scan_window=scan_window):
+                    self.assertEqual(self.scan(name, params, scan_window, True), self.scan(name, params, scan_window, False))
+            with self.subTest(strategy=name, params=params, analyze=True):
+                self.assertEqual(self.analyze(name, params, True), self.analyze(name, params, False))
+
+    def test_inherited_signals_not_used(self):
+        # 子类加入了止盈逻辑，不能沿用父类的向量化信号
+        self.assertTrue(engine.has_vector_signals(engine.strategy.MA20MA55CrossoverStrategy))
+        self.assertFalse(engine.has_vector_signals(engine.strategy.MA20MA55PartialTakeProfitStrategy))
+
+
+class TestScanCheckpoints(unittest.TestCase):
+    PARAMS = {'fast_period': 3, 'slow_period': 8, 'use_expma': True, 'print_log': False}
+
+    def books(self, datas, n, store):
+        items = [(symbol, df.iloc[:n]) for symbol, df in datas.items()]
+        return [(b.entry_signals(df.index[-1], df['close'].iloc[-1]), b.holding(), b.bars)
+                for b, (_, df) in zip(incremental_books(engine.strategy.TrendFollowingStrategy, items, self.PARAMS, 'scan', 'daily', 'futures', store), items)]
+
+    def test_resume_matches_fresh(self):
+        datas = {f'S{i}': daily_bars(10 + i, n=120, ties=i % 2 == 1) for i in range(4)}
+        for df in datas.values():
+            df.columns = [c.lower() for c in df.columns]
+        store = ScanCheckpoints()
+        for n in range(30, 121, 9):
+            # 最后一根 K 线尚未收盘，下次扫描时价格已变化
+            forming = {symbol: df.iloc[:n].copy() for symbol, df in datas.items()}
+            for df in forming.values():
+                df.iloc[-1, df.columns.get_loc('close')] += 7.0
+            self.books(forming, n, store)
+            self.assertEqual(self.books(datas, n, store), self.books(datas, n, ScanCheckpoints()))
+
+    def test_revised_history_recomputes(self):
+        df = daily_bars(5, n=80)
+        df.columns = [c.lower() for c in df.columns]
+        store = ScanCheckpoints()
+        self.books({'S0': df}, 70, store)
+        revised = df.copy()
+        revised.iloc[60, revised.columns.get_loc('close')] += 50.0
+        self.assertEqual(self.books({'S0': revised}, 80, store), self.books({'S0': revised}, 80, ScanCheckpoints()))
+
+    def test_sliding_window_matches_fresh(self):
+        datas = {f'S{i}': daily_bars(20 + i, n=500, ties=i % 2 == 1) for i in range(4)}
+        for df in datas.values():
+            df.columns = [c.lower() for c in df.columns]
+        index = datas['S0'].index
+        for anchored in (False, True):
+            store, resumed = ScanCheckpoints(), []
+
+            def counting(checkpoint, df):
+                at = resume_at(checkpoint, df)
+                resumed.append(at is not None)
+                return at
+
+            with mock.patch('core.scan_state.resume_at', counting):
+                for today in index[300:450]:
+                    # 每天重新扫描最近一年的数据: 起点每天滑动时持仓状态不同，不能从检查点继续；固定到月初后可以
+                    start = pd.Timestamp(scan_start(365, today)) if anchored else today - pd.Timedelta(days=365)
+                    window = {symbol: df[(df.index >= start) & (df.index <= today)] for symbol, df in datas.items()}
+                    with self.subTest(anchored=anchored, today=today):
+                        self.assertEqual(self.books(window, None, store), self.books(window, None, ScanCheckpoints()))
+            if anchored:
+                self.assertGreater(sum(resumed), len(resumed) * 0.9)
+
+if __name__ == '__main__':
+    unittest.main()
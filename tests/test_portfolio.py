@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.engine import BacktestEngine
+from core.portfolio import run_portfolio, pnl_correlation
+
+
+def daily_bars(seed, start='2021-01-01', end='2023-12-29'):
+    index = pd.bdate_range(start, end)
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 20, len(index)))
+    return pd.DataFrame({'Open': close, 'High': close + 10, 'Low': close - 10, 'Close': close,
+                         'Volume': 1e4, 'OpenInterest': 1e3}, index=index)
+
+
+PARAMS = {'fast_period': 5, 'slow_period': 20}
+
+
+class TestPortfolio(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # M0 比其他品种晚上市，检验不同交易日历的对齐
+        cls.datas = {'RB0': daily_bars(1), 'M0': daily_bars(2, start='2022-06-01'), 'IF0': daily_bars(3)}
+
+    def run_portfolio(self, symbols, **kwargs):
+        return run_portfolio(symbols, 'daily', dict(PARAMS), start_date='2022-01-01', end_date='2023-12-29', datas=self.datas, **kwargs)
+
+    def test_single_symbol_matches_run(self):
+        portfolio = self.run_portfolio(['RB0'])
+        single = BacktestEngine().run('RB0', 'daily', dict(PARAMS, contract_multiplier=10), start_date='2022-01-01',
+                                      end_date='2023-12-29', data=self.datas['RB0'])
+        self.assertAlmostEqual(portfolio['metrics']['final_value'], single['metrics']['final_value'], places=6)
+        self.assertEqual(portfolio['metrics']['total_trades'], single['metrics']['total_trades'])
+
+    def test_attribution_sums_to_portfolio(self):
+        result = self.run_portfolio(['RB0', 'M0', 'IF0', 'XX0'])
+        self.assertEqual([a['symbol'] for a in result['attribution']], ['RB0', 'M0', 'IF0'])
+        self.assertEqual(result['errors'][0]['symbol'], 'XX0')
+        # 股指乘数 300，螺纹 10
+        self.assertEqual(result['attribution'][2]['contract_multiplier'], 300)
+        total = sum(a['net_profit'] for a in result['attribution'])
+        self.assertAlmostEqual(total, result['metrics']['net_profit'], places=4)
+        self.assertEqual(result['correlation']['symbols'], ['RB0', 'M0', 'IF0'])
+
+    def test_low_memory_matches(self):
+        normal = self.run_portfolio(['RB0', 'M0'])
+        bounded = self.run_portfolio(['RB0', 'M0'], low_memory=True)
+        self.assertEqual(normal['metrics'], bounded['metrics'])
+        self.assertEqual(normal['attribution'], bounded['attribution'])
+
+
+class TestCorrelation(unittest.TestCase):
+    def test_union_of_days(self):
+        daily = {'A': {1: 0.0, 2: 1.0, 3: 3.0, 4: 2.0}, 'B': {1: 0.0, 2: 2.0, 4: 4.0}}
+        result = pnl_correlation(daily)
+        # B 在第 3 天没有 K 线，盈亏视为不变
+        expected = np.corrcoef([1.0, 2.0, -1.0], [2.0, 0.0, 2.0])[0, 1]
+        self.assertAlmostEqual(result['matrix'][0][1], expected)
+        self.assertIsNone(pnl_correlation({'A': daily['A']}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.engine import BacktestEngine
+from core.profiling import stage_stats
+
+
+def daily_bars(seed, n=300):
+    index = pd.bdate_range('2022-01-03', periods=n)
+    close = 3000 + np.cumsum(np.random.default_rng(seed).normal(0, 20, n))
+    return pd.DataFrame({'Open': close, 'High': close + 10, 'Low': close - 10, 'Close': close,
+                         'Volume': 1e4, 'OpenInterest': 1e3}, index=index)
+
+
+class TestRunTiming(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = daily_bars(1)
+
+    def run_backtest(self, **kwargs):
+        return BacktestEngine().run('RB0', 'daily', {'fast_period': 5, 'slow_period': 20}, start_date='2022-06-01',
+                                    end_date='2023-02-28', data=self.data, **kwargs)
+
+    def test_timing_opt_in(self):
+        stage_stats.clear()
+        plain = self.run_backtest()
+        timed = self.run_backtest(timing=True)
+        self.assertNotIn('timing', plain)
+        self.assertEqual(list(timed['timing']['stages']), ['setup', 'download', 'clean', 'indicators', 'prepare', 'cerebro',
+                                                           'analyzers', 'filter', 'chart', 'clean_data'])
+        self.assertAlmostEqual(sum(timed['timing']['stages'].values()), timed['timing']['total_ms'], delta=0.1)
+        # 不返回耗时的请求也计入累计统计
+        self.assertEqual(stage_stats.snapshot()['run.cerebro']['count'], 2)
+        timed.pop('timing')
+        self.assertEqual(plain, timed)
+
+    def test_profile(self):
+        result = self.run_backtest(profile='cprofile')
+        self.assertEqual(result['profile']['mode'], 'cprofile')
+        self.assertIn('_run', result['profile']['report'])
+        self.assertIn('error', self.run_backtest(profile='perf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
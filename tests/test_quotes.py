@@ -0,0 +1,130 @@
+import unittest
+import sys
+import os
+import datetime
+import threading
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core import quotes
+from core.quotes import TTLCache, in_trading_session, quote_ttl
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(quotes, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_expiry(self):
+        cache = TTLCache()
+        cache.set('a', 1, 30)
+        cache.set('b', 2, 600)
+        self.clock.now += 30
+        self.assertEqual((cache.get('a'), cache.get('b')), (1, 2))
+        self.clock.now += 0.5
+        self.assertEqual((cache.get('a'), cache.get('b')), (None, 2))
+
+    def test_evicts_earliest_expiry(self):
+        cache = TTLCache(max_entries=2)
+        cache.set('a', 1, 600)
+        cache.set('b', 2, 30)
+        cache.set('c', 3, 30)
+        self.assertEqual([cache.get(k) for k in 'abc'], [1, None, 3])
+        # 覆盖已有 key 不淘汰其他条目
+        cache.set('c', 4, 30)
+        self.assertEqual([cache.get(k) for k in 'ac'], [1, 4])
+
+
+class TestTradingSession(unittest.TestCase):
+    def check(self, cases, market_type='futures'):
+        for when, expected in cases:
+            with self.subTest(when=when, market_type=market_type):
+                self.assertEqual(in_trading_session(datetime.datetime.strptime(when, '%Y-%m-%d %H:%M'), market_type), expected)
+
+    def test_day_session_and_lunch_break(self):
+        # 2024-09-24 周二
+        self.check([
+            ('2024-09-24 08:59', False), ('2024-09-24 09:00', True), ('2024-09-24 11:30', True),
+            ('2024-09-24 11:31', False), ('2024-09-24 12:59', False), ('2024-09-24 13:00', True),
+            ('2024-09-24 15:00', True), ('2024-09-24 15:01', False),
+        ])
+
+    def test_night_session(self):
+        self.check([
+            ('2024-09-24 20:59', False), ('2024-09-24 21:00', True), ('2024-09-24 23:59', True),
+            ('2024-09-25 00:00', True), ('2024-09-25 02:30', True), ('2024-09-25 02:31', False),
+            # 周五夜盘延续到周六凌晨，周末白天和周一凌晨没有交易
+            ('2024-09-21 02:30', True), ('2024-09-21 10:00', False), ('2024-09-22 21:30', False),
+            ('2024-09-23 01:00', False), ('2024-09-23 09:00', True),
+        ])
+
+    def test_stock_session(self):
+        # 股票 09:30 开盘，没有夜盘
+        self.check([
+            ('2024-09-24 09:15', False), ('2024-09-24 09:30', True), ('2024-09-24 13:00', True),
+            ('2024-09-24 15:01', False), ('2024-09-24 22:00', False), ('2024-09-25 01:00', False),
+            ('2024-09-21 10:00', False),
+        ], market_type='stock')
+
+    def test_ttl(self):
+        self.assertEqual(quote_ttl(datetime.datetime(2024, 9, 24, 10, 0)), quotes.TRADING_TTL)
+        self.assertEqual(quote_ttl(datetime.datetime(2024, 9, 24, 12, 0)), quotes.CLOSED_TTL)
+        # 期货夜盘期间股票行情不会变化
+        self.assertEqual(quote_ttl(datetime.datetime(2024, 9, 24, 22, 0)), quotes.TRADING_TTL)
+        self.assertEqual(quote_ttl(datetime.datetime(2024, 9, 24, 22, 0), 'stock'), quotes.CLOSED_TTL)
+
+
+class TestLatestQuotes(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fetched = []
+        self.lock = threading.Lock()
+        for patcher in (mock.patch.object(quotes, 'time', self.clock),
+                        mock.patch.object(quotes, 'fetch_latest_quote', self.fetch),
+                        mock.patch.object(quotes, '_quote_cache', TTLCache()),
+                        mock.patch.object(quotes, 'quote_ttl', lambda now=None, market_type='futures': quotes.TRADING_TTL)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fetch(self, symbol, market_type='futures', data_source='main'):
+        with self.lock:
+            self.fetched.append(symbol)
+        if symbol == 'XX0':
+            raise LookupError("Symbol not found")
+        return {"symbol": symbol, "price": 1.0, "date": "2024-09-24"}
+
+    def test_cached_until_ttl(self):
+        quotes.get_latest_quote('RB0')
+        quotes.get_latest_quote('RB0')
+        # 不同数据源分开缓存
+        quotes.get_latest_quote('RB0', data_source='weighted')
+        self.assertEqual(self.fetched, ['RB0', 'RB0'])
+        self.clock.now += quotes.TRADING_TTL + 1
+        quotes.get_latest_quote('RB0')
+        self.assertEqual(len(self.fetched), 3)
+
+    def test_multi_symbol(self):
+        quotes.get_latest_quote('M0')
+        result = quotes.get_latest_quotes(['RB0', 'M0', 'XX0', 'RB0'])
+        self.assertEqual([q['symbol'] for q in result], ['RB0', 'M0', 'XX0'])
+        self.assertEqual(result[2]['error'], "Symbol not found")
+        # M0 命中缓存，重复的 RB0 只获取一次；失败的品种不缓存
+        self.assertEqual(sorted(self.fetched), ['M0', 'RB0', 'XX0'])
+        quotes.get_latest_quotes(['RB0', 'XX0'])
+        self.assertEqual(sorted(self.fetched), ['M0', 'RB0', 'XX0', 'XX0'])
+        self.assertEqual(quotes.get_latest_quotes([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.resample import resample_minutes, resample_bars, upstream_period, can_derive
+from core.series_cache import SeriesCache
+
+
+def futures_minutes(day, night_end='23:00', start_labeled=False):
+    """
+    一个交易日的期货 1 分钟线: 前一晚夜盘 + 日盘 (10:15-10:30 小节休息，11:30-13:30 午休)
+    """
+    day = pd.Timestamp(day)
+    segments = [(day - pd.Timedelta(days=1), '21:00', night_end), (day, '09:00', '10:15'), (day, '10:30', '11:30'), (day, '13:30', '15:00')]
+    parts = []
+    for base, start, end in segments:
+        lo = base + pd.Timedelta(start + ':00')
+        hi = base + pd.Timedelta(end + ':00')
+        if hi <= lo:
+            hi += pd.Timedelta(days=1)
+        parts.append(pd.date_range(lo, hi, freq='min', inclusive='left' if start_labeled else 'right'))
+    return parts[0].append(parts[1:])
+
+
+def stock_minutes(day):
+    """
+    一个交易日的股票 1 分钟线 (结束时间): 09:31-11:30, 13:01-15:00
+    """
+    day = pd.Timestamp(day)
+    return pd.date_range(day + pd.Timedelta('09:31:00'), day + pd.Timedelta('11:30:00'), freq='min').append(
+        pd.date_range(day + pd.Timedelta('13:01:00'), day + pd.Timedelta('15:00:00'), freq='min'))
+
+
+def bars(index):
+    close = np.arange(len(index), dtype=np.float64)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1.0, 'OpenInterest': close}, index=index)
+
+
+class TestResampleMinutes(unittest.TestCase):
+    def test_futures_60_minute_boundaries(self):
+        df = bars(futures_minutes('2024-01-03'))
+        result = resample_minutes(df, 60)
+        self.assertEqual(result.index.strftime('%H:%M').tolist(), ['22:00', '23:00', '10:00', '11:15', '14:15', '15:00'])
+        self.assertEqual(result['Volume'].tolist(), [60.0, 60.0, 60.0, 60.0, 60.0, 45.0])
+        # 第一根: 21:01-22:00
+        first = result.iloc[0]
+        self.assertEqual((first['Open'], first['Close'], first['High']), (0.0, 59.0, 60.0))
+
+    def test_night_session_across_midnight(self):
+        df = bars(futures_minutes('2024-01-03', night_end='02:30'))
+        labels = resample_minutes(df, 60).index.strftime('%H:%M').tolist()
+        self.assertEqual(labels[:6], ['22:00', '23:00', '00:00', '01:00', '02:00', '02:30'])
+        self.assertEqual(labels[6], '10:00')
+
+    def test_start_labeled_bars(self):
+        df = bars(futures_minutes('2024-01-03', start_labeled=True))
+        labels = resample_minutes(df, 60).index.strftime('%H:%M').tolist()
+        self.assertEqual(labels, ['21:00', '22:00', '09:00', '10:00', '11:15', '14:15'])
+
+    def test_chained_resample_matches_direct(self):
+        df = bars(futures_minutes('2024-01-03').append(futures_minutes('2024-01-04')))
+        direct = resample_minutes(df, 30)
+        chained = resample_minutes(resample_minutes(df, 5), 30, 5)
+        pd.testing.assert_frame_equal(direct, chained)
+
+    def test_coarser_bases_keep_end_labels(self):
+        # 15/30 分钟线的结束时间 09:15、09:30 恰好是 15 的倍数，不能据此当成开始时间
+        df = bars(futures_minutes('2024-01-03').append(futures_minutes('2024-01-04')))
+        m15, m30 = resample_minutes(df, 15), resample_minutes(df, 30)
+        self.assertEqual(m15.index.strftime('%H:%M').tolist()[8:10], ['09:15', '09:30'])
+        self.assertEqual(m30.index.strftime('%H:%M').tolist()[:6], ['21:30', '22:00', '22:30', '23:00', '09:30', '10:00'])
+        direct = resample_minutes(df, 60)
+        self.assertEqual(direct.index.strftime('%H:%M').tolist()[:6], ['22:00', '23:00', '10:00', '11:15', '14:15', '15:00'])
+        pd.testing.assert_frame_equal(resample_minutes(m15, 60, 15), direct)
+        pd.testing.assert_frame_equal(resample_minutes(m30, 60, 30), direct)
+        pd.testing.assert_frame_equal(resample_minutes(m15, 30, 15), m30)
+
+    def test_stock_bases(self):
+        df = bars(stock_minutes('2024-01-03').append(stock_minutes('2024-01-04')))
+        m15, m30 = resample_minutes(df, 15), resample_minutes(df, 30)
+        self.assertEqual(m30.index.strftime('%H:%M').tolist()[:2], ['10:00', '10:30'])
+        direct = resample_minutes(df, 60)
+        self.assertEqual(direct.index.strftime('%H:%M').tolist()[:4], ['10:30', '11:30', '14:00', '15:00'])
+        pd.testing.assert_frame_equal(resample_minutes(m15, 60, 15), direct)
+        pd.testing.assert_frame_equal(resample_minutes(m30, 60, 30), direct)
+
+    def test_start_labeled_coarser_base(self):
+        df = bars(futures_minutes('2024-01-03', start_labeled=True))
+        m15 = resample_minutes(df, 15)
+        self.assertEqual(m15.index.strftime('%H:%M').tolist()[:2], ['21:00', '21:15'])
+        labels = resample_minutes(m15, 60, 15).index.strftime('%H:%M').tolist()
+        self.assertEqual(labels, ['21:00', '22:00', '09:00', '10:00', '11:15', '14:15'])
+
+    def test_weekly_from_daily(self):
+        index = pd.bdate_range('2024-01-03', '2024-01-17')
+        weekly = resample_bars(bars(index), 'weekly', 'daily')
+        self.assertEqual(weekly.index.strftime('%m-%d').tolist(), ['01-05', '01-12', '01-19'])
+        self.assertEqual(weekly['Volume'].tolist(), [3.0, 5.0, 3.0])
+
+    def test_period_mapping(self):
+        self.assertEqual(upstream_period('weekly'), 'daily')
+        self.assertEqual(upstream_period('120'), '60')
+        self.assertEqual(upstream_period('10'), '5')
+        self.assertEqual(upstream_period('15'), '15')
+        self.assertTrue(can_derive('60', '15'))
+        self.assertFalse(can_derive('45', '30'))
+        self.assertFalse(can_derive('5', '15'))
+
+
+class TestSeriesCache(unittest.TestCase):
+    def setUp(self):
+        self.downloads = []
+        self.minutes = bars(futures_minutes('2024-01-03').append(futures_minutes('2024-01-04')))
+
+    def download(self, period):
+        self.downloads.append(period)
+        return self.minutes.copy()
+
+    def test_coarser_period_derived_from_cache(self):
+        cache = SeriesCache()
+        key = ('futures', 'main', 'RB0')
+        df, base = cache.load(key, '1', '2024-01-03', self.download)
+        self.assertEqual(base, '1')
+        df, base = cache.load(key, '60', '2024-01-03', self.download)
+        self.assertEqual(base, '1')
+        df, base = cache.load(key, '120', '2024-01-03', self.download)
+        self.assertEqual(base, '1')
+        self.assertEqual(self.downloads, ['1'])
+
+    def test_direct_download_when_cache_does_not_cover(self):
+        cache = SeriesCache()
+        key = ('futures', 'main', 'RB0')
+        cache.load(key, '1', None, self.download)
+        # 1 分钟数据只覆盖最近两天，更早的开始日期需要下载 15 分钟数据
+        df, base = cache.load(key, '15', '2023-12-01', self.download)
+        self.assertEqual(base, '15')
+        self.assertEqual(self.downloads, ['1', '15'])
+
+    def test_callers_cannot_modify_cache(self):
+        cache = SeriesCache()
+        key = ('futures', 'main', 'RB0')
+        df, _ = cache.load(key, '5', None, self.download)
+        df['ma_fast'] = 1.0
+        self.assertNotIn('ma_fast', cache.get(key, '5').columns)
+
+    def test_expired_entries_are_downloaded_again(self):
+        cache = SeriesCache(minute_ttl=-1)
+        key = ('futures', 'main', 'RB0')
+        cache.load(key, '5', None, self.download)
+        cache.load(key, '5', None, self.download)
+        self.assertEqual(self.downloads, ['5', '5'])
+
+
+if __name__ == '__main__':
+    unittest.main()
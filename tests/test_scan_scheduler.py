@@ -0,0 +1,145 @@
+import unittest
+import sys
+import os
+import json
+import datetime
+from unittest import mock
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import core.engine as engine
+from core.database import Base, ScheduledScan, StrategyScanResult
+from core.scan_scheduler import ScanScheduler, trade_date_for, next_run_at, load_results, results_body
+
+
+class WeekdayCalendar:
+    # 2024-10-01 ~ 10-07 国庆休市
+    def is_trading_day(self, date):
+        return date.weekday() < 5 and not datetime.date(2024, 10, 1) <= date <= datetime.date(2024, 10, 7)
+
+
+class FakeScheduler(ScanScheduler):
+    def __init__(self, session_factory):
+        super().__init__(session_factory, calendar=WeekdayCalendar())
+        self.computed = []
+
+    def compute(self, config):
+        self.computed.append(config['id'])
+        return [{"symbol": s, "direction": "多", "price": 1.5 * len(self.computed)} for s in config['symbols']]
+
+
+class TestTradeDate(unittest.TestCase):
+    def test_night_session_belongs_to_next_trading_day(self):
+        calendar = WeekdayCalendar()
+        at = lambda *args: trade_date_for(datetime.datetime(*args), calendar)
+        self.assertEqual(at(2024, 9, 24, 15, 30), datetime.date(2024, 9, 24))
+        self.assertEqual(at(2024, 9, 24, 23, 0), datetime.date(2024, 9, 25))
+        # 周五夜盘属于下周一，节前夜盘属于节后第一个交易日
+        self.assertEqual(at(2024, 9, 21, 2, 45), datetime.date(2024, 9, 23))
+        self.assertEqual(at(2024, 10, 1, 2, 45), datetime.date(2024, 10, 8))
+        self.assertEqual(at(2024, 9, 21, 10, 0), datetime.date(2024, 9, 23))
+
+    def test_next_run(self):
+        self.assertEqual(next_run_at(datetime.datetime(2024, 9, 24, 15, 30)), (datetime.datetime(2024, 9, 25, 2, 45), 'night'))
+        self.assertEqual(next_run_at(datetime.datetime(2024, 9, 24, 3, 0)), (datetime.datetime(2024, 9, 24, 15, 30), 'day'))
+
+
+class TestScanScheduler(unittest.TestCase):
+    def setUp(self):
+        bind = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=bind)
+        self.Session = sessionmaker(bind=bind)
+        db = self.Session()
+        db.add_all([
+            ScheduledScan(id=1, kind="batch", period="daily", market_type="futures", symbols=["RB0", "M0"], strategy_params={}),
+            ScheduledScan(id=2, kind="batch", period="daily", market_type="stock", symbols=["sh600000"], strategy_params={}),
+        ])
+        db.commit()
+        db.close()
+        self.scheduler = FakeScheduler(self.Session)
+
+    def read(self, scan_id, **kwargs):
+        db = self.Session()
+        try:
+            return json.loads(results_body(*load_results(db, scan_id, **kwargs)))
+        finally:
+            db.close()
+
+    def find(self, symbols, now, strategy_params=None, market_type="futures"):
+        db = self.Session()
+        try:
+            return self.scheduler.find_materialized(db, "batch", "TrendFollowingStrategy", "daily", market_type,
+                                                    strategy_params or {}, symbols, now=now)
+        finally:
+            db.close()
+
+    def test_sessions(self):
+        # 周六凌晨: 周五有夜盘，股票没有夜盘
+        self.assertEqual(self.scheduler.run_session(datetime.datetime(2024, 9, 21, 2, 45), 'night'), 1)
+        # 节假日白天不运行
+        self.assertEqual(self.scheduler.run_session(datetime.datetime(2024, 10, 2, 15, 30), 'day'), 0)
+        self.assertEqual(self.scheduler.computed, [1])
+
+        result = self.read(1)
+        self.assertEqual(result["trade_date"], "2024-09-23")
+        self.assertEqual([r["symbol"] for r in result["results"]], ["RB0", "M0"])
+        self.assertEqual(self.read(2), {"trade_date": None, "computed_at": None, "results": []})
+
+    def test_rerun_replaces(self):
+        run_at = datetime.datetime(2024, 9, 24, 15, 30)
+        self.scheduler.run_session(run_at, 'day')
+        self.scheduler.run_session(run_at, 'day')
+        # 每个配置的结果分开读取
+        self.assertEqual([r["price"] for r in self.read(1, trade_date="2024-09-24")["results"]], [4.5, 4.5])
+        self.assertEqual(self.read(2)["results"], [{"symbol": "sh600000", "direction": "多", "price": 6.0}])
+
+    def test_find_materialized(self):
+        self.scheduler.run_session(datetime.datetime(2024, 9, 24, 15, 30), 'day')
+        db = self.Session()
+        db.query(StrategyScanResult).update({"computed_at": datetime.datetime(2024, 9, 24, 15, 31)})
+        db.commit()
+        db.close()
+        found = self.find(["M0"], datetime.datetime(2024, 9, 24, 22, 0))
+        self.assertEqual((found[0], [json.loads(p) for p in found[2]]), ("2024-09-24", [{"symbol": "M0", "direction": "多", "price": 1.5}]))
+        # 参数或品种不一致、之后又有收盘 (夜盘) 时重新计算
+        self.assertIsNone(self.find(["M0"], datetime.datetime(2024, 9, 24, 22, 0), {"fast_period": 5}))
+        self.assertIsNone(self.find(["M0", "IF0"], datetime.datetime(2024, 9, 24, 22, 0)))
+        self.assertIsNone(self.find(["M0"], datetime.datetime(2024, 9, 25, 3, 0)))
+        # 股票没有夜盘，次日开盘前仍可使用
+        self.assertIsNotNone(self.find(["sh600000"], datetime.datetime(2024, 9, 25, 9, 0), market_type="stock"))
+
+    def test_symbol_without_data(self):
+        index = pd.bdate_range('2024-01-02', periods=120)
+        close = 3000 + np.cumsum(np.random.default_rng(0).normal(0, 20, 120))
+        bars = pd.DataFrame({'Open': close, 'High': close + 5, 'Low': close - 5, 'Close': close,
+                             'Volume': 100.0, 'OpenInterest': 0.0}, index=index)
+        fetch = lambda symbol, *args, **kwargs: bars.copy() if symbol == "RB0" else pd.DataFrame()
+        db = self.Session()
+        db.add(ScheduledScan(id=3, kind="scan", period="daily", market_type="futures", symbols=["XX0", "RB0"],
+                             strategy_params={}, scan_window=5))
+        db.commit()
+        db.close()
+
+        scheduler = ScanScheduler(self.Session, calendar=WeekdayCalendar())
+        with mock.patch.object(engine, 'fetch_data', fetch):
+            config = next(c for c in scheduler.configs() if c['id'] == 3)
+            scheduler.run_scan(config, datetime.date(2024, 9, 24))
+        # 没有数据的品种保留占位行，包含它的请求仍可读取物化结果
+        db = self.Session()
+        try:
+            found = scheduler.find_materialized(db, "scan", "TrendFollowingStrategy", "daily", "futures", {}, ["XX0", "RB0"],
+                                                scan_window=5, now=datetime.datetime(2024, 9, 24, 22, 0))
+        finally:
+            db.close()
+        results = [json.loads(p) for p in found[2]]
+        self.assertEqual([r["symbol"] for r in results], ["XX0", "RB0"])
+        self.assertEqual((results[0]["raw_signals"], "error" in results[0], "error" in results[1]), ([], True, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
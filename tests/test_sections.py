@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.sections import DetailCache, slice_section
+
+
+def make_detail():
+    dates = [f"2024-01-0{d} 09:0{m}:00" for d in range(2, 5) for m in range(4)]
+    n = len(dates)
+    return {
+        "kline_data": {
+            "dates": dates,
+            "values": [[i, i, i, i] for i in range(n)],
+            "volumes": list(range(n)),
+            "ma": {"ma5": [float(i) for i in range(n)], "strategy_fast_label": "MA5"},
+            "macd": None,
+        },
+        "equity_curve": [{"date": d, "value": 1e6 + i} for i, d in enumerate(dates)],
+        "trades": [{"date": dates[1], "type": "buy"}, {"date": dates[9], "type": "sell"}],
+        "logs": ["2024-01-02 09:01:00, 买入", "2024-01-04 09:01:00, 卖出", "回测结束"],
+    }
+
+
+class TestSliceSection(unittest.TestCase):
+    def test_kline_arrays_stay_aligned(self):
+        result = slice_section(make_detail(), 'kline_data', offset=5, limit=3)
+        data = result['data']
+        self.assertEqual((result['total'], result['index']), (12, 5))
+        self.assertEqual(data['dates'], ["2024-01-03 09:01:00", "2024-01-03 09:02:00", "2024-01-03 09:03:00"])
+        self.assertEqual(data['volumes'], [5, 6, 7])
+        self.assertEqual(data['ma']['ma5'], [5.0, 6.0, 7.0])
+        self.assertEqual(data['ma']['strategy_fast_label'], "MA5")
+        self.assertIsNone(data['macd'])
+
+    def test_date_range_with_date_only_end(self):
+        result = slice_section(make_detail(), 'equity_curve', start="2024-01-03", end="2024-01-03")
+        self.assertEqual(result['total'], 4)
+        self.assertEqual(result['index'], 4)
+        self.assertEqual([p['date'][:10] for p in result['data']], ["2024-01-03"] * 4)
+
+    def test_logs_filtered_by_prefix_date(self):
+        result = slice_section(make_detail(), 'logs', start="2024-01-03")
+        self.assertEqual(result['data'], ["2024-01-04 09:01:00, 卖出"])
+        self.assertEqual(len(slice_section(make_detail(), 'logs')['data']), 3)
+
+    def test_offset_past_end(self):
+        result = slice_section(make_detail(), 'trades', offset=10, limit=5)
+        self.assertEqual(result['data'], [])
+        self.assertIsNone(result['index'])
+
+    def test_invalid_date(self):
+        with self.assertRaises(ValueError):
+            slice_section(make_detail(), 'trades', start="not-a-date")
+
+
+class TestDetailCache(unittest.TestCase):
+    def test_loads_once_and_evicts(self):
+        calls = []
+        cache = DetailCache(maxsize=2)
+        loader = lambda key: (lambda: calls.append(key) or {"key": key})
+        cache.get(1, loader(1))
+        cache.get(1, loader(1))
+        cache.get(2, loader(2))
+        cache.get(3, loader(3))
+        cache.get(1, loader(1))
+        self.assertEqual(calls, [1, 2, 3, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
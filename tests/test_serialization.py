@@ -0,0 +1,56 @@
+import unittest
+import json
+import datetime
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core import serialization
+
+
+class TestSerialization(unittest.TestCase):
+    def sample(self):
+        return {
+            "nan": float('nan'),
+            "inf": float('inf'),
+            "array": np.array([1.5, np.nan]),
+            "int": np.int64(3),
+            "float": np.float32(0.5),
+            "ts": pd.Timestamp('2024-01-02 09:30:00'),
+            "dt": datetime.datetime(2024, 1, 2, 9, 30),
+            "nested": [{"v": np.float64('nan')}],
+        }
+
+    def check(self, body):
+        data = json.loads(body)
+        self.assertIsNone(data["nan"])
+        self.assertIsNone(data["inf"])
+        self.assertEqual(data["array"], [1.5, None])
+        self.assertEqual(data["int"], 3)
+        self.assertEqual(data["float"], 0.5)
+        self.assertEqual(data["ts"], "2024-01-02T09:30:00")
+        self.assertEqual(data["dt"], "2024-01-02T09:30:00")
+        self.assertIsNone(data["nested"][0]["v"])
+
+    def test_dumps(self):
+        self.check(serialization.dumps(self.sample()))
+
+    def test_dumps_without_orjson(self):
+        original = serialization.orjson
+        serialization.orjson = None
+        try:
+            self.check(serialization.dumps(self.sample()))
+        finally:
+            serialization.orjson = original
+
+    def test_response_render(self):
+        response = serialization.FastJSONResponse({"a": np.arange(3)})
+        self.assertEqual(json.loads(response.body), {"a": [0, 1, 2]})
+        self.assertEqual(response.media_type, "application/json")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.database import Base
+from core.symbol_alias import AliasResolver, weighted_candidates
+
+
+class FakeSource:
+    """
+    模拟数据源: 只有 available 中的代码能返回数据
+    """
+    def __init__(self, available):
+        self.available = set(available)
+        self.calls = []
+
+    def __call__(self, code):
+        self.calls.append(code)
+        if code not in self.available:
+            raise KeyError(code)
+        return pd.DataFrame({"close": [1.0]})
+
+
+class TestSymbolAlias(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.session_factory = sessionmaker(bind=engine)
+
+    def resolver(self):
+        return AliasResolver(session_factory=self.session_factory)
+
+    def test_candidates(self):
+        self.assertEqual(weighted_candidates('SH0')[:2], ['SH888', 'SH13'])
+        self.assertEqual(weighted_candidates('SH888')[0], 'SH888')
+
+    def test_resolved_alias_is_persisted(self):
+        source = FakeSource(['SH13'])
+        code, df = self.resolver().fetch('SH0', source)
+        self.assertEqual(code, 'SH13')
+        self.assertEqual(source.calls, ['SH888', 'SH13'])
+
+        # 新实例 (模拟重启) 从数据库读取，只请求一次
+        source.calls.clear()
+        code, df = self.resolver().fetch('SH0', source)
+        self.assertEqual(code, 'SH13')
+        self.assertEqual(source.calls, ['SH13'])
+
+    def test_negative_cache(self):
+        source = FakeSource([])
+        self.assertEqual(self.resolver().fetch('LH0', source), (None, None))
+        source.calls.clear()
+        self.assertEqual(self.resolver().fetch('LH0', source), (None, None))
+        self.assertEqual(source.calls, [])
+
+    def test_stale_alias_is_invalidated(self):
+        resolver = self.resolver()
+        resolver.fetch('SH0', FakeSource(['SH888']))
+
+        # 缓存的代码失效后回退，下次重新探测
+        self.assertEqual(resolver.fetch('SH0', FakeSource(['SH13'])), (None, None))
+        code, _ = resolver.fetch('SH0', FakeSource(['SH13']))
+        self.assertEqual(code, 'SH13')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.symbol_index import SymbolIndex, stock_full_code, pinyin_initials, futures_index
+
+
+class TestSymbolIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SymbolIndex([
+            {"code": "sh600519", "name": "贵州茅台", "multiplier": 100},
+            {"code": "sz000858", "name": "五粮液", "multiplier": 100},
+            {"code": "sh600036", "name": "招商银行", "multiplier": 100},
+            {"code": "sh601318", "name": "中国平安", "multiplier": 100},
+            {"code": "bj830799", "name": "艾融软件", "multiplier": 100},
+        ])
+
+    def codes(self, items):
+        return [item["code"] for item in items]
+
+    def test_full_code(self):
+        self.assertEqual(stock_full_code("600519"), "sh600519")
+        self.assertEqual(stock_full_code("300750"), "sz300750")
+        self.assertEqual(stock_full_code("830799"), "bj830799")
+
+    def test_code_prefix(self):
+        # 6 位代码和带前缀代码都能匹配，结果保持原始顺序
+        self.assertEqual(self.codes(self.index.search("600")), ["sh600519", "sh600036"])
+        self.assertEqual(self.codes(self.index.search("SH60")), ["sh600519", "sh600036", "sh601318"])
+
+    def test_name_search(self):
+        self.assertEqual(self.codes(self.index.search("招商")), ["sh600036"])
+        # 名称前缀无结果时退回包含匹配
+        self.assertEqual(self.codes(self.index.search("平安")), ["sh601318"])
+
+    def test_filter_and_page(self):
+        items, total = self.index.page(exchange="sh", offset=1, limit=1)
+        self.assertEqual(total, 3)
+        self.assertEqual(self.codes(items), ["sh600036"])
+
+    def test_pinyin_initials(self):
+        self.assertEqual(pinyin_initials("贵州茅台"), "gzmt")
+        self.assertEqual(pinyin_initials("招商银行"), "zsyh")
+        self.assertEqual(pinyin_initials("沪深300"), "hs300")
+        self.assertEqual(self.codes(self.index.search("zgpa")), ["sh601318"])
+
+    def test_rank(self):
+        # 代码完全匹配优先于前缀匹配，拼音首字母也能命中
+        ranked = futures_index.rank("a", 3)
+        self.assertEqual((ranked[0][0], ranked[0][1]["code"]), (0, "A0"))
+        self.assertTrue(all(tier == 1 for tier, _ in ranked[1:]))
+        self.assertEqual([item["code"] for _, item in futures_index.rank("lwg")], ["RB0"])
+        self.assertEqual(self.codes(item for _, item in self.index.rank("茅台")), ["sh600519"])
+
+
+if __name__ == '__main__':
+    unittest.main()
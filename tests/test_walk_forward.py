@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core.walk_forward import walk_forward_folds, stitch_equity, walk_forward
+
+
+def daily_bars(start='2021-01-01', end='2023-12-31'):
+    index = pd.bdate_range(start, end)
+    rng = np.random.default_rng(3)
+    close = 3000 + np.cumsum(rng.normal(0, 20, len(index)))
+    return pd.DataFrame({'Open': close, 'High': close + 10, 'Low': close - 10, 'Close': close,
+                         'Volume': 1e4, 'OpenInterest': 1e3}, index=index)
+
+
+class TestFolds(unittest.TestCase):
+    def test_rolling_folds_are_contiguous(self):
+        index = pd.bdate_range('2024-01-01', periods=70)
+        folds = walk_forward_folds(index, n_folds=4, in_sample_ratio=0.75)
+        self.assertEqual(len(folds), 4)
+        # 70 天 = 样本内 30 + 4 * 样本外 10
+        days = [d.strftime('%Y-%m-%d') for d in index]
+        self.assertEqual(folds[0]['in_sample'], (days[0], days[29]))
+        self.assertEqual(folds[0]['out_of_sample'], (days[30], days[39]))
+        self.assertEqual(folds[1]['in_sample'], (days[10], days[39]))
+        self.assertEqual(folds[3]['out_of_sample'], (days[60], days[69]))
+
+    def test_intraday_bars_split_on_days(self):
+        index = pd.date_range('2024-01-02 09:00', periods=6, freq='h')
+        index = index.append(index + pd.Timedelta(days=1)).append(index + pd.Timedelta(days=2))
+        folds = walk_forward_folds(index, n_folds=1, in_sample_ratio=0.5)
+        self.assertEqual(folds[0]['in_sample'], ('2024-01-02', '2024-01-02'))
+        # 最后一折的样本外延伸到区间结束
+        self.assertEqual(folds[0]['out_of_sample'], ('2024-01-03', '2024-01-04'))
+
+    def test_too_short(self):
+        with self.assertRaises(ValueError):
+            walk_forward_folds(pd.bdate_range('2024-01-01', periods=3), n_folds=4)
+
+    def test_stitch_compounds(self):
+        folds = [
+            {'equity_curve': [{'date': 'a', 'value': 100.0}, {'date': 'b', 'value': 110.0}], 'metrics': {'final_value': 110.0}},
+            {'equity_curve': [{'date': 'c', 'value': 100.0}, {'date': 'd', 'value': 90.0}], 'metrics': {'final_value': 90.0}},
+        ]
+        curve, final = stitch_equity(folds, 100.0)
+        np.testing.assert_allclose([p['value'] for p in curve], [100.0, 110.0, 110.0, 99.0])
+        self.assertAlmostEqual(final, 99.0)
+
+
+class TestWalkForward(unittest.TestCase):
+    def test_parallel_matches_sequential(self):
+        df = daily_bars()
+        kwargs = dict(start_date='2022-01-01', end_date='2023-12-31', n_folds=2, max_trials=2, seed=1, data=df)
+        sequential = walk_forward('RB0', 'daily', {'fast_period': 5, 'slow_period': 20}, processes=1, **kwargs)
+        parallel = walk_forward('RB0', 'daily', {'fast_period': 5, 'slow_period': 20}, processes=2, **kwargs)
+        self.assertEqual(sequential['summary']['failed_folds'], 0)
+        self.assertEqual(sequential['summary'], parallel['summary'])
+        self.assertEqual([f['best_params'] for f in sequential['folds']], [f['best_params'] for f in parallel['folds']])
+        # 样本外权益曲线只覆盖各折样本外区间
+        self.assertGreaterEqual(sequential['equity_curve'][0]['date'], sequential['folds'][0]['out_of_sample']['start'])
+
+
+if __name__ == '__main__':
+    unittest.main()
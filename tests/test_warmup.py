@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from core import strategy
+from core.trading_calendar import TradingCalendar
+from core.warmup import strategy_lookback, warmup_trading_days, warmup_start
+
+
+def spring_festival_calendar():
+    # 2024 春节休市: 02-09 至 02-17
+    dates = pd.bdate_range('2024-01-02', '2024-03-29')
+    return dates[(dates < '2024-02-09') | (dates > '2024-02-17')]
+
+
+def failing_loader():
+    raise ConnectionError("offline")
+
+
+class TestTradingCalendar(unittest.TestCase):
+    def test_shift_back_skips_holidays(self):
+        calendar = TradingCalendar(loader=spring_festival_calendar)
+        self.assertEqual(calendar.shift_back('2024-02-19', 1), pd.Timestamp('2024-02-08'))
+        self.assertEqual(calendar.shift_back('2024-02-19', 3), pd.Timestamp('2024-02-06'))
+        # 非交易日往前推: 第 1 个交易日即节前最后一天
+        self.assertEqual(calendar.shift_back('2024-02-12', 1), pd.Timestamp('2024-02-08'))
+        self.assertFalse(calendar.is_trading_day('2024-02-14'))
+
+    def test_fallback_is_conservative(self):
+        calendar = TradingCalendar(loader=failing_loader)
+        start = calendar.shift_back('2024-02-19', 10)
+        exact = TradingCalendar(loader=spring_festival_calendar).shift_back('2024-02-19', 10)
+        self.assertLessEqual(start, exact)
+
+    def test_failure_is_not_retried_immediately(self):
+        calls = []
+        def loader():
+            calls.append(1)
+            raise ConnectionError("offline")
+        calendar = TradingCalendar(loader=loader)
+        calendar.shift_back('2024-02-19', 5)
+        calendar.shift_back('2024-02-19', 5)
+        self.assertEqual(len(calls), 1)
+
+
+class TestStrategyLookback(unittest.TestCase):
+    def test_sma_lookback_is_minperiod(self):
+        params = {'fast_period': 5, 'slow_period': 20}
+        # SMA(20) 需要 20 根，CrossOver 再多 1 根
+        self.assertEqual(strategy_lookback(strategy.TrendFollowingStrategy, params), 21)
+
+    def test_ema_adds_settling_bars(self):
+        sma = strategy_lookback(strategy.TrendFollowingStrategy, {'slow_period': 20})
+        ema = strategy_lookback(strategy.TrendFollowingStrategy, {'slow_period': 20, 'use_expma': True})
+        self.assertGreater(ema, sma + 20)
+
+    def test_longer_period_needs_more_bars(self):
+        short = strategy_lookback(strategy.TrendFollowingStrategy, {'slow_period': 30})
+        long = strategy_lookback(strategy.TrendFollowingStrategy, {'slow_period': 120})
+        self.assertEqual(long - short, 90)
+
+
+class TestWarmupDays(unittest.TestCase):
+    def test_period_conversion(self):
+        # 100 根 * 1.1 余量
+        self.assertEqual(warmup_trading_days(100, 'daily'), 111)
+        self.assertEqual(warmup_trading_days(100, 'weekly'), 555)
+        # 5 分钟线每天至少 45 根
+        self.assertEqual(warmup_trading_days(100, '5'), 4)
+        self.assertEqual(warmup_trading_days(100, '60', market_type='stock'), 29)
+
+    def test_warmup_start_uses_calendar(self):
+        calendar = TradingCalendar(loader=spring_festival_calendar)
+        start = warmup_start('2024-02-19', 9, 'daily', calendar=calendar)
+        self.assertEqual(start, calendar.shift_back('2024-02-19', 11))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,105 @@
-import React from 'react';
+import React, { useEffect, useMemo, useRef, useState } from 'react';
 import ReactECharts from 'echarts-for-react';
+import axios from 'axios';
+
+// 有序日期数组中第一个 >= date (right 时为 > date) 的位置 (日期格式固定，可直接按字符串比较)
+const bisect = (dates, date, right = false) => {
+    let lo = 0;
+    let hi = dates.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (dates[mid] < date || (right && dates[mid] === date)) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo;
+};
+
+// 把缩放返回的可见范围明细替换进降采样的图表，范围外仍为降采样数据
+const mergeDetail = (klineObj, equityCurve, detail) => {
+    const dates = klineObj.dates || [];
+    const detailDates = detail.dates || [];
+    if (!detailDates.length) return null;
+    const i0 = bisect(dates, detailDates[0]);
+    const i1 = bisect(dates, detailDates[detailDates.length - 1], true);
+    const splice = (base, part) => (Array.isArray(base) && Array.isArray(part) && base.length === dates.length)
+        ? [...base.slice(0, i0), ...part, ...base.slice(i1)]
+        : base;
+    const spliceAll = (base, part) => {
+        if (!base || !part) return base;
+        const merged = { ...base };
+        Object.keys(part).forEach(key => { merged[key] = splice(base[key], part[key]); });
+        return merged;
+    };
+
+    const kline_data = {
+        ...klineObj,
+        dates: splice(dates, detailDates),
+        values: splice(klineObj.values, detail.values),
+        volumes: splice(klineObj.volumes, detail.volumes),
+        ma: spliceAll(klineObj.ma, detail.ma),
+        dkx: spliceAll(klineObj.dkx, detail.dkx),
+        macd: spliceAll(klineObj.macd, detail.macd)
+    };
+
+    // 权益曲线与降采样K线按位置对齐，明细部分取每根K线时点最近的权益
+    let equity_curve = equityCurve;
+    if (Array.isArray(equityCurve) && equityCurve.length === dates.length) {
+        const equityDates = equityCurve.map(item => item ? item.date : '');
+        const part = detailDates.map(date => equityCurve[Math.max(bisect(equityDates, date, true) - 1, 0)]);
+        equity_curve = splice(equityCurve, part);
+    }
+    return { kline_data, equity_curve, range: [i0, i0 + detailDates.length - 1] };
+};
 
 const ChartPanel = ({ chartType, results, onChartClick }) => {
+    const chartRef = useRef(null);
+    const zoomTimer = useRef(null);
+    const zoomSeq = useRef(0);
+    const onZoom = useRef(null);
+    // 缩放后的可见范围明细 (首次回测返回的是按图表宽度降采样的 K 线)
+    const [detail, setDetail] = useState(null);
+
+    useEffect(() => {
+        zoomSeq.current += 1;
+        setDetail(null);
+    }, [results, chartType]);
+    useEffect(() => () => clearTimeout(zoomTimer.current), []);
+
+    // 回测请求参数 (chart_request) 已知且K线被降采样时，缩放后按可见范围请求明细
+    const zoomable = chartType === 'kline' && !!results?.chart_request && !!results?.kline_data?.downsample;
+    onZoom.current = () => {
+        if (!zoomable) return;
+        clearTimeout(zoomTimer.current);
+        zoomTimer.current = setTimeout(async () => {
+            const chart = chartRef.current?.getEchartsInstance();
+            const zoom = chart?.getOption()?.dataZoom?.[0];
+            const shown = (detail ? detail.kline_data : results.kline_data).dates || [];
+            if (!zoom || !shown.length) return;
+            const start = Math.max(Math.round(zoom.startValue ?? 0), 0);
+            const end = Math.min(Math.round(zoom.endValue ?? shown.length - 1), shown.length - 1);
+            const seq = ++zoomSeq.current;
+            try {
+                const res = await axios.post('http://localhost:8000/api/backtest/zoom', {
+                    ...results.chart_request,
+                    view_start: shown[start],
+                    view_end: shown[end],
+                    max_points: Math.round(chart.getWidth())
+                });
+                if (seq !== zoomSeq.current) return; // 已有更新的缩放请求
+                const merged = mergeDetail(results.kline_data, results.equity_curve, res.data.kline_data || {});
+                if (merged) setDetail(merged);
+            } catch (err) {
+                console.error('加载缩放明细失败:', err);
+            }
+        }, 300);
+    };
+
+    // 事件只绑定一次 (onEvents 变化时图表会重建)，处理函数通过 ref 取最新状态
+    const onEvents = useMemo(() => ({
+        datazoom: () => onZoom.current(),
+        ...(onChartClick ? { click: onChartClick } : {})
+    }), [onChartClick]);
+
     if (!results) return null;
 
     // 提取 key 的逻辑，避免 ReactECharts 内部状态混乱
@@ -31,7 +129,7 @@ const ChartPanel = ({ chartType, results, onChartClick }) => {
             };
         }
 
-        const data = results;
+        const data = detail ? { ...results, ...detail } : results;
         // 如果是 equity_curve (Line 模式)
         if (chartType === 'line') {
             const equityCurve = Array.isArray(data.equity_curve) ? data.equity_curve : [];
@@ -91,6 +189,19 @@ const ChartPanel = ({ chartType, results, onChartClick }) => {
         // 预处理有效日期集合，用于过滤不在当前时间范围内的信号
         const validDatesSet = new Set(dates);
 
+        // 后端降采样时每根K线代表一个区间，把信号日期对齐到所在区间的起始日期 (日期格式固定，可直接按字符串比较)
+        const alignToChart = (date) => {
+            if (!klineObj.downsample || validDatesSet.has(date) || !date || date < dates[0]) return date;
+            let lo = 0;
+            let hi = dates.length - 1;
+            while (lo < hi) {
+                const mid = (lo + hi + 1) >> 1;
+                if (dates[mid] <= date) lo = mid;
+                else hi = mid - 1;
+            }
+            return dates[lo];
+        };
+
         // K线
         seriesList.push({
             name: 'K线',
@@ -104,6 +215,7 @@ const ChartPanel = ({ chartType, results, onChartClick }) => {
             },
             markPoint: {
                 data: signals
+                    .map(sig => ({ ...sig, date: alignToChart(sig.date) }))
                     .filter(sig => validDatesSet.has(sig.date)) // 过滤掉日期不匹配的信号，防止ECharts断言错误
                     .map(sig => {
                         // 优先使用后端提供的 action (如"反手做多")，若无则回退到基础类型
@@ -285,6 +397,11 @@ const ChartPanel = ({ chartType, results, onChartClick }) => {
             });
         }
 
+        // 已加载明细时保持在明细所在的可见范围
+        const zoomWindow = detail
+            ? { startValue: detail.range[0], endValue: detail.range[1] }
+            : { start: 50, end: 100 };
+
         return {
             animation: false,
             title: { text: 'K线图 & 交易信号' },
@@ -362,16 +479,14 @@ const ChartPanel = ({ chartType, results, onChartClick }) => {
                 {
                     type: 'inside',
                     xAxisIndex: showEquity ? [0, 1] : [0],
-                    start: 50,
-                    end: 100
+                    ...zoomWindow
                 },
                 {
                     show: true,
                     xAxisIndex: showEquity ? [0, 1] : [0],
                     type: 'slider',
                     top: '94%',
-                    start: 50,
-                    end: 100
+                    ...zoomWindow
                 }
             ],
             series: seriesList.map(s => ({
@@ -384,11 +499,12 @@ const ChartPanel = ({ chartType, results, onChartClick }) => {
 
     return (
         <ReactECharts
+            ref={chartRef}
             key={chartKey}
             option={getOption()}
             style={{ height: '600px', width: '100%' }}
             notMerge={true}
-            onEvents={onChartClick ? { click: onChartClick } : undefined}
+            onEvents={onEvents}
         />
     );
 };
@@ -73,6 +73,8 @@ export const futuresMap = {
 };
 
 export const periodMap = {
+  'monthly': '月线',
+  'weekly': '周线',
   'daily': '日线',
   '60': '60分钟',
   '30': '30分钟',
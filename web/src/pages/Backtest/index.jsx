@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Card, Form, Input, Select, Button, Row, Col, message, Radio, Alert, Switch, Tag, DatePicker, Tooltip } from 'antd';
 import { 
   SafetyCertificateOutlined, 
@@ -28,6 +28,8 @@ const BacktestPage = () => {
   const [autoOptimize, setAutoOptimize] = useState(false);
   const [currentParams, setCurrentParams] = useState(null);
   const [isFullScreen, setIsFullScreen] = useState(false);
+  // 结果区域，图表宽度 (像素) 决定后端返回的最大K线点数
+  const resultAreaRef = useRef(null);
   
   // Local cache for lists to avoid repeated API calls if we were to move this to context fully
   // For now, we fetch on mount if symbols is empty or just fetch every time to be safe
@@ -360,7 +362,9 @@ const BacktestPage = () => {
             strategy_params: specificParams,
             initial_cash: parseFloat(values.initial_cash || 1000000),
             auto_optimize: autoOptimize,
-            strategy_name: strategyType
+            strategy_name: strategyType,
+            // 超过图表宽度的K线由后端合并，缩放时再按可见范围加载明细
+            chart_points: Math.round(resultAreaRef.current?.clientWidth || window.innerWidth)
           };
 
           if (values.date_range && values.date_range.length === 2) {
@@ -374,7 +378,20 @@ const BacktestPage = () => {
               batchResults.push({
                   symbol: symbolCode,
                   success: true,
-                  data: response.data
+                  data: {
+                      ...response.data,
+                      // ChartPanel 缩放时用相同的参数请求 /api/backtest/zoom
+                      chart_request: {
+                          symbol: payload.symbol,
+                          period: payload.period,
+                          market_type: payload.market_type,
+                          data_source: payload.data_source,
+                          strategy_name: payload.strategy_name,
+                          strategy_params: payload.strategy_params,
+                          start_date: payload.start_date,
+                          end_date: payload.end_date
+                      }
+                  }
               });
           } catch (err) {
               console.error(`Backtest failed for ${symbolCode}:`, err);
@@ -653,6 +670,7 @@ const BacktestPage = () => {
                     <Select>
                     <Option value="daily">日线</Option>
                     <Option value="weekly">周线</Option>
+                    <Option value="monthly">月线</Option>
                     <Option value="60">60分钟</Option>
                     <Option value="30">30分钟</Option>
                     <Option value="15">15分钟</Option>
@@ -968,7 +986,7 @@ const BacktestPage = () => {
             </Card>
             </Col>
             
-            <Col span={isFullScreen ? 24 : 18} style={{ height: '100%', overflowY: 'auto' }}>
+            <Col ref={resultAreaRef} span={isFullScreen ? 24 : 18} style={{ height: '100%', overflowY: 'auto' }}>
             {results ? (
                 results.isBatch ? (
                     <BatchBacktestResult 
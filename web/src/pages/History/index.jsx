@@ -14,6 +14,8 @@ import ChartPanel from '../../components/ChartPanel';
 const HistoryPage = () => {
   const [savedBacktests, setSavedBacktests] = useState([]);
   const [historyLoading, setHistoryLoading] = useState(false);
+  const [listPagination, setListPagination] = useState({ current: 1, pageSize: 20, total: 0 });
+  const [listSort, setListSort] = useState({ sort_by: 'timestamp', order: 'desc' });
   const [viewingHistory, setViewingHistory] = useState(null);
   const [chartType, setChartType] = useState('line');
 
@@ -21,11 +23,15 @@ const HistoryPage = () => {
       fetchSavedBacktests();
   }, []);
 
-  const fetchSavedBacktests = async () => {
+  // 服务端分页：只拉取当前页的摘要数据
+  const fetchSavedBacktests = async (page = listPagination.current, pageSize = listPagination.pageSize, sort = listSort) => {
     setHistoryLoading(true);
     try {
-      const response = await axios.get('http://localhost:8000/api/backtest/list');
-      setSavedBacktests(response.data);
+      const response = await axios.get('http://localhost:8000/api/backtest/list', {
+        params: { limit: pageSize, offset: (page - 1) * pageSize, sort_by: sort.sort_by, order: sort.order }
+      });
+      setSavedBacktests(response.data.items);
+      setListPagination({ current: page, pageSize, total: response.data.total });
     } catch (error) {
       message.error('获取回测记录失败: ' + error.message);
     } finally {
@@ -33,10 +39,28 @@ const HistoryPage = () => {
     }
   };
 
+  const handleTableChange = (pagination, filters, sorter) => {
+    // ID / 保存时间 由服务端排序，其余列仅对当前页排序
+    let sort = listSort;
+    if (sorter && ['id', 'timestamp'].includes(sorter.field)) {
+      sort = sorter.order
+        ? { sort_by: sorter.field, order: sorter.order === 'ascend' ? 'asc' : 'desc' }
+        : { sort_by: 'timestamp', order: 'desc' };
+    }
+    const sortChanged = sort.sort_by !== listSort.sort_by || sort.order !== listSort.order;
+    const pageChanged = pagination.current !== listPagination.current || pagination.pageSize !== listPagination.pageSize;
+    if (!sortChanged && !pageChanged) return;
+    setListSort(sort);
+    fetchSavedBacktests(sortChanged ? 1 : pagination.current, pagination.pageSize, sort);
+  };
+
   const handleViewHistory = async (id) => {
     setHistoryLoading(true);
     try {
-      const response = await axios.get(`http://localhost:8000/api/backtest/${id}`);
+      // K线数据体积最大，切换到K线图时再单独加载
+      const response = await axios.get(`http://localhost:8000/api/backtest/${id}`, {
+        params: { sections: 'equity_curve,trades,logs' }
+      });
       setViewingHistory(response.data);
     } catch (error) {
       message.error('获取详情失败: ' + error.message);
@@ -45,6 +69,18 @@ const HistoryPage = () => {
     }
   };
 
+  useEffect(() => {
+    if (chartType !== 'kline' || !viewingHistory || !viewingHistory.detail_data || viewingHistory.detail_data.kline_data) return;
+    const id = viewingHistory.id;
+    axios.get(`http://localhost:8000/api/backtest/${id}/sections/kline_data`)
+      .then(response => {
+        setViewingHistory(prev => (prev && prev.id === id)
+          ? { ...prev, detail_data: { ...prev.detail_data, kline_data: response.data.data } }
+          : prev);
+      })
+      .catch(error => message.error('获取K线数据失败: ' + error.message));
+  }, [chartType, viewingHistory]);
+
   const handleDeleteBacktest = async (id) => {
     try {
       await axios.delete(`http://localhost:8000/api/backtest/${id}`);
@@ -222,7 +258,7 @@ const HistoryPage = () => {
                 header: { borderBottom: '1px solid #f0f0f0', padding: '0 24px' },
                 body: { padding: '0', height: 'calc(100% - 57px)', position: 'relative' } 
             }}
-            extra={<Button type="primary" ghost icon={<ReloadOutlined />} onClick={fetchSavedBacktests}>刷新列表</Button>}
+            extra={<Button type="primary" ghost icon={<ReloadOutlined />} onClick={() => fetchSavedBacktests()}>刷新列表</Button>}
         >
             <Table 
                 dataSource={savedBacktests} 
@@ -230,7 +266,7 @@ const HistoryPage = () => {
                 loading={historyLoading} 
                 size="middle"
                 columns={[
-                    { title: 'ID', dataIndex: 'id', key: 'id', width: 60, align: 'center', sorter: (a, b) => a.id - b.id, defaultSortOrder: 'descend' },
+                    { title: 'ID', dataIndex: 'id', key: 'id', width: 60, align: 'center', sorter: true },
                     { 
                         title: '策略名称', dataIndex: 'strategy_name', key: 'strategy_name', width: 180,
                         render: (text) => <span style={{ fontWeight: 500, color: '#1890ff' }}>{strategyNameMap[text] || text}</span>
@@ -291,7 +327,7 @@ const HistoryPage = () => {
                     },
                     { title: '交易次数', dataIndex: 'total_trades', key: 'total_trades', align: 'center', sorter: (a, b) => a.total_trades - b.total_trades },
                     { 
-                        title: '保存时间', dataIndex: 'timestamp', key: 'timestamp', width: 160, align: 'center', sorter: (a, b) => new Date(a.timestamp) - new Date(b.timestamp),
+                        title: '保存时间', dataIndex: 'timestamp', key: 'timestamp', width: 160, align: 'center', sorter: true, defaultSortOrder: 'descend',
                         render: (val) => <span style={{ fontSize: '12px', color: '#999' }}>{new Date(val).toLocaleString()}</span> 
                     },
                     {
@@ -312,8 +348,11 @@ const HistoryPage = () => {
                         )
                     }
                 ]}
+                onChange={handleTableChange}
                 pagination={{ 
-                    pageSize: 20, 
+                    current: listPagination.current,
+                    pageSize: listPagination.pageSize,
+                    total: listPagination.total,
                     showTotal: (total) => `共 ${total} 条记录`,
                     showQuickJumper: true,
                     showSizeChanger: true,
@@ -114,7 +114,8 @@ const SymbolScan = () => {
                 initial_cash: 10000000, 
                 auto_optimize: false,
                 data_source: 'main',
-                start_date: new Date(Date.now() - 365 * 24 * 60 * 60 * 1000).toISOString().split('T')[0]
+                // 与信号扫描相同的起点: 一年前所在月份的第一天
+                start_date: new Date(Date.now() - 365 * 24 * 60 * 60 * 1000).toISOString().slice(0, 8) + '01'
             };
             
             // 修正参数类型，确保数值类型正确传递
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Card, Form, Input, Select, Button, Row, Col, message, Table, Modal, Tag, Radio, Switch, Tooltip, DatePicker } from 'antd';
-import { PlayCircleOutlined, LineChartOutlined, SafetyCertificateOutlined } from '@ant-design/icons';
+import { PlayCircleOutlined, LineChartOutlined, SafetyCertificateOutlined, ClockCircleOutlined } from '@ant-design/icons';
 import axios from 'axios';
 import ChartPanel from '../../components/ChartPanel';
 
@@ -9,6 +9,8 @@ const { Option } = Select;
 const TomorrowStrategy = () => {
     const [loading, setLoading] = useState(false);
     const [results, setResults] = useState([]);
+    const [materializedDate, setMaterializedDate] = useState(null); // 结果来自收盘后定时分析时的交易日
+    const [scheduling, setScheduling] = useState(false);
     const [futuresList, setFuturesList] = useState([]);
     const [stockList, setStockList] = useState([]);
     const [symbols, setSymbols] = useState([]);
@@ -55,27 +57,31 @@ const TomorrowStrategy = () => {
         form.setFieldsValue({ symbols: [] });
     };
 
+    const buildPayload = (values) => {
+        // Merge form values into params
+        let params = { ...values };
+        delete params.symbols;
+        delete params.market_type;
+        delete params.period;
+        delete params.strategy_name;
+
+        return {
+            symbols: values.symbols,
+            period: values.period,
+            market_type: values.market_type,
+            strategy_name: values.strategy_name,
+            strategy_params: params
+        };
+    };
+
     const onFinish = async (values) => {
         setLoading(true);
         try {
-            // Merge form values into params
-            let params = { ...values };
-            delete params.symbols;
-            delete params.market_type;
-            delete params.period;
-            delete params.strategy_name;
-
-            const payload = {
-                symbols: values.symbols,
-                period: values.period,
-                market_type: values.market_type,
-                strategy_name: values.strategy_name,
-                strategy_params: params
-            };
-
-            const res = await axios.post('http://localhost:8000/api/strategy/batch-analyze', payload);
+            // 与收盘后定时分析的配置一致时，后端直接返回已保存的结果
+            const res = await axios.post('http://localhost:8000/api/strategy/batch-analyze', buildPayload(values));
             setResults(res.data.results || []);
-            message.success('分析完成');
+            setMaterializedDate(res.data.trade_date || null);
+            message.success(res.data.trade_date ? `已读取 ${res.data.trade_date} 的收盘后分析结果` : '分析完成');
         } catch (err) {
             console.error(err);
             message.error('分析失败: ' + (err.response?.data?.detail || err.message));
@@ -84,6 +90,22 @@ const TomorrowStrategy = () => {
         }
     };
 
+    // 保存为收盘后定时分析 (日盘、夜盘收盘后自动运行，之后相同条件的分析直接读取结果)
+    const scheduleAnalysis = async () => {
+        try {
+            const values = await form.validateFields();
+            setScheduling(true);
+            await axios.post('http://localhost:8000/api/strategy/scheduled-scans', { ...buildPayload(values), kind: 'batch' });
+            message.success('已添加收盘后定时分析，首次结果正在后台计算');
+        } catch (err) {
+            if (err.errorFields) return;
+            console.error(err);
+            message.error('添加定时分析失败: ' + (err.response?.data?.detail || err.message));
+        } finally {
+            setScheduling(false);
+        }
+    };
+
     const showDetail = async (record) => {
         setDetailVisible(true);
         setDetailLoading(true);
@@ -110,7 +132,8 @@ const TomorrowStrategy = () => {
                 // 关键修正：确保详情回测的时间范围与批量分析完全一致（最近365天）
                 // 否则数据起点不同会导致指标计算差异，进而导致信号不一致
                 // 2024-05 Update: 针对周线模式，需要拉取更长的数据（3年），否则K线太少
-                start_date: new Date(Date.now() - (values.period === 'weekly' ? 1095 : 365) * 24 * 60 * 60 * 1000).toISOString().split('T')[0]
+                // 批量分析的起点取所在月份的第一天 (一个月内不变)，这里保持一致
+                start_date: new Date(Date.now() - (values.period === 'weekly' ? 1095 : 365) * 24 * 60 * 60 * 1000).toISOString().slice(0, 8) + '01'
             };
             
             const res = await axios.post('http://localhost:8000/api/backtest', payload);
@@ -373,11 +396,16 @@ const TomorrowStrategy = () => {
                                     开始分析
                                 </Button>
                             </Form.Item>
+                            <Form.Item>
+                                <Button onClick={scheduleAnalysis} loading={scheduling} block icon={<ClockCircleOutlined />}>
+                                    收盘后自动分析
+                                </Button>
+                            </Form.Item>
                         </Form>
                     </Card>
                 </Col>
                 <Col span={18} style={{ height: '100%', overflowY: 'auto' }}>
-                    <Card title="品种信号列表" bordered={false}>
+                    <Card title="品种信号列表" bordered={false} extra={materializedDate && <Tag color="blue">{materializedDate} 收盘后分析</Tag>}>
                         <Table 
                             dataSource={results} 
                             columns={columns} 